@@ -10,9 +10,9 @@ from .design import (FDS_Plot, addTreatments, calculateInteractions, calculateMa
                      interactionPlot, mainEffectsPlot, marginalInteractionPlot, subgroupOfDefining)
 from .ecdf import plotECDF
 from .ml import plot_dendrogram
-from .mqcc import MahalanobisT2, MultivariateQualityControlChart
+from .mqcc import MahalanobisT2, MultivariateQualityControlChart, StreamingMQCC
 from .qcc import (EWMA, ARL_modifiedShewhartControlChart, Cusum, ParetoChart, ProcessCapability, QualityControlChart,
-                  cusumArl, cusumPfaCed, qcc_groups, qccStatistics, shroArlPfaCedNorm)
+                  StreamingQCC, cusumArl, cusumPfaCed, qcc_groups, qccStatistics, shroArlPfaCedNorm)
 from .randomizationTest import randomizationTest
 from .regression import stepwise_regression
 from .reliability import availabilityEBD, renewalEBD
@@ -1,12 +1,14 @@
 # ruff: noqa:F401
-from .bandit import optimalOAB, simulateOAB
+from .bandit import optimalOAB, optimalOABBoundary, simulateOAB, simulateOAB2
 from .dodge.dodge_chain import ChainPlanBinomial, ChainPlanPoisson
-from .dodge.dodge_curtailed import curtailedBinomial
+from .dodge.dodge_curtailed import curtailedBinomial, curtailedHypergeom
 from .dodge.dodge_double import (DSPlanBinomial, DSPlanHypergeom, DSPlanNormal,
                                  DSPlanPoisson)
+from .dodge.dodge_family import DSPDesign, DSPlanFamily, PlanFamily, SSPlanFamily
 from .dodge.dodge_other import (lotSensitiveComplianceSampPlan,
                                 variableSampPlanKnown, variableSampPlanUnknown)
-from .dodge.dodge_sequential import sequentialDesign
+from .dodge.dodge_sequential import (SequentialDecider, sequentialDesign,
+                                      sequentialOC)
 from .dodge.dodge_single import SSPlanBinomial, SSPlanHyper, SSPlanPoisson
 from .generic import findPlan, findPlanApprox
 from .oc import OperatingCharacteristics2c
@@ -11,6 +11,11 @@ from functools import lru_cache
 import numpy as np
 from scipy import stats
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover
+    njit = None
+
 # N = 10
 # p = 0.95
 # al = 0.5
@@ -21,6 +26,7 @@ from scipy import stats
 Stats = namedtuple('Stats', 'mean,std')
 SimulateOABResult = namedtuple('SimulateOABResult', 'mgamma,reward')
 OptimalOABResult = namedtuple('OptimalOABResult', 'max_reward,rewards')
+OptimalOABBoundary = namedtuple('OptimalOABBoundary', 'max_reward,boundary')
 
 # Use a cache to save results of call to the beta.cdf function
 # to speed up calculations
@@ -50,6 +56,42 @@ def simulateOAB(N, p, al, k, gam, Ns, seed=None):
     return SimulateOABResult(Stats(means[0], std[0]), Stats(means[1], std[1]))
 
 
+def simulateOAB2(N, p, al, k, gam, Ns, seed=None, chunk_size=None):
+    ''' vectorized version of simulateOAB
+
+    The stopping boundary beta.cdf(al, X + 1, n + 1 - X) > gam is tabulated once for
+    all (X, n). The Bernoulli trials of chunk_size replications are drawn as a matrix
+    and the stopping time of every replication is the first column where its running
+    number of successes hits the boundary. chunk_size defaults to about 10^7 trials
+    per chunk.
+    '''
+    rng = np.random.default_rng(seed)
+    X = np.arange(N + 2)[:, None]
+    n = np.arange(k, N + 1)[None, :]
+    with np.errstate(invalid='ignore'):
+        boundary = stats.beta.cdf(al, X + 1, n + 1 - X) > gam
+    steps = N - k + 1
+    chunk_size = max(1, 10 ** 7 // steps) if chunk_size is None else chunk_size
+
+    res = []
+    for start in range(0, Ns, chunk_size):
+        size = min(chunk_size, Ns - start)
+        # number of successes before each check, and after the trial following the last check
+        successes = np.cumsum(rng.random((size, steps)) < p, axis=1)
+        successes = np.hstack([np.zeros((size, 1), dtype=int), successes])
+        successes += rng.binomial(k, p, size)[:, None]
+        stop = boundary[successes[:, :-1], np.arange(steps)]
+        stopped = stop.any(axis=1)
+        first = np.where(stopped, np.argmax(stop, axis=1), steps - 1)
+        nStop = k + first
+        XStop = successes[np.arange(size), first + ~stopped]
+        res.append(np.column_stack([nStop, XStop + (N - nStop) * al]))
+    res = np.concatenate(res)
+    means = np.mean(res, axis=0)
+    std = np.std(res, axis=0)
+    return SimulateOABResult(Stats(means[0], std[0]), Stats(means[1], std[1]))
+
+
 def optimalOAB(N, al):
     '''
     N= Number of trials; al= Known probability of success in arm A.
@@ -97,3 +139,60 @@ def optimalOAB2(N, lambda_):
         # for next iteration, shorten vector X
         X = X[:-1]
     return OptimalOABResult((reward[N - 1, 0] + reward[N - 1, 1]) / 2, reward)
+
+
+def optimalOABBoundary(N, lambda_, compiled=False):
+    ''' optimal stopping boundary of the one-armed bandit in O(N) memory
+
+    Runs the dynamic program of optimalOAB2 keeping only the current row of rewards.
+    boundary[m] is the smallest number of successes X after m trials with arm B for
+    which it is optimal to continue with arm B (m + 1 if switching to arm A is
+    optimal for all X).
+
+    With compiled=True, a numba compiled kernel updates the row in place.
+    '''
+    if compiled and njit is None:
+        raise ImportError('compiled=True requires numba')
+    boundary = np.zeros(N, dtype=np.int64)
+    if compiled:
+        rho = np.zeros(N + 1)
+        _oabKernel(N, float(lambda_), rho, boundary)
+        return OptimalOABBoundary((rho[0] + rho[1]) / 2, boundary)
+
+    X = np.arange(0, N + 1)
+    cr = (X + 1) / (N + 1)
+    rho = np.maximum(lambda_, cr)
+    boundary[N - 1] = _firstContinue(cr >= lambda_)
+    for n in range(1, N):
+        X = X[:-1]
+        cr = ((X + 1) * rho[1:] + (N - n - X) * rho[:-1] + (X + 1)) / (N - n + 1)
+        rho = np.maximum(lambda_ * (n + 1), cr)
+        boundary[N - 1 - n] = _firstContinue(cr >= lambda_ * (n + 1))
+    return OptimalOABBoundary((rho[0] + rho[1]) / 2, boundary)
+
+
+def _firstContinue(cont):
+    return np.argmax(cont) if cont.any() else len(cont)
+
+
+def _oabKernelPython(N, lambda_, rho, boundary):
+    first = N + 1
+    for X in range(N + 1):
+        cr = (X + 1) / (N + 1)
+        if cr >= lambda_ and first > N:
+            first = X
+        rho[X] = max(lambda_, cr)
+    boundary[N - 1] = first
+    for n in range(1, N):
+        maxreward = lambda_ * (n + 1)
+        first = N + 1 - n
+        # rho[X + 1] is still the value of the previous row when rho[X] is updated
+        for X in range(N + 1 - n):
+            cr = ((X + 1) * rho[X + 1] + (N - n - X) * rho[X] + (X + 1)) / (N - n + 1)
+            if cr >= maxreward and first > N - n:
+                first = X
+            rho[X] = max(maxreward, cr)
+        boundary[N - 1 - n] = first
+
+
+_oabKernel = _oabKernelPython if njit is None else njit(cache=False)(_oabKernelPython)
@@ -8,11 +8,9 @@ Industrial Statistics: A Computer Based Approach with Python
 '''
 from dataclasses import dataclass, field
 from enum import Enum
-from itertools import product
-from typing import List, Optional, Union, cast
+from typing import Callable, List, Optional, Tuple, Union, cast
 
 import numpy as np
-import pandas as pd
 from scipy.stats import binom, hypergeom, poisson
 
 
@@ -24,6 +22,37 @@ class OCtype(Enum):
 
 IntOrListInt = Union[int, List[int]]
 Probabilities = Optional[Union[List[float], np.ndarray]]
+StageDistribution = Callable[[int, np.ndarray, np.ndarray], np.ndarray]
+
+
+def multiStageAcceptance(c: List[int], r: List[int], pmf: StageDistribution, cdf: StageDistribution,
+                         size: int) -> np.ndarray:
+    """ Probability of acceptance of a multi-stage plan for size values of the OC parameter
+
+    The plan accepts at stage k if the cumulative number of defects is at most c[k]
+    and continues if it is between c[k] and r[k] (exclusive). The distribution of the
+    cumulative number of defects of the undecided lots is propagated from stage to
+    stage. pmf(k, x, s) and cdf(k, x, s) give the distribution of the number of
+    defects x in stage k given s defects in the previous stages; the values of the OC
+    parameter run along an additional leading axis of the result.
+    """
+    s = np.array([0])
+    f = np.ones((size, 1))
+    paccept = np.zeros(size)
+    for k, c_k in enumerate(c):
+        paccept += np.sum(f * cdf(k, c_k - s[None, :], s[None, :]), axis=1)
+        d = np.arange(c_k + 1, r[k])
+        if k == len(c) - 1 or len(d) == 0:
+            break
+        # transition from s defects to d defects
+        f = np.einsum('ms,msd->md', f, pmf(k, d[None, None, :] - s[None, :, None], s[None, :, None]))
+        s = d
+    return paccept
+
+
+def _parameter(values: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """ Reshape the OC parameter values to broadcast along the leading axis of x """
+    return np.reshape(values, (-1, *[1] * (x.ndim - 1)))
 
 
 def getDistribution(n: IntOrListInt, c: IntOrListInt, distribution: OCtype,
@@ -76,24 +105,20 @@ class OCbinomial(OCdistribution):
         if self.pd is None:
             self.pd = np.linspace(0, 1, 101)
 
-        self.paccept = np.array([self.calcBinomial(pdi, self.n, self.c, self.r) for pdi in self.pd])
-
-    def calcBinomial(self, p_d: float, n: List[int], c: List[int], r: List[int]) -> float:
-        # For each stage, find out all the possibilities which could
-        # lead to still not having made a decision and then calculate
-        # the appropriate probabilities.
-        p_acc = 0.0
-        for k in range(len(n)):
-            # Determine combinations
-            comb = [list(range(c[i] + 1, r[i])) for i in range(k)]
-            x = pd.DataFrame(list(product(*comb)))
-            # Calculate change from previous
-            x.iloc[:, 1:] = x.iloc[:, 1:].values - x.iloc[:, :-1].values
-
-            x[k] = c[k] - np.sum(cast(np.ndarray, x), axis=1)
-            for _, xi in x.iterrows():
-                p_acc += self.probAcc(xi.values, n, p_d)
-        return p_acc
+        self.paccept = self.calcBinomial(np.asarray(self.pd, dtype=float), self.n, self.c, self.r)
+
+    def calcBinomial(self, p_d: Union[float, np.ndarray], n: List[int], c: List[int],
+                     r: List[int]) -> Union[float, np.ndarray]:
+        """ Probability of acceptance for one or an array of fractions defective """
+        p_d = np.asarray(p_d, dtype=float)
+
+        def pmf(k: int, x: np.ndarray, _: np.ndarray) -> np.ndarray:
+            return cast(np.ndarray, binom.pmf(x, n[k], _parameter(p_d, x)))
+
+        def cdf(k: int, x: np.ndarray, _: np.ndarray) -> np.ndarray:
+            return cast(np.ndarray, binom.cdf(x, n[k], _parameter(p_d, x)))
+        p_acc = multiStageAcceptance(c, r, pmf, cdf, p_d.size)
+        return p_acc.reshape(p_d.shape)[()]
 
     @staticmethod
     def probAcc(x: np.ndarray, n: List[int], p: float) -> float:
@@ -124,24 +149,28 @@ class OChypergeom(OCdistribution):
             assert self.pd is not None
             self.D = [round(pdi * self.N) for pdi in self.pd]
 
-        self.paccept = np.array([self.calcHypergeom(Di, self.n, self.c, self.r, self.N) for Di in self.D])
-
-    def calcHypergeom(self, D: int, n: List[int], c: List[int], r: List[int], N: int) -> float:
-        # For each stage, find out all the possibilities which could
-        # lead to still not having made a decision and then calculate
-        # the appropriate probabilities.
-        p_acc = 0.0
-        for k, c_k in enumerate(c):
-            # Determine combinations
-            comb = [list(range(c[i] + 1, r[i])) for i in range(k)]
-            x = pd.DataFrame(list(product(*comb)))
-            # Calculate change from previous
-            x.iloc[:, 1:] = x.iloc[:, 1:].values - x.iloc[:, :-1].values
-
-            x[k] = c_k - np.sum(cast(np.ndarray, x), axis=1)
-            for _, xi in x.iterrows():
-                p_acc += self.probAcc(xi.values, n, N, D)
-        return p_acc
+        self.paccept = self.calcHypergeom(np.asarray(self.D), self.n, self.c, self.r, self.N)
+
+    def calcHypergeom(self, D: Union[int, np.ndarray], n: List[int], c: List[int], r: List[int],
+                      N: int) -> Union[float, np.ndarray]:
+        """ Probability of acceptance for one or an array of numbers of defects in the lot
+
+        Stage k samples without replacement from the N - (n[0] + ... + n[k-1]) items
+        and D - s defects that remain after s defects were found in previous stages.
+        """
+        D = np.round(np.asarray(D, dtype=float))
+        remaining = N - np.cumsum([0, *n])
+
+        def parameters(k: int, x: np.ndarray, s: np.ndarray) -> Tuple[int, np.ndarray, int]:
+            return remaining[k], np.maximum(0, _parameter(D, x) - s), n[k]
+
+        def pmf(k: int, x: np.ndarray, s: np.ndarray) -> np.ndarray:
+            return cast(np.ndarray, hypergeom.pmf(x, *parameters(k, x, s)))
+
+        def cdf(k: int, x: np.ndarray, s: np.ndarray) -> np.ndarray:
+            return cast(np.ndarray, hypergeom.cdf(x, *parameters(k, x, s)))
+        p_acc = multiStageAcceptance(c, r, pmf, cdf, D.size)
+        return p_acc.reshape(D.shape)[()]
 
     @staticmethod
     def probAcc(x: np.ndarray, n: List[int], N: int, D: int) -> float:
@@ -170,23 +199,23 @@ class OCpoisson(OCdistribution):
         if self.pd is None:
             self.pd = np.linspace(0, 1, 101)
 
-        self.paccept = np.array([self.calcPoisson(pdi, self.n, self.c, self.r) for pdi in self.pd])
-
-    def calcPoisson(self, p_d: float, n: List[int], c: List[int], r: List[int]) -> float:
-        # For each stage, find out all the possibilities which could
-        # lead to still not having made a decision and then calculate
-        # the appropriate probabilities.
-        p_acc = 0.0
-        for k in range(len(n)):
-            # Determine combinations
-            comb = [list(range(c[i] + 1, r[i])) for i in range(k)]
-            x = pd.DataFrame(list(product(*comb)))
-            # Calculate change from previous
-            x.iloc[:, 1:] = x.iloc[:, 1:].values - x.iloc[:, :-1].values
-            x[k] = c[k] - np.sum(cast(np.ndarray, x), axis=1)
-            for _, xi in x.iterrows():
-                p_acc += self.probAcc(xi.values, n, p_d)
-        return p_acc
+        self.paccept = self.calcPoisson(np.asarray(self.pd, dtype=float), self.n, self.c, self.r)
+
+    def calcPoisson(self, p_d: Union[float, np.ndarray], n: List[int], c: List[int],
+                    r: List[int]) -> Union[float, np.ndarray]:
+        """ Probability of acceptance for one or an array of defect rates
+
+        As in probAcc, the mean number of defects of the accepting stage is rounded.
+        """
+        p_d = np.asarray(p_d, dtype=float)
+
+        def pmf(k: int, x: np.ndarray, _: np.ndarray) -> np.ndarray:
+            return cast(np.ndarray, poisson.pmf(x, n[k] * _parameter(p_d, x)))
+
+        def cdf(k: int, x: np.ndarray, _: np.ndarray) -> np.ndarray:
+            return cast(np.ndarray, poisson.cdf(x, np.floor(n[k] * _parameter(p_d, x) + 0.5)))
+        p_acc = multiStageAcceptance(c, r, pmf, cdf, p_d.size)
+        return p_acc.reshape(p_d.shape)[()]
 
     @ staticmethod
     def probAcc(x: np.ndarray, n: List[int], p: float) -> float:
@@ -5,13 +5,15 @@ Industrial Statistics: A Computer Based Approach with Python
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from scipy import stats
 
+from .dodge_sequential import DefectLattice
+
 # R: dodge.CurtBinomial
 
 
@@ -44,6 +46,39 @@ def curtailedBinomial(n, Ac, p=None):
     return CurtailedSamplePlan(ASNsemi=ASNsemi, ASNfull=ASNfull, p=p, n=n)
 
 
+def curtailedHypergeom(N, n, Ac, p=None):
+    """ ASN and OC of curtailed single sampling from a lot of size N
+
+    The lot contains round(p N) defects. Semi-curtailed inspection stops as soon as
+    the lot is rejected (Ac + 1 defects); fully curtailed inspection also stops as
+    soon as the lot is accepted (n - Ac non-defective items). The ASN is computed
+    exactly by propagating the number of defects item by item for all distinct
+    numbers of defects in the lot at once.
+    """
+    p = np.asarray(p if p is not None else np.arange(0, 0.5, 0.01), dtype=float)
+    lattice = DefectLattice(p, 'hypergeom', N)
+    OC, ASNsemi = _curtailedInspection(lattice, n, Ac, full=False)
+    _, ASNfull = _curtailedInspection(lattice, n, Ac, full=True)
+    return CurtailedSamplePlan(ASNsemi=lattice.expand(ASNsemi), ASNfull=lattice.expand(ASNfull), p=p, n=n,
+                               oc_type='hypergeom', OC=lattice.expand(OC))
+
+
+def _curtailedInspection(lattice, n, Ac, full):
+    d = np.arange(Ac + 2)
+    prob = np.zeros((len(lattice.values), len(d)))
+    prob[:, 0] = 1
+    OC = np.zeros(len(prob))
+    ASN = np.zeros(len(prob))
+    for k in range(1, n + 1):
+        ASN += np.sum(prob, axis=1)
+        prob = lattice.step(prob, k)
+        accepted = (d <= Ac) & ((k - d >= n - Ac) if full else (k == n))
+        OC += np.sum(prob[:, accepted], axis=1)
+        prob[:, accepted] = 0
+        prob[:, Ac + 1] = 0
+    return OC, ASN
+
+
 @dataclass
 class CurtailedSamplePlan:
     p: List[float]
@@ -52,13 +87,17 @@ class CurtailedSamplePlan:
     n: int
 
     oc_type: str = 'binomial'
+    OC: Optional[List[float]] = None
 
     def __repr__(self):
-        return str(pd.DataFrame({
+        df = pd.DataFrame({
             'p': self.p,
             'ASNsemi': self.ASNsemi,
             'ASNfull': self.ASNfull,
-        }))
+        })
+        if self.OC is not None:
+            df['OC'] = self.OC
+        return str(df)
 
     def plot(self, ax=None):
         if ax is None:
@@ -0,0 +1,275 @@
+# pylint: disable=too-many-arguments,too-many-locals,too-many-instance-attributes
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Evaluation of families of single and double sampling plans
+
+A single sampling plan (n, Ac) is evaluated as the double sampling plan with
+n1 = n, n2 = 0, Ac1 = Ac2 = Ac, and Re1 = Ac + 1. The characteristics of all plans
+are computed at once as arrays of shape (plans, len(p)).
+'''
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from mistat.acceptanceSampling.generic import findPlan, findSmallestN
+
+from .dodge_base import AcceptanceSamplingPlan
+
+DISTRIBUTIONS = ('binomial', 'poisson', 'hypergeom')
+PLAN_COLUMNS = ['n1', 'n2', 'Ac1', 'Re1', 'Ac2']
+
+DoublePlan = namedtuple('DoublePlan', 'n1,n2,Ac1,Re1,Ac2,value')
+
+
+@dataclass
+class PlanFamily:
+    """ OC, AOQ, ATI, and ASN of a family of sampling plans
+
+    The rows of plans are the plan parameters n1, n2, Ac1, Re1, Ac2; the
+    characteristics are arrays of shape (plans, len(p)).
+    """
+    N: int
+    distribution: str
+    plans: pd.DataFrame
+    p: np.ndarray
+    OC: np.ndarray
+    AOQ: np.ndarray
+    ATI: np.ndarray
+    ASN: np.ndarray
+    Pa1: np.ndarray
+    Pa2: np.ndarray
+
+    def _parameters(self):
+        return tuple(self.plans[column].values for column in PLAN_COLUMNS)
+
+    @property
+    def AOQL(self):
+        return np.max(self.AOQ, axis=1)
+
+    def paccept(self, p):
+        """ Probability of acceptance of all plans at the fractions defective p """
+        return _characteristics(self.distribution, self.N, self._parameters(), p)['OC']
+
+    def meetsRiskPoints(self, PRP, CRP):
+        """ Plans with OC(PRP[0]) >= PRP[1] and OC(CRP[0]) <= CRP[1] """
+        OC = self.paccept([PRP[0], CRP[0]])
+        return (OC[:, 0] >= PRP[1]) & (OC[:, 1] <= CRP[1])
+
+    def bestPlan(self, PRP, CRP, criterion='ASN'):
+        """ Index of the plan with the smallest criterion among the plans meeting the risk points
+
+        criterion is 'ASN' (maximum ASN over p), 'ATI' (ATI at the producer risk
+        point), or 'AOQL'. Raises ValueError if no plan meets the risk points.
+        """
+        if criterion == 'ASN':
+            values = np.max(self.ASN, axis=1)
+        elif criterion == 'ATI':
+            values = _characteristics(self.distribution, self.N, self._parameters(), [PRP[0]])['ATI'][:, 0]
+        elif criterion == 'AOQL':
+            values = self.AOQL
+        else:
+            raise ValueError(f"criterion '{criterion}' is not supported; use 'ASN', 'ATI', or 'AOQL'")
+        values = np.where(self.meetsRiskPoints(PRP, CRP), values, np.inf)
+        if np.isinf(np.min(values)):
+            raise ValueError('no plan meets the risk points')
+        return int(np.argmin(values))
+
+    def plan(self, index):
+        """ Return the characteristics of a single plan as AcceptanceSamplingPlan """
+        return AcceptanceSamplingPlan(p=self.p, OC=self.OC[index], AOQ=self.AOQ[index], ATI=self.ATI[index],
+                                      ASN=self.ASN[index], Pa1=self.Pa1[index], Pa2=self.Pa2[index])
+
+
+def SSPlanFamily(N, n, Ac, p=None, distribution='binomial'):
+    """ Evaluate the single sampling plans (n, Ac); n and Ac are broadcast against each other """
+    n, Ac = (np.ravel(v) for v in np.broadcast_arrays(n, Ac))
+    return _planFamily(N, n, np.zeros_like(n), Ac, Ac + 1, Ac,
+                       np.arange(0, 0.3, 0.001) if p is None else p, distribution)
+
+
+def DSPlanFamily(N, n1, n2, Ac1, Re1, Ac2, p=None, distribution='binomial'):
+    """ Evaluate the double sampling plans (n1, n2, Ac1, Re1, Ac2); the parameters are broadcast """
+    parameters = (np.ravel(v) for v in np.broadcast_arrays(n1, n2, Ac1, Re1, Ac2))
+    return _planFamily(N, *parameters, np.arange(0, 0.255, 0.005) if p is None else p, distribution)
+
+
+def DSPDesign(AQL, alpha, LQL, beta, distribution='binomial', N=None, criterion='ASN', max_c=None,
+              n_jobs=None):
+    """ Design the double sampling plan (n1, n2, Ac1, Re1, Ac2) with the smallest maximum ASN
+    (criterion='ASN') or ATI at the AQL (criterion='ATI') that meets the risk points
+    (AQL, 1 - alpha) and (LQL, beta)
+
+    The search starts from the single sampling plan for the risk points, i.e. the double
+    plan with n2 = 0, and considers acceptance and rejection numbers up to max_c
+    (default 2 Ac + 2 of the single plan). It is pruned using monotonicity:
+
+    - the OC is at least P(D1 <= Ac1), so n1 must be large enough for the first sample
+      alone to meet the consumer risk point; as ASN >= n1, n1 must also be smaller
+      than the best value found so far (for criterion='ASN')
+    - the OC decreases and the ASN increases with n2; the smallest n2 that meets the
+      consumer risk point is found by bisection for all n1 at once and is the only
+      candidate that needs to be checked against the producer risk point
+
+    The combinations of acceptance and rejection numbers are split across n_jobs
+    processes. N is required for the hypergeometric distribution and for
+    criterion='ATI'. Returns a DoublePlan with the value of the criterion.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution '{distribution}' is not supported; use one of {DISTRIBUTIONS}")
+    if criterion not in ('ASN', 'ATI'):
+        raise ValueError(f"criterion '{criterion}' is not supported; use 'ASN' or 'ATI'")
+    if N is None and (distribution == 'hypergeom' or criterion == 'ATI'):
+        raise ValueError('N must be provided for the hypergeometric distribution and the ATI criterion')
+
+    single = findPlan(PRP=(AQL, 1 - alpha), CRP=(LQL, beta), oc_type=distribution, N=N)
+    plan = (single.n, 0, single.c, single.r, single.c)
+    design = (AQL, alpha, LQL, beta, distribution, N, criterion)
+    best = (_criterionValues(design, *(np.array([v]) for v in plan))[0], plan)
+
+    max_c = 2 * single.c + 2 if max_c is None else max_c
+    combinations = [(Ac1, Re1, Ac2) for Ac1 in range(max_c) for Ac2 in range(Ac1 + 1, max_c + 1)
+                    for Re1 in range(Ac1 + 2, Ac2 + 2)]
+    if n_jobs is None or n_jobs == 1:
+        results = [_searchDoublePlans(combinations, design, best)]
+    else:
+        n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(_searchDoublePlans, combinations[i::n_jobs], design, best)
+                       for i in range(n_jobs)]
+            results = [future.result() for future in futures]
+    value, plan = min([best, *results])
+    return DoublePlan(*(int(v) for v in plan), value=float(value))
+
+
+def _searchDoublePlans(combinations, design, best):
+    """ Best plan for the given combinations of (Ac1, Re1, Ac2) that improves on best
+
+    Both criteria are at least n1, so n1 is smaller than the best value found so far;
+    n2 is at most the sample size of the single sampling plan (and N - n1).
+    """
+    AQL, alpha, LQL, beta, distribution, N, _ = design
+    _, cdf = _stageDistribution(distribution, N, LQL)
+
+    def paccept(p, n1, n2, Ac1, Re1, Ac2):
+        return _characteristics(distribution, N, (n1, n2, Ac1, Re1, Ac2), [p])['OC'][:, 0]
+
+    singleN = best[1][0]
+    for Ac1, Re1, Ac2 in combinations:
+        nmax = int(np.ceil(best[0])) - 1
+        if nmax <= Ac1:
+            continue
+        # the first sample alone must meet the consumer risk point
+        try:
+            nmin = findSmallestN(lambda n, Ac1=Ac1: cdf(Ac1, n, 0, 0) <= beta, lower=Ac1 + 1, upper=nmax)
+        except ValueError:
+            continue
+        n1 = np.arange(nmin, nmax + 1)
+        high = np.full(len(n1), singleN) if N is None else np.minimum(singleN, N - n1)
+
+        # smallest n2 meeting the consumer risk point, bisected for all n1 at once
+        feasible = (high > 0) & (paccept(LQL, n1, high, Ac1, Re1, Ac2) <= beta)
+        if not feasible.any():
+            continue
+        n1, high = n1[feasible], high[feasible]
+        low = np.zeros(len(n1), dtype=int)
+        while np.any(high - low > 1):
+            mid = (low + high) // 2
+            meets = paccept(LQL, n1, mid, Ac1, Re1, Ac2) <= beta
+            high, low = np.where(meets, mid, high), np.where(meets, low, mid)
+
+        producer = paccept(AQL, n1, high, Ac1, Re1, Ac2) >= 1 - alpha
+        if not producer.any():
+            continue
+        n1, n2 = n1[producer], high[producer]
+        values = _criterionValues(design, n1, n2, Ac1, Re1, Ac2)
+        index = np.argmin(values)
+        candidate = (values[index], (int(n1[index]), int(n2[index]), Ac1, Re1, Ac2))
+        best = min(best, candidate)
+    return best
+
+
+def _criterionValues(design, n1, n2, Ac1, Re1, Ac2):
+    """ Maximum ASN or ATI at the AQL of the plans """
+    AQL, _, _, _, distribution, N, criterion = design
+    if criterion == 'ATI':
+        return _characteristics(distribution, N, (n1, n2, Ac1, Re1, Ac2), [AQL])['ATI'][:, 0]
+    n1, n2, Ac1, Re1 = (v[:, None] for v in np.broadcast_arrays(n1, n2, Ac1, Re1))
+    # P(Ac1 < D1 < Re1) is largest for n1 p between Ac1 and Re1
+    p = np.linspace(0, 1, 401)[None, :] * 2 * Re1 / n1
+    if distribution != 'poisson':
+        p = np.minimum(p, 1)
+    _, cdf = _stageDistribution(distribution, N, p)
+    ASN = n1 + n2 * (cdf(Re1 - 1, n1, 0, 0) - cdf(Ac1, n1, 0, 0))
+    return np.max(ASN, axis=1)
+
+
+def _planFamily(N, n1, n2, Ac1, Re1, Ac2, p, distribution):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution '{distribution}' is not supported; use one of {DISTRIBUTIONS}")
+    plans = pd.DataFrame(dict(zip(PLAN_COLUMNS, (n1, n2, Ac1, Re1, Ac2))))
+    p = np.asarray(p, dtype=float)
+    return PlanFamily(N=N, distribution=distribution, plans=plans, p=p,
+                      **_characteristics(distribution, N, (n1, n2, Ac1, Re1, Ac2), p))
+
+
+def _stageDistribution(distribution, N, p):
+    """ pmf and cdf of the number of defects in a sample of size n
+
+    previous_n and previous_d are the size and the number of defects of the previous
+    samples; they matter only for sampling without replacement.
+    """
+    if distribution == 'binomial':
+        def pmf(x, n, _n, _d):
+            return stats.binom.pmf(x, n, p)
+
+        def cdf(x, n, _n, _d):
+            return stats.binom.cdf(x, n, p)
+    elif distribution == 'poisson':
+        def pmf(x, n, _n, _d):
+            return stats.poisson.pmf(x, n * p)
+
+        def cdf(x, n, _n, _d):
+            return stats.poisson.cdf(x, n * p)
+    else:
+        D = np.round(p * N)
+
+        def pmf(x, n, previous_n, previous_d):
+            return stats.hypergeom.pmf(x, N - previous_n, D - previous_d, n)
+
+        def cdf(x, n, previous_n, previous_d):
+            return stats.hypergeom.cdf(x, N - previous_n, D - previous_d, n)
+    return pmf, cdf
+
+
+def _characteristics(distribution, N, parameters, p):
+    """ Characteristics of the plans given by the arrays (n1, n2, Ac1, Re1, Ac2)
+
+    AOQ and ATI are None if the lot size N is None.
+    """
+    p = np.asarray(p, dtype=float)[None, :]
+    n1, n2, Ac1, Re1, Ac2 = (v[:, None] for v in np.broadcast_arrays(*(np.atleast_1d(v) for v in parameters)))
+    pmf, cdf = _stageDistribution(distribution, N, p)
+
+    Pa1 = cdf(Ac1, n1, 0, 0)
+    # sum over the number of defects d1 in the first sample that lead to a second sample
+    d1 = np.arange(np.max(Re1))[None, :, None]
+    secondSample = (Ac1[:, :, None] < d1) & (d1 < Re1[:, :, None])
+    Pa2_d1 = pmf(d1, n1[:, :, None], 0, 0) * cdf(Ac2[:, :, None] - d1, n2[:, :, None], n1[:, :, None], d1)
+    Pa2 = np.sum(np.where(secondSample, np.nan_to_num(Pa2_d1), 0), axis=1)
+
+    OC = Pa1 + Pa2
+    ASN = n1 + n2 * (cdf(Re1 - 1, n1, 0, 0) - Pa1)
+    AOQ = ATI = None
+    if N is not None:
+        AOQ = (p * Pa1 * (N - n1) + p * Pa2 * (N - n1 - n2)) / N
+        ATI = n1 * Pa1 + (n1 + n2) * Pa2 + (1 - OC) * N
+    return {'OC': OC, 'AOQ': AOQ, 'ATI': ATI, 'ASN': ASN, 'Pa1': Pa1, 'Pa2': Pa2}
@@ -6,7 +6,7 @@ Industrial Statistics: A Computer Based Approach with Python
 '''
 import numpy as np
 
-from .dodge_base import SequentialSamplePlan
+from .dodge_base import AcceptanceSamplingPlan, SequentialSamplePlan
 
 
 def sequentialDesign(AQL, alpha, LQL, beta, oc_type='binomial', N=None):
@@ -36,3 +36,142 @@ def sequentialDesign(AQL, alpha, LQL, beta, oc_type='binomial', N=None):
 
     return SequentialSamplePlan(AQL=AQL, alpha=alpha, LQL=LQL, beta=beta, N=N, oc_type=oc_type, h1=h1, h2=h2, s=s,
                                 h=h, k=k, accept=accept, reject=reject, p=p)
+
+
+class SequentialDecider:
+    """ Sequential probability ratio test of a sequential sampling plan for many lots
+
+    After k items, a lot is accepted if the number of defects d_k <= s k - h1 and
+    rejected if d_k >= s k + h2. The test is truncated after truncation items
+    (default three times the maximum ASN of the plan); there the lot is accepted if
+    d_k is on or below the line midway between the acceptance and rejection lines.
+
+    decision is 1 for accepted, -1 for rejected, and 0 for lots that are still
+    being inspected.
+    """
+    ACCEPT = 1
+    REJECT = -1
+    CONTINUE = 0
+
+    def __init__(self, plan, lots=1, truncation=None):
+        self.plan = plan
+        self.truncation = sequentialTruncation(plan) if truncation is None else truncation
+        self.n = np.zeros(lots, dtype=int)
+        self.d = np.zeros(lots, dtype=int)
+        self.decision = np.zeros(lots, dtype=int)
+
+    def update(self, results, lots=None):
+        """ Add inspection results (1 for defective) of the lots
+
+        results has one row per lot with the results of one or more items in the
+        order of inspection. lots are the indices of the lots (default all lots).
+        Results for lots that are already decided, or that come after the
+        decision, are ignored. Returns the decisions of all lots.
+        """
+        lots = np.arange(len(self.decision)) if lots is None else np.asarray(lots)
+        results = np.asarray(results, dtype=int).reshape(len(lots), -1)
+        undecided = self.decision[lots] == self.CONTINUE
+        lots, results = lots[undecided], results[undecided]
+
+        n = self.n[lots, None] + np.arange(1, results.shape[1] + 1)
+        d = self.d[lots, None] + np.cumsum(results, axis=1)
+        decision = _sprtDecision(self.plan, n, d, self.truncation)
+        decided = decision != self.CONTINUE
+        # state at the decision or after the last item
+        last = np.where(decided.any(axis=1), np.argmax(decided, axis=1), results.shape[1] - 1)
+        rows = np.arange(len(lots))
+        self.n[lots] = n[rows, last]
+        self.d[lots] = d[rows, last]
+        self.decision[lots] = decision[rows, last]
+        return self.decision
+
+
+def sequentialTruncation(plan):
+    """ Default truncation of the SPRT: three times the maximum ASN of the plan (at most N) """
+    truncation = int(3 * np.ceil(np.nanmax(plan.ASN)))
+    return truncation if plan.oc_type != 'hypergeom' else min(truncation, plan.N)
+
+
+def sequentialOC(plan, p=None, truncation=None):
+    """ Exact OC, ASN, AOQ, and ATI of the truncated SPRT
+
+    The distribution of the number of defects among the lots that are still being
+    inspected is propagated item by item. Lots are removed when they cross the
+    acceptance or rejection line, so no approximation is involved other than the
+    truncation (see SequentialDecider). p defaults to the fractions defective of
+    the plan; ATI requires the lot size N of the plan.
+
+    For plans with oc_type='hypergeom', items are drawn without replacement from a
+    lot of size N with round(p N) defects.
+    """
+    truncation = sequentialTruncation(plan) if truncation is None else truncation
+    p = np.asarray(plan.p if p is None else p, dtype=float)
+    lattice = DefectLattice(p, plan.oc_type, plan.N)
+    if plan.oc_type == 'hypergeom':
+        truncation = min(truncation, plan.N)
+    # lots with more defects are always rejected
+    d = np.arange(int(np.ceil(plan.s * truncation + plan.h2)) + 1)
+    prob = np.zeros((len(lattice.values), len(d)))
+    prob[:, 0] = 1
+    OC = np.zeros(len(prob))
+    ASN = np.zeros(len(prob))
+    acceptedItems = np.zeros(len(prob))
+    for k in range(1, truncation + 1):
+        ASN += np.sum(prob, axis=1)
+        prob = lattice.step(prob, k)
+        decision = _sprtDecision(plan, k, d, truncation)
+        accepted = np.sum(prob[:, decision == SequentialDecider.ACCEPT], axis=1)
+        OC += accepted
+        acceptedItems += k * accepted
+        prob[:, decision != SequentialDecider.CONTINUE] = 0
+    OC, ASN, acceptedItems = (lattice.expand(v) for v in (OC, ASN, acceptedItems))
+    ATI = None if plan.N is None else acceptedItems + (1 - OC) * plan.N
+    return AcceptanceSamplingPlan(p=p, OC=OC, AOQ=p * OC, ASN=ASN, ATI=ATI)
+
+
+class DefectLattice:
+    """ Item by item propagation of the distribution of the number of defects
+
+    For oc_type='binomial', every item is defective with probability p. For
+    oc_type='hypergeom', the k-th item of a lot with D = round(p N) defects is
+    defective with probability (D - d) / (N - k + 1) given d defects in the previous
+    items. The lattice is computed once for every distinct D, so a grid of p values
+    is evaluated in a single sweep; expand maps the results back to p.
+    """
+
+    def __init__(self, p, oc_type='binomial', N=None):
+        if oc_type == 'hypergeom':
+            if N is None:
+                raise ValueError('N is required for the hypergeometric distribution')
+            self.values, self.index = np.unique(np.round(np.asarray(p) * N), return_inverse=True)
+        elif oc_type == 'binomial':
+            self.values, self.index = np.asarray(p, dtype=float), None
+        else:
+            raise ValueError(f"oc_type '{oc_type}' is not supported; use 'binomial' or 'hypergeom'")
+        self.oc_type = oc_type
+        self.N = N
+
+    def defectProbability(self, k, d):
+        """ Probability that item k is defective given d defects in the previous items """
+        if self.oc_type == 'binomial':
+            return np.broadcast_to(self.values[:, None], (len(self.values), len(d)))
+        return np.clip((self.values[:, None] - d) / (self.N - k + 1), 0, 1)
+
+    def step(self, prob, k):
+        """ Distribution after item k from the distribution prob over d = 0, 1, ... after item k - 1 """
+        q = self.defectProbability(k, np.arange(prob.shape[1])) * prob
+        result = prob - q
+        result[:, 1:] += q[:, :-1]
+        return result
+
+    def expand(self, values):
+        return values if self.index is None else values[self.index]
+
+
+def _sprtDecision(plan, n, d, truncation):
+    n, d = np.broadcast_arrays(n, d)
+    decision = np.where(d <= plan.s * n - plan.h1, SequentialDecider.ACCEPT,
+                        np.where(d >= plan.s * n + plan.h2, SequentialDecider.REJECT, SequentialDecider.CONTINUE))
+    midline = plan.s * n + (plan.h2 - plan.h1) / 2
+    truncated = np.where(d <= midline, SequentialDecider.ACCEPT, SequentialDecider.REJECT)
+    return np.where(n >= truncation, truncated, decision)
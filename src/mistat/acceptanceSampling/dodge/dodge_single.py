@@ -6,7 +6,9 @@ Industrial Statistics: A Computer Based Approach with Python
 '''
 import numpy as np
 import pandas as pd
-from scipy import stats
+from scipy import special, stats
+
+from mistat.acceptanceSampling.generic import findSmallestN
 
 from .dodge_base import AcceptanceSamplingPlan
 
@@ -56,40 +58,25 @@ def SSPlanPoisson(N, n, Ac, p=None):
 # ' @param beta consumers' risk
 
 def SSPDesignBinomial(AQL, alpha, LQL, beta):
-    def nl(Ac, LQL, beta):
-        n = 1
-        while stats.binom(n, LQL).cdf(Ac) >= beta:
-            n += 1
-        return n
-
-    def nu(Ac, AQL, alpha):
-        n = 1
-        while stats.binom(n, AQL).cdf(Ac) >= 1 - alpha:
-            n += 1
-        return n
-
-    Ac = 0
-    while nl(Ac, LQL, beta) > nu(Ac, AQL, alpha):
-        Ac += 1
-    n = nl(Ac, LQL, beta)
-    return pd.Series({'n': n, 'Ac': Ac})
+    return _SSPDesign(lambda n, Ac, p: special.bdtr(Ac, n, p), AQL, alpha, LQL, beta)
 
 
 def SSPDesignPoisson(AQL, alpha, LQL, beta):
-    def nl(Ac, LQL, beta):
-        n = 1
-        while stats.poisson(n * LQL).cdf(Ac) >= beta:
-            n += 1
-        return n
-
-    def nu(Ac, AQL, alpha):
-        n = 1
-        while stats.poisson(n * AQL).cdf(Ac) >= 1 - alpha:
-            n += 1
-        return n
+    return _SSPDesign(lambda n, Ac, p: special.pdtr(Ac, n * p), AQL, alpha, LQL, beta)
+
+
+def _SSPDesign(oc, AQL, alpha, LQL, beta):
+    """ Smallest Ac for which the sample size required for the LQL does not exceed the
+    sample size at which the AQL is violated
 
+    Both sample sizes increase with Ac; they are found by bisection, starting from
+    the values for the previous Ac.
+    """
     Ac = 0
-    while nl(Ac, LQL, beta) > nu(Ac, AQL, alpha):
+    nl = findSmallestN(lambda n: oc(n, Ac, LQL) < beta)
+    nu = findSmallestN(lambda n: oc(n, Ac, AQL) < 1 - alpha)
+    while nl > nu:
         Ac += 1
-    n = nl(Ac, LQL, beta)
-    return pd.Series({'n': n, 'Ac': Ac})
+        nl = findSmallestN(lambda n, Ac=Ac: oc(n, Ac, LQL) < beta, lower=nl)
+        nu = findSmallestN(lambda n, Ac=Ac: oc(n, Ac, AQL) < 1 - alpha, lower=nu)
+    return pd.Series({'n': nl, 'Ac': Ac})
@@ -17,6 +17,9 @@ from mistat.acceptanceSampling.dodge.dodge_double import (DSPlanBinomial,
                                                           DSPlanHypergeom,
                                                           DSPlanNormal,
                                                           DSPlanPoisson)
+from mistat.acceptanceSampling.dodge.dodge_family import (DSPDesign,
+                                                          DSPlanFamily,
+                                                          SSPlanFamily)
 from mistat.acceptanceSampling.dodge.dodge_other import (
     VSPDesign, lotSensitiveComplianceSampPlan, variableSampPlanKnown,
     variableSampPlanUnknown)
@@ -193,3 +196,74 @@ class TestDodge(unittest.TestCase):
         assert result['k'] == pytest.approx(2.038517)
         assert result['n'] == 33
         assert result['n_unknown'] == pytest.approx(101.566599)
+
+    def test_SSPlanFamily(self):
+        n = np.arange(10, 101, 10)
+        Ac = np.arange(0, 5)
+        family = SSPlanFamily(1000, n[:, None], Ac[None, :], p=(0, 0.05, 0.1, 0.15, 0.2, 0.25))
+        assert family.OC.shape == (50, 6)
+        assert len(family.plans) == 50
+        row = np.nonzero((family.plans.n1 == 20) & (family.plans.Ac1 == 1))[0][0]
+        single = SSPlanBinomial(1000, 20, 1, p=family.p)
+        np.testing.assert_array_almost_equal(family.OC[row], single.OC)
+        np.testing.assert_array_almost_equal(family.AOQ[row], single.AOQ)
+        np.testing.assert_array_almost_equal(family.ATI[row], single.ATI)
+        np.testing.assert_array_almost_equal(family.ASN[row], [20] * 6)
+        assert family.AOQL[row] == pytest.approx(np.max(single.AOQ))
+
+        for distribution, function in [('poisson', SSPlanPoisson), ('hypergeom', SSPlanHyper)]:
+            family = SSPlanFamily(1000, 20, [1, 2], distribution=distribution)
+            np.testing.assert_array_almost_equal(family.OC[1], function(1000, 20, 2).OC)
+
+    def test_DSPlanFamily(self):
+        n1 = np.arange(10, 110, 10)
+        family = DSPlanFamily(1000, n1[:, None, None], n1[None, :, None], 0, 3, np.arange(2, 6)[None, None, :])
+        assert family.OC.shape == (400, 51)
+        for index in [0, 123, 399]:
+            plan = family.plans.iloc[index]
+            expected = DSPlanBinomial(1000, plan.n1, plan.n2, plan.Ac1, plan.Re1, plan.Ac2)
+            np.testing.assert_array_almost_equal(family.OC[index], expected.OC)
+            np.testing.assert_array_almost_equal(family.ASN[index], expected.ASN)
+
+        PRP, CRP = (0.01, 0.95), (0.06, 0.1)
+        meets = family.meetsRiskPoints(PRP, CRP)
+        best = family.bestPlan(PRP, CRP)
+        assert meets[best]
+        maxASN = np.max(family.ASN, axis=1)
+        assert maxASN[best] == np.min(maxASN[meets])
+        OC = family.paccept([PRP[0], CRP[0]])[best]
+        assert OC[0] >= PRP[1]
+        assert OC[1] <= CRP[1]
+        assert family.meetsRiskPoints(PRP, CRP)[family.bestPlan(PRP, CRP, criterion='ATI')]
+
+        with pytest.raises(ValueError):
+            family.bestPlan((0.01, 0.99), (0.012, 0.01))
+        with pytest.raises(ValueError):
+            family.bestPlan(PRP, CRP, criterion='other')
+        with pytest.raises(ValueError):
+            DSPlanFamily(1000, 20, 20, 0, 3, 3, distribution='other')
+
+    def test_DSPDesign(self):
+        PRP, CRP = (0.01, 0.95), (0.05, 0.1)
+        plan = DSPDesign(0.01, 0.05, 0.05, 0.1)
+        assert plan == (87, 57, 1, 4, 3, pytest.approx(114.163346))
+        family = DSPlanFamily(None, *plan[:5], p=np.linspace(0, 0.2, 2001))
+        assert family.meetsRiskPoints(PRP, CRP)[0]
+        assert np.max(family.ASN) == pytest.approx(plan.value, rel=1e-3)
+        # smaller than the sample size of the single sampling plan n=132
+        assert plan.value < 132
+
+        assert DSPDesign(0.01, 0.05, 0.05, 0.1, n_jobs=2) == plan
+
+        # compare to an exhaustive search on a small problem
+        plan = DSPDesign(0.02, 0.05, 0.15, 0.1, criterion='ATI', N=100)
+        assert plan == (16, 25, 0, 3, 2, pytest.approx(25.204907))
+        plan = DSPDesign(0.02, 0.05, 0.15, 0.1, distribution='hypergeom', N=60)
+        assert plan == (15, 8, 0, 2, 1, pytest.approx(18.491956))
+
+        with pytest.raises(ValueError):
+            DSPDesign(0.01, 0.05, 0.05, 0.1, criterion='ATI')
+        with pytest.raises(ValueError):
+            DSPDesign(0.01, 0.05, 0.05, 0.1, distribution='hypergeom')
+        with pytest.raises(ValueError):
+            DSPDesign(0.01, 0.05, 0.05, 0.1, criterion='AOQL')
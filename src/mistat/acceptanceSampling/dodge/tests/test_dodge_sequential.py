@@ -0,0 +1,115 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from mistat.acceptanceSampling.dodge.dodge_curtailed import (
+    _curtailedInspection, curtailedBinomial, curtailedHypergeom)
+from mistat.acceptanceSampling.dodge.dodge_sequential import (
+    DefectLattice, SequentialDecider, sequentialDesign, sequentialOC,
+    sequentialTruncation)
+
+
+class TestDodgeSequential(unittest.TestCase):
+    def test_sequentialOC(self):
+        plan = sequentialDesign(AQL=0.01, alpha=0.05, LQL=0.05, beta=0.05)
+        assert sequentialTruncation(plan) == 402
+        exact = sequentialOC(plan)
+        assert len(exact.OC) == len(plan.p)
+        assert exact.ATI is None
+        # Wald's approximations ignore the overshoot of the boundaries
+        np.testing.assert_allclose(exact.OC, plan.OC, atol=0.06)
+        assert np.all(exact.ASN > plan.ASN - 1)
+        assert np.max(exact.ASN) == pytest.approx(152.761207)
+
+        exact = sequentialOC(plan, p=[0.01, 0.05])
+        np.testing.assert_array_almost_equal(exact.OC, [0.971014, 0.050848])
+        np.testing.assert_array_almost_equal(exact.ASN, [112.349757, 78.531428])
+
+        # without truncation effect, the exact OC changes very little
+        assert sequentialOC(plan, p=[0.01], truncation=1000).OC[0] == pytest.approx(0.971, abs=0.001)
+
+        plan = sequentialDesign(AQL=0.01, alpha=0.05, LQL=0.05, beta=0.05, N=1000)
+        exact = sequentialOC(plan, p=[0, 1])
+        np.testing.assert_array_almost_equal(exact.OC, [1, 0])
+        np.testing.assert_array_almost_equal(exact.ATI, [72, 1000])
+
+    def test_SequentialDecider(self):
+        plan = sequentialDesign(AQL=0.01, alpha=0.05, LQL=0.05, beta=0.05)
+        rng = np.random.default_rng(1)
+        decider = SequentialDecider(plan, lots=10_000)
+        while (decider.decision == SequentialDecider.CONTINUE).any():
+            decider.update(rng.random((10_000, 16)) < 0.03)
+        assert np.all(decider.n <= decider.truncation)
+        exact = sequentialOC(plan, p=[0.03])
+        assert np.mean(decider.decision == SequentialDecider.ACCEPT) == pytest.approx(exact.OC[0], abs=0.015)
+        assert np.mean(decider.n) == pytest.approx(exact.ASN[0], abs=2)
+
+        # item-by-item and batch updates give the same decisions
+        results = rng.random((50, 300)) < 0.03
+        batch = SequentialDecider(plan, lots=50)
+        batch.update(results)
+        single = SequentialDecider(plan, lots=50)
+        for item in results.T:
+            single.update(item)
+        np.testing.assert_array_equal(single.decision, batch.decision)
+        np.testing.assert_array_equal(single.n, batch.n)
+
+        # lots can be updated separately
+        decider = SequentialDecider(plan, lots=3)
+        decider.update(np.zeros((2, 72)), lots=[0, 2])
+        np.testing.assert_array_equal(decider.decision, [1, 0, 1])
+        decider.update([[1, 1, 1]], lots=[1])
+        assert decider.decision[1] == -1
+        assert decider.n[1] == 2
+
+    def test_sequentialOC_hypergeom(self):
+        plan = sequentialDesign(AQL=0.01, alpha=0.05, LQL=0.05, beta=0.05, oc_type='hypergeom', N=200)
+        assert sequentialTruncation(plan) == 200
+        exact = sequentialOC(plan, p=[0.01, 0.03, 0.05])
+        np.testing.assert_array_almost_equal(exact.OC, [0.998593, 0.113093, 0.012027])
+        np.testing.assert_array_almost_equal(exact.ASN, [106.383518, 130.858463, 65.883220])
+
+        # inspect random permutations of lots with 6 defects
+        rng = np.random.default_rng(1)
+        lots = np.zeros((10_000, 200), dtype=int)
+        lots[:, :6] = 1
+        decider = SequentialDecider(plan, lots=10_000)
+        decider.update(rng.permuted(lots, axis=1))
+        assert np.all(decider.decision != SequentialDecider.CONTINUE)
+        assert np.mean(decider.decision == SequentialDecider.ACCEPT) == pytest.approx(0.113093, abs=0.01)
+        assert np.mean(decider.n) == pytest.approx(130.858463, abs=1)
+
+        # large lots behave like the binomial plan
+        plan = sequentialDesign(AQL=0.01, alpha=0.05, LQL=0.05, beta=0.05, oc_type='hypergeom', N=1_000_000)
+        np.testing.assert_array_almost_equal(sequentialOC(plan, p=[0.01, 0.03]).OC, [0.971014, 0.369663], decimal=4)
+
+        with pytest.raises(ValueError):
+            DefectLattice([0.01], 'hypergeom')
+        with pytest.raises(ValueError):
+            DefectLattice([0.01], 'poisson')
+
+    def test_curtailedHypergeom(self):
+        p = np.arange(0, 1.01, 0.1)
+        plan = curtailedHypergeom(100, 20, 1, p=p)
+        assert plan.oc_type == 'hypergeom'
+        np.testing.assert_array_almost_equal(plan.OC, stats.hypergeom.cdf(1, 100, np.round(100 * p), 20))
+        np.testing.assert_array_almost_equal(plan.ASNsemi[:4], [20, 14.792574, 9.392994, 6.504957])
+        np.testing.assert_array_almost_equal(plan.ASNfull[:4], [19, 14.684062, 9.384235, 6.504477])
+        assert plan.ASNsemi[-1] == pytest.approx(2)
+
+        # the same recursion reproduces the closed form for the binomial distribution
+        p = np.arange(0.01, 1.0, 0.2)
+        for n, Ac in [(100, 10), (20, 1)]:
+            expected = curtailedBinomial(n, Ac, p=p.copy())
+            _, ASNsemi = _curtailedInspection(DefectLattice(p), n, Ac, full=False)
+            _, ASNfull = _curtailedInspection(DefectLattice(p), n, Ac, full=True)
+            np.testing.assert_array_almost_equal(ASNsemi, expected.ASNsemi)
+            np.testing.assert_array_almost_equal(ASNfull, expected.ASNfull)
@@ -4,14 +4,14 @@ Industrial Statistics: A Computer Based Approach with Python
 
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
+import itertools
 import math
 from collections import namedtuple
 
 import numpy as np
-from scipy import stats
+from scipy import special, stats
 from scipy.optimize import root_scalar
 
-from mistat.acceptanceSampling.distributions import OChypergeom
 from mistat.acceptanceSampling.oc import OC_TYPES
 
 RiskPoint = namedtuple('RiskPoint', 'pdefect,paccept')
@@ -27,6 +27,10 @@ def findPlan(PRP, CRP, oc_type='binomial', N=None, s_type='known'):
     Point rather than the consumer risk point.
 
     No consideration is given to "cost functions
+
+    For attribute plans, the smallest n meeting the consumer risk point is found by
+    bisection for c = 0, 1, ... until the plan also meets the producer risk point;
+    this gives the same plan as increasing n and c one step at a time.
     """
     oc_type = oc_type.lower()
     if oc_type not in [*OC_TYPES, 'normal']:
@@ -36,52 +40,20 @@ def findPlan(PRP, CRP, oc_type='binomial', N=None, s_type='known'):
     if np.any(PRP[0] >= CRP[0]):
         raise ValueError('Consumer Risk Point quality must be greater than Producer Risk Point quality')
 
-    if oc_type == 'binomial':
-        raise NotImplementedError
-        # c <- 0
-        # n <- c+1
-        # repeat {
-        #   if (calc.OCbinomial(n=n,c=c,r=c+1,pd=CRP[1]) > CRP[2])
-        #     n <- n + 1
-        #   else if (calc.OCbinomial(n=n,c=c,r=c+1,pd=PRP[1]) < PRP[2])
-        #     c <- c + 1
-        #   else
-        #     break
-        # }
-        # return(list(n=n, c=c, r=c+1))
-
-    if oc_type == 'hypergeom':
-        if N is None:
+    if oc_type in OC_TYPES:
+        if oc_type == 'hypergeom' and N is None:
             raise ValueError('N must be supplied for the hypergeometric distribution.')
-        c = np.array([0])
-        n = c + 1
-        while True:
-            p1 = OChypergeom(n=n, c=c, r=c + 1, N=N, D=CRP[0] * N).paccept
-            if p1 > CRP[1]:
-                n += 1
-                continue
-            p2 = OChypergeom(n=n, c=c, r=c + 1, N=N, D=PRP[0] * N).paccept
-            if p2 < PRP[1]:
-                c += 1
-            else:
-                break
-        return Plan(n[0], c[0], (c + 1)[0])
-
-    if oc_type == 'poisson':
-        raise NotImplementedError
-        # c = 0
-        # n = c + 1
-        # while True:
-        #     if OCpoisson(n=[n], c=[c], r=[c + 1], pd=CRP[0]).paccept > CRP[1]:
-        #         print(n, c, OCpoisson(n=[n], c=[c], r=[c + 1], pd=CRP[0]).paccept)
-        #         n += 1
-        #     elif OCpoisson(n=[n], c=[c], r=[c + 1], pd=PRP[0]).paccept < PRP[1]:
-        #         print(n, c, OCpoisson(n=[n], c=[c], r=[c + 1], pd=PRP[0]).paccept)
-        #         c += 1
-        #     else:
-        #         break
-        #     break
-        # return Plan(n, c, c + 1)
+        oc = singleSamplingOC(oc_type, N=N)
+        nmax = N if oc_type == 'hypergeom' else None
+        p0, pa0 = PRP[0][0], PRP[1][0]
+        pt, pat = CRP[0][0], CRP[1][0]
+        # For each c, the smallest n that meets the consumer risk point; it increases
+        # with c, so the search for c + 1 starts from the n for c.
+        n = 1
+        for c in itertools.count():
+            n = findSmallestN(lambda n, c=c: oc(n, c, pt) <= pat, lower=n, upper=nmax)
+            if oc(n, c, p0) >= pa0:
+                return Plan(n, c, c + 1)
 
     if oc_type == 'normal':
         s_type = s_type.lower()
@@ -95,19 +67,57 @@ def findPlan(PRP, CRP, oc_type='binomial', N=None, s_type='known'):
             k = stats.norm.ppf(1 - PRP[1])[0] / np.sqrt(n) - stats.norm.ppf(PRP[0])[0]
             return PlanNormal(n, k, s_type)
         if s_type == 'unknown':
-            n = 2
-            k = find_k(n, PRP[0], PRP[1], interval=[0, 1000])
-            nc = - stats.norm.ppf(CRP[0])[0] * np.sqrt(n)
-            pa = 1 - stats.nct.cdf(k * np.sqrt(n), df=n - 1, nc=nc)
-            while pa > CRP[1]:
-                n = n + 1
-                k = find_k(n, PRP[0], PRP[1], interval=[0, 1000])
-                nc = - stats.norm.ppf(CRP[0])[0] * np.sqrt(n)
-                pa = 1 - stats.nct.cdf(k * np.sqrt(n), df=n - 1, nc=nc)
-            return PlanNormal(n, k, s_type)
+            def paccept(n):
+                k = find_k(n, PRP[0][0], PRP[1][0], interval=[0, 1000])
+                nc = - stats.norm.ppf(CRP[0][0]) * np.sqrt(n)
+                return k, 1 - stats.nct.cdf(k * np.sqrt(n), df=n - 1, nc=nc)
+            # Need a minimum of 1 degree of freedom (=n-1) for the NC t-dist
+            n = findSmallestN(lambda n: paccept(n)[1] <= CRP[1][0], lower=2)
+            return PlanNormal(n, paccept(n)[0], s_type)
     raise NotImplementedError
 
 
+def singleSamplingOC(oc_type, N=None):
+    """ Return the function OC(n, c, pdefect) of a single sampling plan """
+    if oc_type == 'binomial':
+        return lambda n, c, pdefect: special.bdtr(c, n, pdefect)
+    if oc_type == 'poisson':
+        return lambda n, c, pdefect: special.pdtr(c, n * pdefect)
+    if oc_type == 'hypergeom':
+        return lambda n, c, pdefect: stats.hypergeom.cdf(c, N, np.round(pdefect * N), n)
+    raise ValueError(f'Unknown type {oc_type}')
+
+
+def findSmallestN(condition, lower=1, upper=None):
+    """ Smallest n >= lower for which condition(n) is true
+
+    condition must be monotone in n (false up to some n, then true). The interval is
+    found by doubling the step from lower and then bisected, so only O(log n)
+    evaluations are required. Raises ValueError if condition(upper) is false.
+    """
+    if condition(lower):
+        return lower
+    step = 1
+    while True:
+        high = lower + step
+        if upper is not None and high >= upper:
+            high = upper
+            if not condition(high):
+                raise ValueError(f'no sample size up to {upper} meets the requirements')
+            break
+        if condition(high):
+            break
+        lower, step = high, 2 * step
+    # condition(lower) is false and condition(high) true
+    while high - lower > 1:
+        mid = (lower + high) // 2
+        if condition(mid):
+            high = mid
+        else:
+            lower = mid
+    return high
+
+
 def findPlanApprox(PRP, CRP, N):
     """ Calculate single-stage sampling plan using approximation of hypergeometric distribution """
     alpha = 1 - PRP[1]
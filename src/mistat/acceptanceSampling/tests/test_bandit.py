@@ -6,10 +6,12 @@ Industrial Statistics: A Computer Based Approach with Python
 '''
 import unittest
 
+import numpy as np
 import pytest
 
-from mistat.acceptanceSampling.bandit import (optimalOAB, optimalOAB2,
-                                              simulateOAB)
+from mistat.acceptanceSampling.bandit import (_oabKernelPython, optimalOAB,
+                                              optimalOAB2, optimalOABBoundary,
+                                              simulateOAB, simulateOAB2)
 
 
 class TestBandit(unittest.TestCase):
@@ -19,6 +21,18 @@ class TestBandit(unittest.TestCase):
         assert result.reward.mean == 22.215
         assert result.mgamma.mean == 31.57
 
+    def test_simulateOAB2(self):
+        # agrees with simulateOAB (mgamma.mean = 31.94, reward.mean = 21.92 for 4000 replications)
+        result = simulateOAB2(50, 0.4, 0.5, 10, 0.95, 100_000, seed=1, chunk_size=30_000)
+        assert result.mgamma.mean == pytest.approx(31.94, abs=0.5)
+        assert result.mgamma.std == pytest.approx(16.81, abs=0.2)
+        assert result.reward.mean == pytest.approx(21.92, abs=0.05)
+        assert result.reward.std == pytest.approx(2.00, abs=0.05)
+
+        result = simulateOAB2(10, 0.95, 0.5, 10, 0.95, 10_000, seed=1)
+        assert result.mgamma.mean == 10
+        assert result.reward.mean == pytest.approx(10.46, abs=0.05)
+
     def test_optimalOAB(self):
         result = optimalOAB(10, 0.5)
         assert result.rewards[-1, 0] == pytest.approx(5.823719)
@@ -33,3 +47,30 @@ class TestBandit(unittest.TestCase):
 
         result = optimalOAB2(50, 0.5)
         assert result.max_reward == pytest.approx(40.17491)
+
+    def test_optimalOABBoundary(self):
+        result = optimalOABBoundary(50, 0.5)
+        assert result.max_reward == pytest.approx(40.17491)
+        assert len(result.boundary) == 50
+        np.testing.assert_array_equal(result.boundary[:12], [0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5])
+
+        # continue with arm B exactly for the states where the reward exceeds arm A
+        rewards = optimalOAB2(50, 0.5).rewards
+        for n in range(50):
+            trials = 50 - 1 - n
+            cont = rewards[n, :trials + 1] > 0.5 * (n + 1) + 1e-12
+            assert not cont[:result.boundary[trials]].any()
+            assert cont[result.boundary[trials]:].all()
+
+        rho = np.zeros(51)
+        boundary = np.zeros(50, dtype=np.int64)
+        _oabKernelPython(50, 0.5, rho, boundary)
+        assert (rho[0] + rho[1]) / 2 == pytest.approx(result.max_reward)
+        np.testing.assert_array_equal(boundary, result.boundary)
+
+    def test_optimalOABBoundary_compiled(self):
+        pytest.importorskip('numba')
+        result = optimalOABBoundary(200, 0.5)
+        compiled = optimalOABBoundary(200, 0.5, compiled=True)
+        assert compiled.max_reward == pytest.approx(result.max_reward)
+        np.testing.assert_array_equal(compiled.boundary, result.boundary)
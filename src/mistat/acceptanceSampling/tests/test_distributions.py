@@ -6,12 +6,14 @@ Industrial Statistics: A Computer Based Approach with Python
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
 import unittest
+from itertools import product
 
 import numpy as np
 import pytest
 
 from mistat.acceptanceSampling.distributions import (OCbinomial, OChypergeom,
-                                                     OCtype, getDistribution)
+                                                     OCpoisson, OCtype,
+                                                     getDistribution)
 
 
 class TestData(unittest.TestCase):
@@ -35,6 +37,26 @@ class TestData(unittest.TestCase):
                                              np.array([0.3872108, 0.2632264]))
 
 
+    def test_binomial_multiStage(self):
+        n, c, r = [10, 15, 20], [1, 3, 6], [4, 6, 7]
+        pd = np.linspace(0, 0.6, 13)
+        oc = OCbinomial(n=n, c=c, r=r, pd=pd)
+        # enumerate the cumulative number of defects of the undecided stages
+        expected = np.zeros(len(pd))
+        for k in range(len(n)):
+            for cumulative in product(*[range(c[i] + 1, r[i]) for i in range(k)]):
+                cumulative = [0, *cumulative, c[k]]
+                expected += OCbinomial.probAcc(np.diff(cumulative), n, pd)
+        np.testing.assert_array_almost_equal(oc.paccept, expected)
+        assert oc.calcBinomial(0.2, n, c, r) == pytest.approx(oc.paccept[4])
+
+        # many stages on a fine grid
+        oc = OCbinomial(n=[20] * 5, c=[0, 2, 4, 6, 8], r=[4, 6, 8, 9, 9], pd=np.linspace(0, 1, 1001))
+        assert oc.paccept[0] == pytest.approx(1)
+        assert oc.paccept[-1] == pytest.approx(0)
+        assert np.all(np.diff(oc.paccept) <= 1e-12)
+
+
 class TestOCHypergeom(unittest.TestCase):
     def test_hypergeom_probAcc(self):
         assert OChypergeom.probAcc([1, 2], [10, 12], 125, 10) == pytest.approx(0.376087)
@@ -67,6 +89,8 @@ class TestOCPoisson(unittest.TestCase):
 
         oc2c = getDistribution([20, 30, 40], [3, 6, 10], OCtype.poisson, r=[11, 11, 11], pd=[0.1, 0.2])
         np.testing.assert_array_almost_equal(oc2c.paccept, [0.924443754350073, 0.450503223016181])
+        assert oc2c.calcPoisson(0.2, [20, 30, 40], [3, 6, 10], [11, 11, 11]) == pytest.approx(0.450503223016181)
+        assert isinstance(OCpoisson(n=[20], c=[3], pd=[0.1]).paccept, np.ndarray)
 
 
 @pytest.mark.parametrize("n,c", [(20, 4), (10, 2), ])
@@ -5,13 +5,14 @@ Industrial Statistics: A Computer Based Approach with Python
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
 import unittest
-from unittest.case import skip
 
 import numpy as np
 import pandas as pd
 import pytest
+from scipy import stats
 
-from mistat.acceptanceSampling.generic import Plan, find_k, findPlan, findPlanApprox
+from mistat.acceptanceSampling.generic import (Plan, find_k, findPlan,
+                                               findPlanApprox, findSmallestN)
 
 
 class TestGeneric(unittest.TestCase):
@@ -55,11 +56,38 @@ class TestGeneric(unittest.TestCase):
         assert result.k == pytest.approx(2.105480330251979)
         assert result.s_type == 'unknown'
 
-    @skip('Not implemented')
     def test_findPlan_poisson(self):
         result = findPlan(PRP=(0.01, 0.95), CRP=(0.03, 0.05), oc_type="poisson", N=500)
         assert result == Plan(524, 9, 10)
 
+    def test_findPlan_binomial(self):
+        result = findPlan(PRP=(0.01, 0.95), CRP=(0.03, 0.05), oc_type="binomial")
+        assert result == Plan(521, 9, 10)
+
+        # the search gives the same plan as increasing n and c step by step
+        for p0, pt in [(0.005, 0.02), (0.02, 0.1), (0.05, 0.12)]:
+            c, n = 0, 1
+            while True:
+                if stats.binom.cdf(c, n, pt) > 0.1:
+                    n += 1
+                elif stats.binom.cdf(c, n, p0) < 0.95:
+                    c += 1
+                else:
+                    break
+            assert findPlan(PRP=(p0, 0.95), CRP=(pt, 0.1)) == Plan(n, c, c + 1)
+
+        with pytest.raises(ValueError):
+            # the consumer risk point corresponds to a lot without defects
+            findPlan(PRP=(0.01, 0.95), CRP=(0.02, 0.05), oc_type="hypergeom", N=20)
+
+    def test_findSmallestN(self):
+        for threshold in [1, 2, 3, 17, 1000, 12345]:
+            assert findSmallestN(lambda n, t=threshold: n >= t) == threshold
+        assert findSmallestN(lambda n: n >= 17, lower=20) == 20
+        assert findSmallestN(lambda n: n >= 17, upper=17) == 17
+        with pytest.raises(ValueError):
+            findSmallestN(lambda n: n >= 17, upper=16)
+
     def test_findPlanApprox(self):
         result = findPlanApprox(PRP=(0.01, 0.95), CRP=(0.03, 0.05),  N=500)
         assert result == Plan(248, 4, 5)
@@ -1,3 +1,5 @@
 # ruff: noqa:F401
-from .mahalanobisT2 import MahalanobisT2
+from .mahalanobisT2 import MahalanobisT2, mahalanobisT2Pairs, mahalanobisT2Region
+from .multivariateCharts import MCUSUMState, MEWMAState, mqccArl, mqccDecisionInterval
 from .multivariateQualityControlChart import MultivariateQualityControlChart
+from .streamingMQCC import MQCCScore, StreamingMQCC
@@ -0,0 +1,250 @@
+# pylint: disable=too-many-arguments
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Covariance estimates for T^2 charts with many variables
+'''
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import linalg, stats
+
+ShrinkageCovariance = namedtuple('ShrinkageCovariance', 'cov,shrinkage')
+
+
+def ledoitWolfCovariance(x):
+    """ Ledoit-Wolf shrinkage of the covariance of the rows of x towards a scaled identity
+
+    The estimate (1 - shrinkage) S + shrinkage * mu * I is well-conditioned also if
+    the number of variables exceeds the number of observations. S is the maximum
+    likelihood estimate of the covariance and mu the average variance.
+    """
+    x = np.asarray(x, dtype=float)
+    n, p = x.shape
+    x = x - np.mean(x, axis=0)
+    emp_cov = x.T @ x / n
+    mu = np.trace(emp_cov) / p
+
+    delta = np.sum(emp_cov ** 2)
+    x2 = x ** 2
+    beta = (np.sum(x2.T @ x2) / n - delta) / (p * n)
+    delta = (delta - 2 * mu * np.trace(emp_cov) + p * mu ** 2) / p
+    beta = min(beta, delta)
+    shrinkage = 0 if beta == 0 else beta / delta
+
+    cov = (1 - shrinkage) * emp_cov
+    cov[np.diag_indices(p)] += shrinkage * mu
+    return ShrinkageCovariance(cov, shrinkage)
+
+
+def randomizedSVD(x, n_components, n_oversamples=10, n_iter=4, seed=None):
+    """ Truncated singular value decomposition using a randomized range finder
+
+    Returns U, s, Vt with n_components columns/rows. Only matrices with
+    n_components + n_oversamples columns are formed besides x.
+    """
+    x = np.asarray(x, dtype=float)
+    rng = np.random.default_rng(seed)
+    size = min(n_components + n_oversamples, *x.shape)
+    Q, _ = np.linalg.qr(x @ rng.normal(size=(x.shape[1], size)))
+    # power iterations with re-orthonormalization
+    for _ in range(n_iter):
+        Q, _ = np.linalg.qr(x.T @ Q)
+        Q, _ = np.linalg.qr(x @ Q)
+    U, s, Vt = np.linalg.svd(Q.T @ x, full_matrices=False)
+    return (Q @ U)[:, :n_components], s[:n_components], Vt[:n_components]
+
+
+class PCAModel:
+    """ Principal component model for T^2 and SPE (Q statistic) charts
+
+    T^2 is computed on the first n_components principal components and the squared
+    prediction error (SPE) measures the distance from the principal component
+    subspace. The model stores only the center, the p x n_components loadings and the
+    component variances.
+    """
+
+    def __init__(self, center, loadings, eigenvalues, speMoments=None):
+        self.center = np.asarray(center, dtype=float)
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.eigenvalues = np.asarray(eigenvalues, dtype=float)
+        self.speMoments = speMoments
+
+    @property
+    def n_components(self):
+        return len(self.eigenvalues)
+
+    @classmethod
+    def fit(cls, x, n_components=None, svd='full', seed=None, explained_variance=0.9, center=None):
+        """ Fit the model to the phase I data x
+
+        svd is 'full' or 'randomized'. If n_components is None, the smallest number
+        of components that explain the given fraction of the variance is used; this
+        requires the full decomposition.
+        """
+        x = np.asarray(x, dtype=float)
+        m = len(x)
+        center = np.mean(x, axis=0) if center is None else np.asarray(center, dtype=float).reshape(-1)
+        xc = x - center
+        if svd == 'full':
+            _, s, Vt = np.linalg.svd(xc, full_matrices=False)
+            if n_components is None:
+                explained = np.cumsum(s ** 2) / np.sum(s ** 2)
+                n_components = int(np.searchsorted(explained, explained_variance) + 1)
+            s, Vt = s[:n_components], Vt[:n_components]
+        elif svd == 'randomized':
+            if n_components is None:
+                raise ValueError('randomized SVD requires n_components')
+            _, s, Vt = randomizedSVD(xc, n_components, seed=seed)
+        else:
+            raise ValueError(f"svd '{svd}' is not supported; use 'full' or 'randomized'")
+        model = cls(center, Vt.T, s ** 2 / (m - 1))
+        spe = model.SPE(x)
+        model.speMoments = (np.mean(spe), np.var(spe, ddof=1))
+        return model
+
+    def scores(self, x):
+        return (np.asarray(x, dtype=float) - self.center) @ self.loadings
+
+    def T2(self, x):
+        return np.sum(self.scores(x) ** 2 / self.eigenvalues, axis=1)
+
+    def SPE(self, x):
+        xc = np.asarray(x, dtype=float) - self.center
+        residual = np.sum(xc ** 2, axis=1) - np.sum((xc @ self.loadings) ** 2, axis=1)
+        return np.maximum(residual, 0)
+
+    def speLimit(self, conf):
+        """ Upper limit of the SPE using the scaled chi-square approximation g chi2_h
+
+        g and h are matched to the mean and variance of the phase I SPE values
+        (Nomikos and MacGregor).
+        """
+        mean, var = self.speMoments
+        if var == 0:
+            return mean
+        g = var / (2 * mean)
+        h = 2 * mean ** 2 / var
+        return g * stats.chi2(h).ppf(conf)
+
+
+RobustEstimate = namedtuple('RobustEstimate', 'center,cov,support')
+
+
+def fastMCD(x, support_fraction=None, n_starts=500, n_best=10, subsample_size=1500, n_jobs=None, seed=None):
+    """ Minimum covariance determinant estimate of center and covariance (FAST-MCD)
+
+    Each start draws a random (p + 1)-subset of a subsample of at most subsample_size
+    rows and improves it with two C-steps. The n_best candidates are iterated to
+    convergence on the subsample and the best one on all data. The raw estimate is made consistent at the normal
+    distribution and reweighted using the observations with a squared robust distance
+    below the 97.5% chi-square quantile; support marks these observations.
+
+    The starts run in a process pool with n_jobs workers (-1 for all processors); the
+    result does not depend on n_jobs as every start has its own random stream.
+    """
+    x = np.asarray(x, dtype=float)
+    n, p = x.shape
+    h = int((n + p + 1) / 2) if support_fraction is None else int(np.ceil(support_fraction * n))
+    seedSequence = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seedSequence)
+    subsample = x if n <= subsample_size else x[rng.choice(n, subsample_size, replace=False)]
+    hSubsample = int(np.ceil(h * len(subsample) / n))
+
+    seeds = seedSequence.spawn(n_starts)
+    if n_jobs is None or n_jobs == 1:
+        candidates = _mcdStarts(subsample, hSubsample, seeds)
+    else:
+        n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(_mcdStarts, subsample, hSubsample, seeds[i::n_jobs]) for i in range(n_jobs)]
+            candidates = [candidate for future in futures for candidate in future.result()]
+    if not candidates:
+        raise ValueError('no start with a non-singular covariance matrix')
+
+    candidates = sorted(candidates, key=lambda candidate: candidate[0])[:n_best]
+    candidates = [_cStepsToConvergence(subsample, center, cov, hSubsample) for _, center, cov in candidates]
+    _, center, cov = min(candidates, key=lambda candidate: candidate[0])
+    if len(subsample) < n:
+        _, center, cov = _cStepsToConvergence(x, center, cov, h)
+
+    # consistency correction and reweighting
+    d2 = _squaredDistances(x, center, cov)
+    cov = cov * np.median(d2) / stats.chi2(p).ppf(0.5)
+    support = _squaredDistances(x, center, cov) <= stats.chi2(p).ppf(0.975)
+    return RobustEstimate(np.mean(x[support], axis=0), np.cov(x[support], rowvar=False), support)
+
+
+def iterativeTrimming(x, confidence_level=None, max_iter=50):
+    """ Remove observations beyond the phase I UCL of the T2 chart until none remain
+
+    Center and covariance are recomputed from the retained observations in every
+    iteration; support marks the retained observations.
+    """
+    x = np.asarray(x, dtype=float)
+    n, p = x.shape
+    confidence_level = (1 - 0.0027) ** p if confidence_level is None else confidence_level
+    support = np.ones(n, dtype=bool)
+    for _ in range(max_iter):
+        m = np.sum(support)
+        center = np.mean(x[support], axis=0)
+        cov = np.cov(x[support], rowvar=False)
+        ucl = (m - 1) ** 2 / m * stats.beta(p / 2, (m - p - 1) / 2).ppf(confidence_level)
+        beyond = support & (_squaredDistances(x, center, cov) > ucl)
+        if not beyond.any():
+            break
+        support &= ~beyond
+    return RobustEstimate(center, cov, support)
+
+
+def _squaredDistances(x, center, cov):
+    L = linalg.cholesky(cov, lower=True)
+    z = linalg.solve_triangular(L, (x - center).T, lower=True, check_finite=False)
+    return np.sum(z ** 2, axis=0)
+
+
+def _cStep(x, center, cov, h):
+    """ Center and covariance of the h observations closest to center """
+    subset = x[np.argpartition(_squaredDistances(x, center, cov), h - 1)[:h]]
+    return np.mean(subset, axis=0), np.cov(subset, rowvar=False)
+
+
+def _cStepsToConvergence(x, center, cov, h, max_iter=100, tol=1e-8):
+    """ C-steps until the log-determinant decreases by less than tol """
+    logdet = np.inf
+    for _ in range(max_iter):
+        center, cov = _cStep(x, center, cov, h)
+        previous, logdet = logdet, np.linalg.slogdet(cov)[1]
+        if logdet >= previous - tol:
+            break
+    return logdet, center, cov
+
+
+def _mcdStarts(x, h, seeds, n_csteps=2):
+    """ Random (p + 1)-subset starts improved by n_csteps C-steps; returns (logdet, center, cov) """
+    n, p = x.shape
+    candidates = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(n)
+        size = p + 1
+        cov = np.cov(x[order[:size]], rowvar=False)
+        # enlarge the subset until the covariance matrix is non-singular
+        while np.linalg.matrix_rank(cov) < p and size < n:
+            size += 1
+            cov = np.cov(x[order[:size]], rowvar=False)
+        center = np.mean(x[order[:size]], axis=0)
+        try:
+            for _ in range(n_csteps):
+                center, cov = _cStep(x, center, cov, h)
+        except linalg.LinAlgError:
+            continue
+        sign, logdet = np.linalg.slogdet(cov)
+        if sign > 0:
+            candidates.append((logdet, center, cov))
+    return candidates
@@ -5,15 +5,17 @@ Industrial Statistics: A Computer Based Approach with Python
 
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
-from string import ascii_uppercase
+from collections import namedtuple
+from itertools import combinations
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import statsmodels.formula.api as smf
 from matplotlib import patches, transforms
 from matplotlib.gridspec import GridSpec
-from scipy import linalg, optimize, stats
+from scipy import stats
+
+CriticalRegion = namedtuple('CriticalRegion', 'coord,mahalanobis,Qf,K')
 
 
 class MahalanobisT2:
@@ -40,44 +42,18 @@ class MahalanobisT2:
         if len(N) > 1:
             print(f'different number of measures by factor, using n={N[0]}')
         N = N[0]
-        p = D.shape[1]
-        K = N**2 / (2 * N) * (2 * N - p - 1) / ((2 * N - 2) * p)
-        Qf = stats.f(p, 2 * N - p - 1).ppf(conf_level)
-        self.Qf = Qf
-        self.K = K
         D2 = D.iloc[0] - D.iloc[1]
         self.D2 = D2
-        D3 = pd.DataFrame([[0] * p, D.iloc[0] - D.iloc[1]], columns=list(ascii_uppercase[:p]))
-        lm = smf.ols(formula=f"A ~ {'+'.join(D3.columns[1:])} - 1", data=D3).fit()
-
-        def fun(x, cov_inv):
-            x = pd.DataFrame(x, columns=list(ascii_uppercase[1:p]))
-            D4 = np.array([lm.predict(x), *x.values]).flatten()
-            delta = D4 - D2
-            return abs(K * np.transpose(delta) @ cov_inv @ delta - Qf)
-        cov_inv = linalg.inv(cov)
-        opt_result = optimize.minimize(fun, [0] * (D3.shape[1] - 1), args=(cov_inv, ), method='Nelder-Mead')
-
-        res = pd.DataFrame(opt_result.x, columns=list(ascii_uppercase[1:p]))
-        res = np.array([lm.predict(res), *res.values]).flatten()
-        res = np.array([res, D2.values, (2 * D2 - res).values])
-        res = res[res[:, 1].argsort()[::-1]]
-        res = pd.DataFrame(res, columns=response_names, index=('LCR', 'Center', 'UCR'))
-
-        self.coord = res
-        self.mahalanobis = res.apply(lambda x: np.sqrt(x @ cov_inv @ x), axis=1)
+
+        region = mahalanobisT2Region(D2.values, cov.values, N, conf_level=conf_level)
+        self.Qf = region.Qf
+        self.K = region.K
+        self.coord = pd.DataFrame(region.coord, columns=response_names, index=('LCR', 'Center', 'UCR'))
+        self.mahalanobis = pd.Series(region.mahalanobis, index=('LCR', 'Center', 'UCR'))
         self.mahalanobis_compare = None
         if compare_to is not None:
-            self.mahalanobis_compare = np.sqrt(compare_to @ cov_inv @ compare_to)
-#             x = pd.DataFrame([self.mahalanobis_compare], columns=list(ascii_uppercase[1:p]))
-#             self.mahalanobis_compare_coord = [self.mahalanobis_compare, lm.predict(x)]
-#
-#             def fun(x, cov_inv):
-#                 x = pd.DataFrame(x, columns=list(ascii_uppercase[1:p]))
-#             opt_result = optimize.minimize(fun, [0] * (D3.shape[1] - 1), args=(cov_inv, ), method='Nelder-Mead')
-#             res = pd.DataFrame(opt_result.x, columns=list(ascii_uppercase[1:p]))
-#             res = np.array([lm.predict(res), *res.values]).flatten()
-#             self.mahalanobis_compare_coord = res
+            compare_to = np.asarray(compare_to, dtype=float)
+            self.mahalanobis_compare = np.sqrt(compare_to @ np.linalg.solve(cov.values, compare_to))
 
     def summary(self):
         print('Coordinates')
@@ -97,7 +73,7 @@ class MahalanobisT2:
         ax1 = fig.add_subplot(gs[0])
         ax2 = fig.add_subplot(gs[1])
         col1, col2 = self.coord.columns
-        ax1.plot([0, self.coord[col1][0]], [0, self.coord[col2][0]], color='black')
+        ax1.plot([0, self.coord[col1].iloc[0]], [0, self.coord[col2].iloc[0]], color='black')
         ax1.plot(0, 0, marker='o', markeredgecolor='black', markerfacecolor='white')
         ax1.plot(self.coord[col1], self.coord[col2], color='red',
                  marker='o', markeredgecolor='black', markerfacecolor='black')
@@ -108,11 +84,13 @@ class MahalanobisT2:
         ax1.set_ylabel(f'difference {col2}')
 
         left = 0.5
-        if self.mahalanobis_compare:
+        values = list(self.mahalanobis)
+        if self.mahalanobis_compare is not None:
             left = 0.35
+            values.append(self.mahalanobis_compare)
         ax2.set_xlim(0, 2)
-        mmin = min(*self.mahalanobis, self.mahalanobis_compare)
-        mmax = max(*self.mahalanobis, self.mahalanobis_compare)
+        mmin = min(values)
+        mmax = max(values)
         mdelta = mmax - mmin
         ax2.set_ylim(mmin - 0.15 * mdelta, mmax + 0.15 * mdelta)
         for direction in ('top', 'bottom', 'right'):
@@ -122,7 +100,7 @@ class MahalanobisT2:
         mmax = max(self.mahalanobis)
         ax2.add_patch(patches.Rectangle((left, mmin), 1, mmax - mmin, facecolor="red", edgecolor="black",
                                         alpha=0.25))
-        y = self.mahalanobis[1]
+        y = self.mahalanobis['Center']
         ax2.plot((left, left + 1), (y, y), color='black', linewidth=2)
         if self.mahalanobis_compare is not None:
             y = self.mahalanobis_compare
@@ -134,6 +112,55 @@ class MahalanobisT2:
         return ax1, ax2
 
 
+def mahalanobisT2Region(D2, cov, N, conf_level=0.95):
+    """ Critical region of the Mahalanobis distance between two group means
+
+    D2 is the difference of the group means (..., p), cov the pooled covariance
+    (..., p, p), and N the number of observations per group; leading dimensions are
+    batch dimensions. The endpoints of the critical region along the direction of D2
+    solve K (t - 1)^2 D2' cov^-1 D2 = Qf, i.e. t = 1 -/+ sqrt(Qf / (K D2' cov^-1 D2)).
+    The coordinates (..., 3, p) are ordered LCR, Center, UCR by decreasing value of
+    the second variable; mahalanobis (..., 3) are their Mahalanobis distances.
+    """
+    D2 = np.asarray(D2, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    N = np.asarray(N, dtype=float)
+    p = D2.shape[-1]
+    K = N / 2 * (2 * N - p - 1) / ((2 * N - 2) * p)
+    Qf = stats.f(p, 2 * N - p - 1).ppf(conf_level)
+
+    distance = np.sqrt(np.sum(D2 * np.linalg.solve(cov, D2[..., None])[..., 0], axis=-1))
+    radius = np.sqrt(Qf / K)
+    sign = np.where(D2[..., min(1, p - 1)] < 0, -1, 1)
+    t = 1 + np.stack([sign, np.zeros_like(sign), -sign], axis=-1) * (radius / distance)[..., None]
+    coord = t[..., None] * D2[..., None, :]
+    return CriticalRegion(coord, np.abs(t) * distance[..., None], Qf, K)
+
+
+def mahalanobisT2Pairs(x, factor_name, response_names=None, conf_level=0.95):
+    """ Mahalanobis T^2 critical regions for all pairs of factor levels
+
+    Each pair uses the pooled covariance of its two levels and the smaller number of
+    observations, as MahalanobisT2 does for a data set with two levels. Returns a
+    DataFrame indexed by the two levels with the Mahalanobis distances of LCR, Center,
+    and UCR.
+    """
+    if response_names is None:
+        response_names = [c for c in x.columns if c != factor_name]
+    groups = x.groupby(factor_name)[response_names]
+    means = groups.mean()
+    levels = means.index
+    covs = np.stack([groups.get_group(level).cov().values for level in levels])
+    sizes = groups.size().values
+
+    first, second = (np.array(idx, dtype=int) for idx in zip(*combinations(range(len(levels)), 2)))
+    D2 = means.values[first] - means.values[second]
+    cov = (covs[first] + covs[second]) / 2
+    region = mahalanobisT2Region(D2, cov, np.minimum(sizes[first], sizes[second]), conf_level=conf_level)
+    index = pd.MultiIndex.from_arrays([levels[first], levels[second]], names=['level1', 'level2'])
+    return pd.DataFrame(region.mahalanobis, index=index, columns=['LCR', 'Center', 'UCR'])
+
+
 def confidence_ellipse(means, cov, ax, n_std=3.0, facecolor='none', **kwargs):
     """
     Create a plot of the covariance confidence ellipse of *x* and *y*.
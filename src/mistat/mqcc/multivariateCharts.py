@@ -0,0 +1,182 @@
+# pylint: disable=too-many-arguments,too-many-locals
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Recursions and run length simulation for MEWMA and MCUSUM charts
+
+Observations are whitened with the Cholesky factor of the in-control covariance,
+x -> L^-1 (x - center), so that both charts work with identity covariance.
+'''
+import numpy as np
+import pandas as pd
+from scipy import linalg, optimize, signal
+
+
+class _WhitenedState:
+    def __init__(self, center, cov):
+        self.center = np.asarray(center, dtype=float).reshape(-1)
+        self.cholesky = linalg.cholesky(np.asarray(cov, dtype=float), lower=True)
+        self.count = 0
+
+    def whiten(self, x):
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        return linalg.solve_triangular(self.cholesky, (x - self.center).T, lower=True).T
+
+
+class MEWMAState(_WhitenedState):
+    """ Multivariate EWMA Z_t = smooth X_t + (1 - smooth) Z_(t-1) with Z_0 = 0
+
+    update() returns T^2_t = Z_t' Cov(Z_t)^-1 Z_t for a block of observations; the
+    recursion is evaluated with a linear filter along the time axis. Cov(Z_t) uses
+    the exact time-dependent factor smooth / (2 - smooth) (1 - (1 - smooth)^(2t))
+    unless asymptotic is True.
+    """
+
+    def __init__(self, center, cov, smooth=0.1, asymptotic=False):
+        super().__init__(center, cov)
+        if not 0 < smooth <= 1:
+            raise ValueError('smooth parameter must be between 0 and 1')
+        self.smooth = smooth
+        self.asymptotic = asymptotic
+        self.z = np.zeros(len(self.center))
+
+    def update(self, x):
+        w = self.whiten(x)
+        z, _ = signal.lfilter([self.smooth], [1, self.smooth - 1], w, axis=0,
+                              zi=(1 - self.smooth) * self.z[None, :])
+        t = np.arange(self.count + 1, self.count + len(w) + 1)
+        self.z = z[-1]
+        self.count += len(w)
+        return np.sum(z ** 2, axis=1) / mewmaVarianceFactor(self.smooth, t, self.asymptotic)
+
+
+class MCUSUMState(_WhitenedState):
+    """ Crosier's multivariate CUSUM with reference value k
+
+    C_t = ||S_(t-1) + X_t||; S_t = 0 if C_t <= k, otherwise (S_(t-1) + X_t)(1 - k / C_t).
+    update() returns the chart statistic ||S_t|| for a block of observations.
+    """
+
+    def __init__(self, center, cov, k=0.5):
+        super().__init__(center, cov)
+        self.k = k
+        self.s = np.zeros(len(self.center))
+
+    def update(self, x):
+        w = self.whiten(x)
+        result = np.empty(len(w))
+        s = self.s
+        for i, wi in enumerate(w):
+            s, result[i] = mcusumStep(s, wi, self.k)
+        self.s = s
+        self.count += len(w)
+        return result
+
+
+def mewmaVarianceFactor(smooth, t, asymptotic=False):
+    factor = smooth / (2 - smooth)
+    if asymptotic:
+        return np.full(np.shape(t), factor)
+    return factor * (1 - (1 - smooth) ** (2 * np.asarray(t)))
+
+
+def mcusumStep(s, x, k):
+    """ One step of Crosier's MCUSUM for states s of shape (p, ) or (replications, p) """
+    s = s + x
+    c = np.sqrt(np.sum(s ** 2, axis=-1))
+    shrink = np.where(c > k, 1 - k / np.where(c > k, c, 1), 0)
+    s = s * shrink[..., None]
+    return s, c * shrink
+
+
+def _simulate(qcc_type, nvars, shift, smooth, k, asymptotic, N, limit, rng, h=None):
+    """ Advance N replications in lock-step
+
+    With h, replications are dropped once they signal and the run lengths are
+    returned. Without h, all replications run for limit steps and the records of the
+    running maximum of the statistic are returned as (replication, time, value).
+    """
+    qcc_type = qcc_type.lower()
+    if qcc_type not in ('mewma', 'mcusum'):
+        raise ValueError(f"qcc_type '{qcc_type}' is not supported; use 'mewma' or 'mcusum'")
+    mean = np.zeros(nvars)
+    mean[0] = shift
+    active = np.arange(N)
+    state = np.zeros((N, nvars))
+    rls = np.full(N, np.inf)
+    runningMax = np.full(N, -np.inf)
+    records = []
+    for t in range(1, limit + 1):
+        x = rng.standard_normal((len(active), nvars)) + mean
+        if qcc_type == 'mewma':
+            state = smooth * x + (1 - smooth) * state
+            statistic = np.sum(state ** 2, axis=1) / mewmaVarianceFactor(smooth, t, asymptotic)
+        else:
+            state, statistic = mcusumStep(state, x, k)
+
+        if h is None:
+            record = statistic > runningMax
+            runningMax[record] = statistic[record]
+            records.append((active[record], np.full(np.sum(record), t), statistic[record]))
+            continue
+        signalled = statistic > h
+        rls[active[signalled]] = t
+        active = active[~signalled]
+        state = state[~signalled]
+        if len(active) == 0:
+            break
+    if h is None:
+        return [np.concatenate(values) for values in zip(*records)]
+    return rls
+
+
+def mqccArl(qcc_type='mewma', *, h, nvars=2, shift=0, smooth=0.1, se_shift=1, asymptotic=False,
+            N=1000, limit=10_000, seed=None, verbose=False):
+    """ Monte Carlo run length distribution of a MEWMA or MCUSUM chart
+
+    shift is the non-centrality (Mahalanobis distance of the shifted mean); the ARL of
+    both charts depends on the shift only through it. The reference value of the
+    MCUSUM is k = se_shift / 2. The run length is the number of observations up to
+    and including the signal; replications without signal get an infinite run length
+    and are ignored in the ARL.
+    """
+    rng = np.random.default_rng(seed)
+    rls = _simulate(qcc_type, nvars, shift, smooth, se_shift / 2, asymptotic, N, limit, rng, h=h)
+    masked = np.ma.masked_invalid(rls)
+    result = {
+        'rls': rls,
+        'statistic': {
+            'ARL': np.mean(masked),
+            'Std. Error': np.std(masked, ddof=1) / np.sqrt(masked.count()),
+        },
+    }
+    if verbose:
+        print(pd.Series(result['statistic']))
+    return result
+
+
+def mqccDecisionInterval(qcc_type='mewma', *, nvars=2, arl0=200, smooth=0.1, se_shift=1, asymptotic=False,
+                         N=1000, limit=None, seed=None):
+    """ Decision interval h of a MEWMA or MCUSUM chart with in-control ARL arl0
+
+    All replications are simulated once; only the records of the running maximum of
+    the chart statistic are kept. The run length for a given h is the time of the first
+    record above h, which makes the simulated ARL a monotone function of h that is
+    solved for arl0. limit defaults to 20 * arl0.
+    """
+    limit = int(20 * arl0) if limit is None else limit
+    rng = np.random.default_rng(seed)
+    replication, time, value = _simulate(qcc_type, nvars, 0, smooth, se_shift / 2, asymptotic, N, limit, rng)
+
+    def arl(h):
+        rls = np.full(N, limit + 1)
+        beyond = value > h
+        np.minimum.at(rls, replication[beyond], time[beyond])
+        return np.mean(rls)
+    upper = np.max(value)
+    if arl(0) >= arl0 or arl(upper) <= arl0:
+        raise ValueError('arl0 cannot be reached; increase limit or change arl0')
+    return optimize.brentq(lambda h: arl(h) - arl0, 0, upper, xtol=1e-6)
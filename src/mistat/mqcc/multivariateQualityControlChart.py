@@ -6,6 +6,7 @@ Industrial Statistics: A Computer Based Approach with Python
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from scipy import linalg
 
@@ -19,7 +20,28 @@ class MultivariateQualityControlChart:
                  limits=True, pred_limits=False, rules=None,
                  data_name=None, labels=None,
                  newdata=None, newlabels=None,
-                 confidence_level=None):
+                 confidence_level=None, covariance='sample', n_components=None, seed=None,
+                 smooth=0.1, se_shift=1, decision_interval=None, n_jobs=None):
+        """ Multivariate control chart
+
+        For individual observations, covariance selects the covariance estimate that is
+        used if cov is not given: 'sample', 'shrinkage' (Ledoit-Wolf), or 'pca' and
+        'randomized' for a chart of T^2 on the first n_components principal components
+        (full or randomized SVD). The PCA charts also report the squared prediction
+        error (SPE) and its upper limit.
+
+        Robust phase I estimates are obtained with covariance='mcd' (FAST-MCD, with the
+        random starts run in a pool of n_jobs processes) or 'trimming' (iterative removal
+        of points beyond the UCL); for subgrouped data, they select the subgroups used
+        for center and pooled covariance. The retained points are in stats.support.
+
+        The MEWMA (qcc_type='mewma', smoothing parameter smooth) and MCUSUM
+        (qcc_type='mcusum', reference value se_shift / 2) charts signal if the statistic
+        exceeds decision_interval. If not given, the decision interval is determined by
+        simulation for an in-control ARL of 1 / (1 - confidence_level); this takes a few
+        seconds (cached for repeated charts with the same settings) and uses a fixed
+        seed. Use mqccDecisionInterval to control the simulation.
+        """
         self.statistic = mqccStatistics.get(qcc_type)
         self.qcc_type = self.statistic.qcc_type
 
@@ -29,25 +51,46 @@ class MultivariateQualityControlChart:
             raise ValueError('varying number of samples (rows)')
         if isinstance(sample_sizes, list):
             raise ValueError('varying sample size (columns)')
-        if sample_sizes == 1:
-            self.statistic = mqccStatistics.get('T2single')
+        recursive = self.qcc_type in ('mewma', 'mcusum')
+        if sample_sizes == 1 and not recursive:
+            self.statistic = mqccStatistics.get('T2pca' if covariance in ('pca', 'randomized') else 'T2single')
             self.qcc_type = self.statistic.qcc_type
-
-        if confidence_level is None:
-            confidence_level = (1 - 0.0027) ** p
-        if not 0 < confidence_level < 1:
-            raise ValueError('confidence.level must be a numeric value in the range (0,1)')
+        elif (recursive and covariance != 'sample') or covariance not in ('sample', 'mcd', 'trimming'):
+            raise ValueError(f"covariance '{covariance}' requires individual observations")
+        robustOptions = {'covariance': covariance, 'n_jobs': n_jobs, 'seed': seed,
+                         'confidence_level': (1 - 0.0027) ** p if confidence_level is None else confidence_level}
 
         if labels is None:
             labels = list(range(len(data)))
         self.labels = labels
 
-        self.stats = self.statistic.stats(data, center=center, cov=cov)
+        if self.qcc_type == 't2pca':
+            self.stats = self.statistic.stats(data, center=center, cov=cov, n_components=n_components,
+                                              svd='full' if covariance == 'pca' else 'randomized', seed=seed)
+            # limits are based on the number of principal components
+            p = self.stats.cov.n_components
+        elif recursive:
+            options = {'smooth': smooth} if self.qcc_type == 'mewma' else {'se_shift': se_shift}
+            self.stats = self.statistic.stats(data, center=center, cov=cov, **options)
+        else:
+            self.stats = self.statistic.stats(data, center=center, cov=cov, **robustOptions)
+
+        if confidence_level is None:
+            confidence_level = (1 - 0.0027) ** p
+        if not 0 < confidence_level < 1:
+            raise ValueError('confidence.level must be a numeric value in the range (0,1)')
+        self.confidence_level = confidence_level
+        if self.qcc_type == 't2pca':
+            self.spe_limit = self.stats.cov.speLimit(confidence_level)
 
         if newdata is not None:
             self.newdata = newdata
             self.newsizes = self.statistic.get_sizes(newdata)
-            self.newstats = self.statistic.stats(newdata, center=self.stats.center, cov=self.stats.cov)
+            if recursive:
+                # continue the recursion from the end of the calibration data
+                self.newstats = self.statistic.stats(newdata, state=self.stats.state)
+            else:
+                self.newstats = self.statistic.stats(newdata, center=self.stats.center, cov=self.stats.cov)
             self.newlabels = newlabels
             if newlabels is None:
                 self.newlabels = list(range(len(data), len(data) + len(newdata)))
@@ -58,10 +101,17 @@ class MultivariateQualityControlChart:
             self.newstats = None
             self.newsizes = None
 
+        computedLimits = None
+        if isinstance(limits, bool) or isinstance(pred_limits, bool):
+            if recursive:
+                computedLimits = self.statistic.limits(num_samples, sample_sizes, p, confidence_level,
+                                                       decision_interval=decision_interval, **options)
+            elif limits is True or pred_limits is True:
+                computedLimits = self.statistic.limits(num_samples, sample_sizes, p, confidence_level)
+
         if isinstance(limits, bool):
             if limits:
-                limits = self.statistic.limits(num_samples, sample_sizes, p, confidence_level)
-                self.limits = limits['control']
+                self.limits = computedLimits['control']
             else:
                 self.limits = None
         else:
@@ -69,8 +119,7 @@ class MultivariateQualityControlChart:
 
         if isinstance(pred_limits, bool):
             if pred_limits:
-                pred_limits = self.statistic.limits(num_samples, sample_sizes, p, confidence_level)
-                self.pred_limits = pred_limits['prediction']
+                self.pred_limits = computedLimits['prediction']
             else:
                 self.pred_limits = None
         else:
@@ -79,6 +128,9 @@ class MultivariateQualityControlChart:
         self.violations = shewhartRules(self, run_length=0)
         self.violations['beyondPredLimits'] = shewhartRules(
             self, run_length=0, limits=self.limits)['beyondLimits']
+        if self.qcc_type == 't2pca':
+            spe = self.stats.spe if self.newstats is None else pd.concat([self.stats.spe, self.newstats.spe])
+            self.violations['beyondSPELimit'] = np.nonzero(spe.values > self.spe_limit)[0]
 
     def plot(self, title=None, ax=None, show_legend=True):
         if ax is None:
@@ -137,7 +189,10 @@ class MultivariateQualityControlChart:
             fig.subplots_adjust(bottom=0.2)
             fig.text(0.1, 0.1, f'Number of groups = {len(self.labels)}', fontsize=12)
             fig.text(0.1, 0.06, f'Sample size = {self.sizes.samples_sizes}', fontsize=12)
-            fig.text(0.1, 0.02, f'|S| = {linalg.det(self.stats.cov):.5g}', fontsize=12)
+            if self.qcc_type == 't2pca':
+                fig.text(0.1, 0.02, f'Components = {self.stats.cov.n_components}', fontsize=12)
+            else:
+                fig.text(0.1, 0.02, f'|S| = {linalg.det(self.stats.cov):.5g}', fontsize=12)
             if self.limits is not None and len(self.limits) == 1:
                 fig.text(0.4, 0.1, f'LCL = {self.limits.LCL[0]:.5g}', fontsize=12)
                 fig.text(0.4, 0.06, f'UCL = {self.limits.UCL[0]:.5g}', fontsize=12)
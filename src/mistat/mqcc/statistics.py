@@ -1,3 +1,4 @@
+# pylint: disable=too-many-arguments
 '''
 Modern Statistics: A Computer Based Approach with Python
 Industrial Statistics: A Computer Based Approach with Python
@@ -5,17 +6,42 @@ Industrial Statistics: A Computer Based Approach with Python
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
 from collections import namedtuple
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
 from scipy import linalg, stats
 
+from mistat.mqcc.covariance import (PCAModel, fastMCD, iterativeTrimming,
+                                    ledoitWolfCovariance)
+from mistat.mqcc.multivariateCharts import (MCUSUMState, MEWMAState,
+                                            mqccDecisionInterval)
 from mistat.qcc.statistics import QCCStatistics
 
-GroupStatistics = namedtuple('GroupStatistics', 'statistics,means,center,cov')
+GroupStatistics = namedtuple('GroupStatistics', 'statistics,means,center,cov,decomposition,spe,state,support',
+                             defaults=(None, None, None, None))
 DataSizes = namedtuple('DataSizes', 'num_samples,samples_sizes,num_variables')
 
 
+def hotellingT2(x, cov, decomposition=False):
+    """ Hotelling T^2 of the rows of the centered data x for the covariance matrix cov
+
+    The covariance is factorized as cov = L L^T and z = L^-1 x^T is obtained by
+    triangular back-substitution, so that T^2 is the row sum of z^2. The squared
+    components of z are the terms of the MYT decomposition for the given ordering of
+    the variables, T^2 = T^2_1 + T^2_2.1 + T^2_3.1,2 + ...; with decomposition=True,
+    they are returned as a second (m x p) array.
+    """
+    x = np.asarray(x, dtype=float)
+    L = linalg.cholesky(np.asarray(cov, dtype=float), lower=True)
+    z = linalg.solve_triangular(L, x.T, lower=True).T
+    contributions = z ** 2
+    T2 = np.sum(contributions, axis=1)
+    if decomposition:
+        return T2, contributions
+    return T2
+
+
 class MQCCStatistics(QCCStatistics):
 
     def __init__(self):  # pylint: disable=super-init-not-called
@@ -23,6 +49,9 @@ class MQCCStatistics(QCCStatistics):
         self.statistics = {}
         self.register(T2_statistic, default=True)
         self.register(T2single_statistic)
+        self.register(T2pca_statistic)
+        self.register(MEWMA_statistic)
+        self.register(MCUSUM_statistic)
 
 
 class T2_statistic:
@@ -41,31 +70,55 @@ class T2_statistic:
         p = len(data)  # number of variables
         return DataSizes(num_samples, sample_sizes, p)
 
-    def stats(self, data, center=None, cov=None):
+    def stats(self, data, center=None, cov=None, decomposition=False, covariance='sample',
+              confidence_level=None, n_jobs=None, seed=None):
+        """ covariance 'mcd' or 'trimming' estimates center and covariance robustly
+
+        With 'mcd', the subgroups whose means are in the support of the reweighted MCD
+        estimate are used; with 'trimming', subgroups beyond the phase I UCL are removed
+        iteratively. The retained subgroups are returned as support.
+        """
         num_samples, sample_sizes, p = self.get_sizes(data)
+        variables = list(data.keys())
+        # samples x observations x variables
+        values = np.stack([np.asarray(data[k], dtype=float) for k in variables], axis=2)
 
         # within sample means
-        means = pd.DataFrame({k: np.nanmean(v, axis=1) for k, v in data.items()})
+        sampleMeans = np.nanmean(values, axis=1)
+        means = pd.DataFrame(sampleMeans, columns=variables)
+
+        support = None
+        if covariance == 'mcd':
+            support = fastMCD(sampleMeans, n_jobs=n_jobs, seed=seed).support
+        elif covariance == 'trimming':
+            if confidence_level is None:
+                confidence_level = (1 - 0.0027) ** p
+            support = np.ones(num_samples, dtype=bool)
+            while True:
+                subsetCenter, subsetCov = _pooledEstimates(values[support], sampleMeans[support])
+                T2 = sample_sizes * hotellingT2(sampleMeans - subsetCenter, subsetCov)
+                ucl = self.limits(np.sum(support), sample_sizes, p, confidence_level)['control']['UCL'][0]
+                beyond = support & (T2 > ucl)
+                if not beyond.any():
+                    break
+                support &= ~beyond
+        elif covariance != 'sample':
+            raise ValueError(f"covariance '{covariance}' is not supported; use 'sample', 'mcd', or 'trimming'")
+        subset = slice(None) if support is None else support
+        subsetCenter, subsetCov = _pooledEstimates(values[subset], sampleMeans[subset])
+
         # overall mean
         if center is None:
-            center = pd.DataFrame([{k: np.nanmean(v) for k, v in data.items()}])
+            center = pd.DataFrame([subsetCenter], columns=variables)
         else:
             center = pd.DataFrame(center)
-        x = means.sub(center.values, axis=1)
+        x = sampleMeans - center.values.reshape(1, -1)
 
         if cov is None:
-            cov = np.zeros([p, p])
-            for i in range(num_samples):
-                sampleMean = means.iloc[i, :].values
-                d = np.transpose(np.array([v[i] for k, v in data.items()]))
-                d = d - sampleMean
-                d = np.transpose(d) @ d
-                cov += d / (sample_sizes - 1)
-            cov = cov / num_samples
-        cov_inv = linalg.inv(cov)
-
-        T2 = sample_sizes * x.apply(lambda x: x @ cov_inv @ x, axis=1)
-        return GroupStatistics(statistics=T2, means=means, center=center, cov=cov)
+            cov = subsetCov
+
+        result = _t2Statistics(x, cov, means, center, decomposition, scale=sample_sizes)
+        return result._replace(support=support)
 
     def limits(self, ngroups, size, nvars, conf):
         m = ngroups  # num. of samples
@@ -87,35 +140,66 @@ class T2_statistic:
         return {'control': control, 'prediction': prediction}
 
 
-class T2single_statistic:
+class IndividualObservations:
+    """ Base class of the statistics for individual observations """
+
+    def get_sizes(self, data):
+        return DataSizes(data.shape[0], 1, data.shape[1])
+
+
+class T2single_statistic(IndividualObservations):
     """ Statistics used in computing and drawing a Shewhart xbar chart """
     qcc_type = 't2single'
     description = ('T2 single', 'Hotelling T^2 chart for individual observations')
 
-    def get_sizes(self, data):
-        return DataSizes(data.shape[0], 1, data.shape[1])
+    def stats(self, data, center=None, cov=None, decomposition=False, covariance='sample',
+              confidence_level=None, n_jobs=None, seed=None):
+        """ covariance is 'sample', 'shrinkage' (Ledoit-Wolf), 'mcd' (FAST-MCD), or 'trimming'
 
-    def stats(self, data, center=None, cov=None):
+        The robust estimates 'mcd' and 'trimming' (iterative removal of observations
+        beyond the phase I UCL) replace center and cov if these are not given; the
+        observations used for the estimates are returned as support.
+        """
         data = pd.DataFrame(data)
         m, _, _ = self.get_sizes(data)
 
+        robust = None
+        if covariance == 'mcd':
+            robust = fastMCD(data.values, n_jobs=n_jobs, seed=seed)
+        elif covariance == 'trimming':
+            robust = iterativeTrimming(data.values, confidence_level=confidence_level)
+        if robust is not None and cov is None:
+            cov = pd.DataFrame(robust.cov, index=data.columns, columns=data.columns)
+
         if center is None:
-            center = np.mean(data, axis=0)
+            center = np.mean(data, axis=0) if robust is None else pd.Series(robust.center, index=data.columns)
         else:
             center = pd.DataFrame(center)
-        x = data.sub(center.values.flatten(), axis=1)
+        x = data.values - np.asarray(center.values, dtype=float).reshape(1, -1)
         if cov is None:
-            cov = np.transpose(x) @ x
-            cov = cov / (m - 1)
-        cov_inv = linalg.inv(cov)
-        T2 = x.apply(lambda x: x @ cov_inv @ x, axis=1)
-        return GroupStatistics(statistics=T2, means=data, center=center, cov=cov)
+            if covariance == 'sample':
+                cov = x.T @ x / (m - 1)
+            elif covariance == 'shrinkage':
+                cov = ledoitWolfCovariance(data.values).cov
+            else:
+                raise ValueError(f"covariance '{covariance}' is not supported; "
+                                 "use 'sample', 'shrinkage', 'mcd', or 'trimming'")
+            cov = pd.DataFrame(cov, index=data.columns, columns=data.columns)
+        support = None if robust is None else robust.support
+        return _t2Statistics(x, cov, data, center, decomposition)._replace(support=support)
 
     def limits(self, ngroups, size, nvars, conf):
         m = ngroups  # num. of samples
         # n = size  # samples sizes # @UnusedVariable
         p = nvars  # num. of variables
 
+        if m - p - 1 <= 0:
+            # too few samples for the exact limits, e.g. with a shrinkage covariance;
+            # use the asymptotic chi-square limits
+            ucl = stats.chi2(p).ppf(conf)
+            return {'control': pd.DataFrame([{'LCL': 0, 'UCL': ucl}]),
+                    'prediction': pd.DataFrame([{'LPL': 0, 'UPL': ucl}])}
+
         # Phase 1 control limits
         ucl = (m - 1)**2 / m * stats.beta(p / 2, (m - p - 1) / 2).ppf(conf)
         lcl = 0
@@ -128,6 +212,122 @@ class T2single_statistic:
         return {'control': control, 'prediction': prediction}
 
 
+class T2pca_statistic(IndividualObservations):
+    """ Hotelling T^2 of the leading principal components and SPE of the residuals
+
+    The covariance is represented by a PCAModel, so the p x p covariance matrix is never
+    formed. The control limits are those of a T2single chart with n_components variables.
+    """
+    qcc_type = 't2pca'
+    description = ('T2 PCA', 'Hotelling T^2 chart on principal components with SPE')
+
+    def stats(self, data, center=None, cov=None, n_components=None, svd='full', seed=None):
+        """ cov is a fitted PCAModel; otherwise the model is fitted to data """
+        data = pd.DataFrame(data)
+        model = cov
+        if model is None:
+            model = PCAModel.fit(data.values, n_components=n_components, svd=svd, seed=seed, center=center)
+        T2 = pd.Series(model.T2(data.values), index=data.index)
+        spe = pd.Series(model.SPE(data.values), index=data.index)
+        center = pd.Series(model.center, index=data.columns)
+        return GroupStatistics(statistics=T2, means=data, center=center, cov=model, spe=spe)
+
+    def limits(self, ngroups, size, nvars, conf):
+        return T2single_statistic().limits(ngroups, size, nvars, conf)
+
+
+class MEWMA_statistic(IndividualObservations):
+    """ Multivariate EWMA chart for individual observations (Lowry et al.) """
+    qcc_type = 'mewma'
+    description = ('MEWMA', 'Multivariate exponentially weighted moving average chart')
+
+    def stats(self, data, center=None, cov=None, state=None, smooth=0.1):
+        """ state continues the recursion of a previous call, e.g. for phase II data """
+        data = pd.DataFrame(data)
+        if state is None:
+            center, cov = _centerCov(data, center, cov)
+            state = MEWMAState(center, cov, smooth=smooth)
+        statistics = pd.Series(state.update(data.values), index=data.index)
+        return GroupStatistics(statistics=statistics, means=data, center=center, cov=cov, state=state)
+
+    def limits(self, ngroups, size, nvars, conf, decision_interval=None, **kwargs):
+        """ decision_interval defaults to the value with in-control ARL 1 / (1 - conf)
+
+        The default is found by simulation (see _decisionIntervalLimits), which takes
+        a few seconds; pass decision_interval to avoid it.
+        """
+        return _decisionIntervalLimits(self.qcc_type, nvars, conf, decision_interval, **kwargs)
+
+
+class MCUSUM_statistic(IndividualObservations):
+    """ Crosier's multivariate CUSUM chart for individual observations """
+    qcc_type = 'mcusum'
+    description = ('MCUSUM', "Crosier's multivariate cumulative sum chart")
+
+    def stats(self, data, center=None, cov=None, state=None, se_shift=1):
+        """ state continues the recursion of a previous call, e.g. for phase II data """
+        data = pd.DataFrame(data)
+        if state is None:
+            center, cov = _centerCov(data, center, cov)
+            state = MCUSUMState(center, cov, k=se_shift / 2)
+        statistics = pd.Series(state.update(data.values), index=data.index)
+        return GroupStatistics(statistics=statistics, means=data, center=center, cov=cov, state=state)
+
+    def limits(self, ngroups, size, nvars, conf, decision_interval=None, **kwargs):
+        """ decision_interval defaults to the value with in-control ARL 1 / (1 - conf)
+
+        The default is found by simulation (see _decisionIntervalLimits), which takes
+        a few seconds; pass decision_interval to avoid it.
+        """
+        return _decisionIntervalLimits(self.qcc_type, nvars, conf, decision_interval, **kwargs)
+
+
+def _pooledEstimates(values, sampleMeans):
+    """ Overall mean and pooled within sample covariance of (samples x observations x variables) """
+    num_samples, sample_sizes, _ = values.shape
+    d = values - sampleMeans[:, None, :]
+    cov = np.einsum('mni,mnj->ij', d, d) / (sample_sizes - 1) / num_samples
+    return np.nanmean(values, axis=(0, 1)), cov
+
+
+def _centerCov(data, center, cov):
+    if center is None:
+        center = np.mean(data, axis=0)
+    if cov is None:
+        cov = data.cov()
+    return center, cov
+
+
+def _decisionIntervalLimits(qcc_type, nvars, conf, decision_interval, **kwargs):
+    """ Limits of the MEWMA and MCUSUM charts
+
+    Without decision_interval, mqccDecisionInterval searches the interval by Monte
+    Carlo simulation of 500 replications (about 2 seconds at conf=0.999). The fixed
+    seed makes the limits reproducible, and the result is cached for repeated charts
+    with the same settings.
+    """
+    if decision_interval is None:
+        decision_interval = _simulatedDecisionInterval(qcc_type, nvars, conf, **kwargs)
+    return {'control': pd.DataFrame([{'LCL': 0, 'UCL': decision_interval}]),
+            'prediction': pd.DataFrame([{'LPL': 0, 'UPL': decision_interval}])}
+
+
+@lru_cache(maxsize=64)
+def _simulatedDecisionInterval(qcc_type, nvars, conf, **kwargs):
+    return mqccDecisionInterval(qcc_type, nvars=nvars, arl0=1 / (1 - conf), N=500, seed=0, **kwargs)
+
+
+def _t2Statistics(x, cov, means, center, decomposition, scale=1):
+    """ scale * T^2 of the deviations x and optionally the terms of its MYT decomposition """
+    T2, contributions = hotellingT2(x, cov, decomposition=True)
+    T2 = pd.Series(scale * T2, index=means.index)
+    if decomposition:
+        contributions = pd.DataFrame(scale * contributions, index=means.index, columns=means.columns)
+    else:
+        contributions = None
+    return GroupStatistics(statistics=T2, means=means, center=center, cov=cov, decomposition=contributions)
+
+
 # > limits.T2.single
 # function (ngroups, size = 1, nvars, conf)
 # {
@@ -0,0 +1,84 @@
+# pylint: disable=too-many-arguments
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Phase II scoring of multivariate observations against a frozen T^2 chart
+'''
+from collections import namedtuple
+
+import numpy as np
+from scipy import linalg
+
+MQCCScore = namedtuple('MQCCScore', 'index,T2,beyondLimits,beyondPredLimits')
+
+
+class StreamingMQCC:
+    """ Score batches of multivariate observations against frozen phase I estimates
+
+    Center, the Cholesky factor of the covariance matrix and the control and prediction
+    limits are fixed when the scorer is created; score() only uses numpy arrays. For
+    subgrouped data (sample_size > 1), a batch is an array of shape
+    (groups, sample_size, variables) and T^2 is computed from the subgroup means.
+    limits and pred_limits are (lower, upper) tuples or None.
+    """
+
+    def __init__(self, center, cov, sample_size=1, limits=None, pred_limits=None):
+        self.center = np.asarray(center, dtype=float).reshape(-1)
+        self.cov = np.asarray(cov, dtype=float)
+        self.sample_size = sample_size
+        self.limits = limits
+        self.pred_limits = pred_limits
+        self.cholesky = linalg.cholesky(self.cov, lower=True)
+        self.count = 0
+
+    @classmethod
+    def fromChart(cls, mqcc):
+        """ Create a scorer that continues a MultivariateQualityControlChart
+
+        Only T^2 charts with a covariance matrix ('t2' and 't2single') are supported;
+        PCA, MEWMA and MCUSUM charts raise a ValueError.
+        """
+        if mqcc.qcc_type not in ('t2', 't2single'):
+            raise ValueError(f"chart type '{mqcc.qcc_type}' is not supported; use a T2 chart")
+        num_samples, sample_sizes, p = mqcc.sizes
+        limits = None
+        if mqcc.limits is not None:
+            limits = (float(mqcc.limits['LCL'].iloc[0]), float(mqcc.limits['UCL'].iloc[0]))
+        pred_limits = mqcc.pred_limits
+        if pred_limits is None:
+            pred_limits = mqcc.statistic.limits(num_samples, sample_sizes, p, mqcc.confidence_level)['prediction']
+        pred_limits = (float(pred_limits['LPL'].iloc[0]), float(pred_limits['UPL'].iloc[0]))
+        return cls(np.asarray(mqcc.stats.center, dtype=float), mqcc.stats.cov, sample_size=sample_sizes,
+                   limits=limits, pred_limits=pred_limits)
+
+    def score(self, batch, decomposition=False):
+        """ Return the T^2 values and limit violations of a batch as MQCCScore
+
+        With decomposition=True, the MYT decomposition terms are returned in addition.
+        """
+        batch = np.asarray(batch, dtype=float)
+        if self.sample_size > 1:
+            if batch.ndim == 2:
+                batch = batch[None, :, :]
+            batch = np.nanmean(batch, axis=1)
+        elif batch.ndim == 1:
+            batch = batch[None, :]
+        z = linalg.solve_triangular(self.cholesky, (batch - self.center).T, lower=True, check_finite=False).T
+        contributions = self.sample_size * z ** 2
+        T2 = np.sum(contributions, axis=1)
+
+        index = np.arange(self.count, self.count + len(T2))
+        self.count += len(T2)
+        result = MQCCScore(index, T2, _beyond(T2, self.limits), _beyond(T2, self.pred_limits))
+        if decomposition:
+            return result, contributions
+        return result
+
+
+def _beyond(T2, limits):
+    if limits is None:
+        return np.zeros(len(T2), dtype=bool)
+    return (T2 < limits[0]) | (T2 > limits[1])
@@ -0,0 +1,158 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mistat.mqcc import MultivariateQualityControlChart
+from mistat.mqcc.covariance import (PCAModel, _cStepsToConvergence, fastMCD,
+                                    iterativeTrimming, ledoitWolfCovariance,
+                                    randomizedSVD)
+
+
+def lowRankData(m=200, p=300, seed=1):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(m, 4)) * [5, 4, 3, 2]
+    return latent @ np.linalg.qr(rng.normal(size=(p, 4)))[0].T + 0.1 * rng.normal(size=(m, p))
+
+
+def contaminatedData(m=500, outliers=75, seed=1):
+    rng = np.random.default_rng(seed)
+    cov = [[1, 0.5, 0], [0.5, 1, 0.3], [0, 0.3, 1]]
+    x = rng.multivariate_normal([0, 0, 0], cov, size=m)
+    x[:outliers] += [5, 5, -5]
+    return x, np.array(cov)
+
+
+class TestCovariance(unittest.TestCase):
+    def test_ledoitWolfCovariance(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(size=(30, 50))
+        cov, shrinkage = ledoitWolfCovariance(x)
+        assert 0 < shrinkage <= 1
+        assert np.all(np.linalg.eigvalsh(cov) > 0)
+        # the trace of the maximum likelihood estimate is preserved
+        assert np.trace(cov) == pytest.approx(np.trace(np.cov(x, rowvar=False, ddof=0)))
+
+        sklearn = pytest.importorskip('sklearn.covariance')
+        expected, expectedShrinkage = sklearn.ledoit_wolf(x)
+        np.testing.assert_array_almost_equal(cov, expected)
+        assert shrinkage == pytest.approx(expectedShrinkage)
+
+    def test_randomizedSVD(self):
+        x = lowRankData()
+        U, s, Vt = randomizedSVD(x, 4, seed=1)
+        _, expected, expectedVt = np.linalg.svd(x, full_matrices=False)
+        np.testing.assert_array_almost_equal(s, expected[:4])
+        np.testing.assert_array_almost_equal(np.abs(np.sum(Vt * expectedVt[:4], axis=1)), np.ones(4))
+        assert U.shape == (200, 4)
+
+    def test_PCAModel(self):
+        x = lowRankData()
+        model = PCAModel.fit(x)
+        assert model.n_components == 4
+        # with all components, T2 is the T2 of the sample covariance and SPE vanishes
+        full = PCAModel.fit(x[:, :20], n_components=20)
+        xc = x[:, :20] - x[:, :20].mean(axis=0)
+        expected = np.sum(xc @ np.linalg.inv(np.cov(xc, rowvar=False)) * xc, axis=1)
+        np.testing.assert_array_almost_equal(full.T2(x[:, :20]), expected)
+        np.testing.assert_array_almost_equal(full.SPE(x[:, :20]), np.zeros(200))
+
+        randomized = PCAModel.fit(x, n_components=4, svd='randomized', seed=1)
+        np.testing.assert_array_almost_equal(randomized.T2(x), model.T2(x))
+        np.testing.assert_array_almost_equal(randomized.SPE(x), model.SPE(x))
+        assert np.mean(model.SPE(x) > model.speLimit(0.99)) < 0.05
+
+        with pytest.raises(ValueError):
+            PCAModel.fit(x, svd='randomized')
+        with pytest.raises(ValueError):
+            PCAModel.fit(x, svd='other')
+
+    def test_chart(self):
+        x = pd.DataFrame(lowRankData())
+        newdata = x.iloc[:20] + 1
+        mqcc = MultivariateQualityControlChart(x, qcc_type='T2single', covariance='pca', n_components=4,
+                                               newdata=newdata)
+        assert mqcc.qcc_type == 't2pca'
+        assert mqcc.stats.cov.n_components == 4
+        assert len(mqcc.newstats.spe) == 20
+        # the shift is orthogonal to the model
+        assert set(range(200, 220)) <= set(mqcc.violations['beyondSPELimit'])
+
+        mqcc = MultivariateQualityControlChart(x.iloc[:50, :80], qcc_type='T2single', covariance='shrinkage')
+        assert mqcc.qcc_type == 't2single'
+        assert np.all(np.isfinite(mqcc.stats.statistics))
+        assert mqcc.limits['UCL'].iloc[0] > 0
+
+        with pytest.raises(ValueError):
+            MultivariateQualityControlChart(x, qcc_type='T2single', covariance='other')
+
+    def test_fastMCD(self):
+        x, cov = contaminatedData()
+        result = fastMCD(x, n_starts=100, seed=1)
+        assert not result.support[:75].any()
+        assert np.mean(result.support[75:]) > 0.95
+        np.testing.assert_allclose(result.center, np.zeros(3), atol=0.15)
+        np.testing.assert_allclose(result.cov, cov, atol=0.2)
+
+        # the starts are independent of the number of processes
+        parallel = fastMCD(x, n_starts=100, seed=1, n_jobs=2)
+        np.testing.assert_array_equal(parallel.support, result.support)
+        np.testing.assert_array_almost_equal(parallel.cov, result.cov)
+
+        # the subsample is only used to find the start
+        subsampled = fastMCD(x, n_starts=100, subsample_size=200, seed=1)
+        np.testing.assert_array_equal(subsampled.support, result.support)
+
+        sklearn = pytest.importorskip('sklearn.covariance')
+        expected = sklearn.MinCovDet(random_state=1).fit(x)
+        np.testing.assert_allclose(result.center, expected.location_, atol=0.02)
+        assert np.mean(result.support == expected.support_) > 0.99
+
+    def test_cStepsToConvergence(self):
+        x, _ = contaminatedData()
+        # the log-determinant belongs to the returned covariance matrix
+        for max_iter in (1, 2, 100):
+            logdet, _, cov = _cStepsToConvergence(x, np.zeros(3), np.eye(3), 300, max_iter=max_iter)
+            assert logdet == pytest.approx(np.linalg.slogdet(cov)[1])
+
+    def test_iterativeTrimming(self):
+        x, _ = contaminatedData(outliers=20)
+        result = iterativeTrimming(x)
+        assert not result.support[:20].any()
+        assert np.mean(result.support[20:]) > 0.98
+        np.testing.assert_array_almost_equal(result.center, np.mean(x[result.support], axis=0))
+
+    def test_robustChart(self):
+        x, _ = contaminatedData()
+        x = pd.DataFrame(x, columns=['a', 'b', 'c'])
+        mqcc = MultivariateQualityControlChart(x, qcc_type='T2single', covariance='mcd', seed=1)
+        assert not mqcc.stats.support[:75].any()
+        assert set(range(75)) <= set(mqcc.violations['beyondLimits']['UCL'])
+        # the outliers inflate the classical estimates and mask themselves
+        classical = MultivariateQualityControlChart(x, qcc_type='T2single')
+        assert classical.stats.support is None
+        assert len(classical.violations['beyondLimits']['UCL']) < 75
+
+        x, _ = contaminatedData(outliers=20)
+        mqcc = MultivariateQualityControlChart(pd.DataFrame(x), qcc_type='T2single', covariance='trimming')
+        assert not mqcc.stats.support[:20].any()
+        assert set(range(20)) <= set(mqcc.violations['beyondLimits']['UCL'])
+
+        rng = np.random.default_rng(1)
+        data = {k: rng.normal(size=(30, 5)) for k in 'abc'}
+        for values in data.values():
+            values[:3] += 2
+        for covariance in ('mcd', 'trimming'):
+            mqcc = MultivariateQualityControlChart(data, covariance=covariance, seed=1)
+            assert not mqcc.stats.support[:3].any()
+            assert {0, 1, 2} <= set(mqcc.violations['beyondLimits']['UCL'])
+
+        with pytest.raises(ValueError):
+            MultivariateQualityControlChart(x, qcc_type='mewma', covariance='mcd', decision_interval=10)
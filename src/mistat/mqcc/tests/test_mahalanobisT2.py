@@ -0,0 +1,61 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pytest
+
+import mistat
+from mistat.mqcc import MahalanobisT2, mahalanobisT2Pairs, mahalanobisT2Region
+
+
+class TestMahalanobisT2(unittest.TestCase):
+    def test_MahalanobisT2(self):
+        hadpas = mistat.load_data('HADPAS')
+        data = hadpas[hadpas.hyb.isin([1, 2])][['hyb', 'res3', 'res7']]
+        mahalanobis = MahalanobisT2(data, 'hyb', compare_to=[15, 5])
+        # previous numerical solution
+        np.testing.assert_allclose(mahalanobis.coord.values,
+                                   [[295.871421, 101.108937], [240.593750, 82.218750], [185.316079, 63.328563]],
+                                   rtol=1e-5)
+        np.testing.assert_allclose(mahalanobis.mahalanobis, [3.384867, 2.752472, 2.120077], rtol=1e-5)
+        assert mahalanobis.mahalanobis_compare == pytest.approx(0.17267, rel=1e-4)
+
+        # the endpoints are on the boundary of the critical region
+        cov_inv = np.linalg.inv(mahalanobis.cov.values)
+        for row in ('LCR', 'UCR'):
+            delta = mahalanobis.coord.loc[row].values - mahalanobis.D2.values
+            assert mahalanobis.K * delta @ cov_inv @ delta == pytest.approx(mahalanobis.Qf)
+
+        # more than two responses
+        data = hadpas[hadpas.hyb.isin([1, 2])].drop(columns='diska')
+        mahalanobis = MahalanobisT2(data, 'hyb')
+        assert mahalanobis.coord.shape == (3, 5)
+        radius = np.sqrt(mahalanobis.Qf / mahalanobis.K)
+        np.testing.assert_allclose(np.diff(mahalanobis.mahalanobis), [-radius, -radius])
+
+    def test_mahalanobisT2Pairs(self):
+        hadpas = mistat.load_data('HADPAS')
+        data = hadpas[['hyb', 'res3', 'res7']]
+        result = mahalanobisT2Pairs(data, 'hyb')
+        assert len(result) == 15
+        for (level1, level2), row in result.iterrows():
+            expected = MahalanobisT2(data[data.hyb.isin([level1, level2])], 'hyb').mahalanobis
+            np.testing.assert_allclose(row.values, expected.values)
+
+    def test_mahalanobisT2Region(self):
+        rng = np.random.default_rng(1)
+        D2 = rng.normal(size=(10, 3))
+        cov = np.stack([np.cov(rng.normal(size=(20, 3)), rowvar=False) for _ in range(10)])
+        batch = mahalanobisT2Region(D2, cov, 20)
+        assert batch.coord.shape == (10, 3, 3)
+        for i in range(10):
+            single = mahalanobisT2Region(D2[i], cov[i], 20)
+            np.testing.assert_allclose(batch.coord[i], single.coord)
+            np.testing.assert_allclose(batch.mahalanobis[i], single.mahalanobis)
+            # ordered by decreasing value of the second variable
+            assert np.all(np.diff(single.coord[:, 1]) <= 0)
@@ -0,0 +1,83 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mistat.mqcc import MultivariateQualityControlChart
+from mistat.mqcc.multivariateCharts import (MCUSUMState, MEWMAState, mqccArl,
+                                            mqccDecisionInterval)
+
+
+class TestMultivariateCharts(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.cov = np.array([[2, 0.5], [0.5, 1]])
+        self.x = rng.multivariate_normal([1, 2], self.cov, size=30)
+
+    def test_MEWMAState(self):
+        state = MEWMAState([1, 2], self.cov, smooth=0.2)
+        T2 = np.concatenate([state.update(self.x[:10]), state.update(self.x[10])[:1], state.update(self.x[11:])])
+
+        z = np.zeros(2)
+        covInv = np.linalg.inv(self.cov)
+        for t, xt in enumerate(self.x, 1):
+            z = 0.2 * (xt - [1, 2]) + 0.8 * z
+            factor = 0.2 / 1.8 * (1 - 0.8 ** (2 * t))
+            assert T2[t - 1] == pytest.approx(z @ covInv @ z / factor)
+        assert state.count == 30
+
+    def test_MCUSUMState(self):
+        state = MCUSUMState([1, 2], self.cov, k=0.5)
+        statistic = np.concatenate([state.update(self.x[:7]), state.update(self.x[7:])])
+
+        s = np.zeros(2)
+        covInv = np.linalg.inv(self.cov)
+        for t, xt in enumerate(self.x):
+            c = np.sqrt((s + xt - [1, 2]) @ covInv @ (s + xt - [1, 2]))
+            s = np.zeros(2) if c <= 0.5 else (s + xt - [1, 2]) * (1 - 0.5 / c)
+            assert statistic[t] == pytest.approx(np.sqrt(s @ covInv @ s))
+
+    def test_mqccArl(self):
+        # Lowry et al. (1992): p=2, smooth=0.1, h=8.66 has in-control ARL 200
+        result = mqccArl('mewma', nvars=2, h=8.66, asymptotic=True, N=1000, seed=1)
+        assert result['statistic']['ARL'] == pytest.approx(200, rel=0.1)
+        result = mqccArl('mewma', nvars=2, h=8.66, shift=1, asymptotic=True, N=1000, seed=1)
+        assert result['statistic']['ARL'] == pytest.approx(10.2, rel=0.05)
+
+        result = mqccArl('mcusum', nvars=2, h=5.5, N=1000, seed=1)
+        assert result['statistic']['ARL'] == pytest.approx(200, rel=0.1)
+        assert len(result['rls']) == 1000
+
+        with pytest.raises(ValueError):
+            mqccArl('t2', h=5)
+
+    def test_mqccDecisionInterval(self):
+        h = mqccDecisionInterval('mewma', nvars=2, arl0=200, asymptotic=True, seed=1)
+        assert h == pytest.approx(8.66, abs=0.2)
+        h = mqccDecisionInterval('mcusum', nvars=2, arl0=100, N=500, seed=1)
+        result = mqccArl('mcusum', nvars=2, h=h, N=1000, seed=2)
+        assert result['statistic']['ARL'] == pytest.approx(100, rel=0.1)
+
+    def test_chart(self):
+        data = pd.DataFrame(self.x[:20])
+        newdata = pd.DataFrame(self.x[20:])
+        for qcc_type in ('mewma', 'mcusum'):
+            mqcc = MultivariateQualityControlChart(data, qcc_type=qcc_type, newdata=newdata, decision_interval=10)
+            assert mqcc.qcc_type == qcc_type
+            assert mqcc.limits['UCL'].iloc[0] == 10
+            # phase II continues the recursion of the calibration data
+            full = MultivariateQualityControlChart(pd.concat([data, newdata]), qcc_type=qcc_type,
+                                                   center=mqcc.stats.center, cov=mqcc.stats.cov,
+                                                   decision_interval=10)
+            np.testing.assert_array_almost_equal(mqcc.newstats.statistics, full.stats.statistics[20:])
+
+        mqcc = MultivariateQualityControlChart(data, qcc_type='mewma', smooth=0.3, confidence_level=0.99)
+        assert mqcc.stats.state.smooth == 0.3
+        assert 8 < mqcc.limits['UCL'].iloc[0] < 10
@@ -11,7 +11,7 @@ import numpy as np
 import pandas as pd
 
 from mistat.mqcc.statistics import (MQCCStatistics, T2_statistic,
-                                    T2single_statistic)
+                                    T2single_statistic, hotellingT2)
 
 
 class Test_mqccStatistics(unittest.TestCase):
@@ -79,3 +79,25 @@ class Test_mqccStatistics(unittest.TestCase):
         result = T2.limits(len(data), 1, 8, 0.999)
         np.testing.assert_array_almost_equal(result['control'].values[0],  [0, 17.417047])
         np.testing.assert_array_almost_equal(result['prediction'].values[0],  [0, 70.029432])
+
+    def test_hotellingT2(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(size=(50, 4)) @ rng.normal(size=(4, 4))
+        cov = np.cov(x, rowvar=False)
+        x = x - x.mean(axis=0)
+        expected = np.array([xi @ np.linalg.inv(cov) @ xi for xi in x])
+        np.testing.assert_array_almost_equal(hotellingT2(x, cov), expected)
+
+        # MYT decomposition: the terms add up to T2, the first term is the
+        # unconditional term of the first variable
+        T2, contributions = hotellingT2(x, cov, decomposition=True)
+        np.testing.assert_array_almost_equal(contributions.sum(axis=1), T2)
+        np.testing.assert_array_almost_equal(contributions[:, 0], x[:, 0] ** 2 / cov[0, 0])
+        # the last term is the T2 of all variables minus the T2 of the first three
+        np.testing.assert_array_almost_equal(contributions[:, 3], T2 - hotellingT2(x[:, :3], cov[:3, :3]))
+
+        data = pd.DataFrame(x, columns=['a', 'b', 'c', 'd'])
+        result = T2single_statistic().stats(data, decomposition=True)
+        assert list(result.decomposition.columns) == ['a', 'b', 'c', 'd']
+        np.testing.assert_array_almost_equal(result.decomposition.sum(axis=1), result.statistics)
+        assert T2single_statistic().stats(data).decomposition is None
@@ -0,0 +1,75 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mistat.data import load_data
+from mistat.mqcc import MultivariateQualityControlChart, StreamingMQCC
+
+
+class TestStreamingMQCC(unittest.TestCase):
+    def test_T2single(self):
+        almpin = load_data('ALMPIN')
+        base = almpin.iloc[:30, ]
+        newdata = almpin.iloc[30:, ]
+        mqcc = MultivariateQualityControlChart(base, qcc_type='T2single', newdata=newdata)
+
+        scorer = StreamingMQCC.fromChart(mqcc)
+        first = scorer.score(newdata.values[:25])
+        second = scorer.score(newdata.values[25:])
+        T2 = np.concatenate([first.T2, second.T2])
+        np.testing.assert_array_almost_equal(T2, mqcc.newstats.statistics)
+        np.testing.assert_array_equal(second.index, np.arange(25, 40))
+
+        upl = mqcc.pred_limits['UPL'].iloc[0]
+        np.testing.assert_array_equal(np.concatenate([first.beyondPredLimits, second.beyondPredLimits]),
+                                      mqcc.newstats.statistics.values > upl)
+        np.testing.assert_array_equal(first.beyondLimits, first.T2 > mqcc.limits['UCL'].iloc[0])
+
+        # single observation and MYT decomposition
+        result, contributions = scorer.score(newdata.values[0], decomposition=True)
+        assert result.T2[0] == pytest.approx(np.sum(contributions))
+        assert result.T2[0] == pytest.approx(first.T2[0])
+
+    def test_T2(self):
+        rng = np.random.default_rng(1)
+        values = rng.normal(size=(25, 4, 3))
+        data = {f'X{i}': values[:, :, i] for i in range(3)}
+        newvalues = rng.normal(0.5, 1, size=(10, 4, 3))
+        newdata = {f'X{i}': newvalues[:, :, i] for i in range(3)}
+        mqcc = MultivariateQualityControlChart(data, newdata=newdata)
+
+        scorer = StreamingMQCC.fromChart(mqcc)
+        result = scorer.score(newvalues)
+        np.testing.assert_array_almost_equal(result.T2, mqcc.newstats.statistics)
+        assert scorer.score(newvalues[0]).T2[0] == pytest.approx(result.T2[0])
+
+        # prediction limits are computed if the chart has none
+        mqcc = MultivariateQualityControlChart(data)
+        assert mqcc.pred_limits is None
+        scorer = StreamingMQCC.fromChart(mqcc)
+        assert scorer.pred_limits[1] > scorer.limits[1]
+
+    def test_fromChart_unsupported(self):
+        rng = np.random.default_rng(1)
+        data = pd.DataFrame(rng.normal(size=(50, 4)), columns=['a', 'b', 'c', 'd'])
+        for options in [{'qcc_type': 'T2single', 'covariance': 'pca', 'n_components': 2},
+                        {'qcc_type': 'T2single', 'covariance': 'randomized', 'n_components': 2, 'seed': 1},
+                        {'qcc_type': 'mewma', 'decision_interval': 10},
+                        {'qcc_type': 'mcusum', 'decision_interval': 5}]:
+            mqcc = MultivariateQualityControlChart(data, **options)
+            with pytest.raises(ValueError):
+                StreamingMQCC.fromChart(mqcc)
+
+        # robust and shrinkage covariance estimates are supported
+        for covariance in ('shrinkage', 'mcd', 'trimming'):
+            mqcc = MultivariateQualityControlChart(data, qcc_type='T2single', covariance=covariance, seed=1)
+            scorer = StreamingMQCC.fromChart(mqcc)
+            np.testing.assert_array_almost_equal(scorer.score(data.values).T2, mqcc.stats.statistics)
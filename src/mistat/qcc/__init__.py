@@ -1,8 +1,11 @@
 # ruff: noqa:F401
+from .arl import RunLengthProperties, cusumArlExact, ewmaArlExact
 from .cusum import Cusum, cusumArl, cusumPfaCed
-from .ewmaChart import EWMA
+from .ewmaChart import EWMA, EWMAState
 from .paretoChart import ParetoChart
 from .processCapability import ProcessCapability
+from .qccBatch import QCCBatchResult, qcc_batch
 from .qualityControlChart import ARL_modifiedShewhartControlChart, QualityControlChart, qcc_groups
 from .shro import shroArlPfaCedNorm
 from .statistics import qccStatistics
+from .streamingQCC import StreamingQCC
@@ -0,0 +1,164 @@
+# pylint: disable=too-many-arguments,too-many-locals
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Run length properties of CUSUM and EWMA charts without simulation
+
+All calculations are done for standardized observations, i.e. the chart statistic
+has standard deviation 1 in control and shift is measured in standard errors.
+'''
+from collections import namedtuple
+
+import numpy as np
+from scipy import stats
+
+RunLengthProperties = namedtuple('RunLengthProperties', 'ARL,sdRL,steadyStateARL,pmf')
+
+
+def cusumArlExact(k=0.5, h=5, shift=0, side='upper', head_start=0, method='integral', m=None,
+                  distribution=False):
+    """ Run length properties of a CUSUM chart with reference value k and decision interval h
+
+    method is either 'markov' (Brook-Evans Markov chain with m states, default 100) or
+    'integral' (Gauss-Legendre solution of the integral equation with m nodes, default
+    40). The steady-state ARL assumes the chart is in its conditional in-control
+    steady-state distribution when the shift occurs.
+
+    For side='both', the ARL of the two one-sided schemes are combined using
+    1/ARL = 1/ARL+ + 1/ARL-; sdRL and the run length distribution are not available
+    in this case.
+    """
+    side = side.lower()
+    if side not in ('both', 'upper', 'lower'):
+        raise ValueError(f"side = '{side}' is not supported.")
+    if h <= 0:
+        raise ValueError('decision interval h must be positive')
+    if not 0 <= head_start < h:
+        raise ValueError('head_start must be non-negative and less than h')
+    if side == 'both':
+        upper = cusumArlExact(k, h, shift, 'upper', head_start, method, m)
+        lower = cusumArlExact(k, h, shift, 'lower', head_start, method, m)
+        return RunLengthProperties(
+            ARL=1 / (1 / upper.ARL + 1 / lower.ARL), sdRL=None,
+            steadyStateARL=1 / (1 / upper.steadyStateARL + 1 / lower.steadyStateARL), pmf=None)
+    # the lower CUSUM of x is the upper CUSUM of -x
+    if side == 'lower':
+        shift = -shift
+
+    transient = {'markov': _cusumMarkovChain, 'integral': _cusumIntegralEquation}[_method(method)]
+    if m is None:
+        m = 100 if method == 'markov' else 40
+    R, startRow = transient(k, h, shift, head_start, m)
+    R0, _ = transient(k, h, 0, head_start, m)
+    return _runLengthProperties(R, startRow, R0, distribution)
+
+
+def ewmaArlExact(smooth=0.2, nsigmas=3, shift=0, method='integral', m=None, distribution=False):
+    """ Run length properties of an EWMA chart with asymptotic control limits
+
+    The chart starts at the center line and signals when the EWMA statistic is
+    outside of +/- nsigmas * sqrt(smooth / (2 - smooth)). method is either 'markov'
+    (Lucas-Saccucci Markov chain with m states, default 101) or 'integral'
+    (Gauss-Legendre solution of the integral equation with m nodes, default 40).
+    """
+    if not 0 < smooth <= 1:
+        raise ValueError('smooth parameter must be between 0 and 1')
+    transient = {'markov': _ewmaMarkovChain, 'integral': _ewmaIntegralEquation}[_method(method)]
+    if m is None:
+        m = 101 if method == 'markov' else 40
+    H = nsigmas * np.sqrt(smooth / (2 - smooth))
+    R, startRow = transient(smooth, H, shift, m)
+    R0, _ = transient(smooth, H, 0, m)
+    return _runLengthProperties(R, startRow, R0, distribution)
+
+
+def _method(method):
+    if method not in ('markov', 'integral'):
+        raise ValueError(f"method '{method}' is not supported; use 'markov' or 'integral'")
+    return method
+
+
+def _cusumMarkovChain(k, h, shift, head_start, m):
+    """ Brook-Evans approximation; state 0 is the value 0, state i the interval around i*w """
+    w = 2 * h / (2 * m - 1)
+    centers = np.arange(m) * w
+    upper = centers[None, :] + w / 2 - centers[:, None] + k - shift
+    cdf = stats.norm.cdf(upper)
+    R = np.diff(cdf, axis=1, prepend=0)
+    start = min(int(np.round(head_start / w)), m - 1)
+    return R, R[start]
+
+
+def _cusumIntegralEquation(k, h, shift, head_start, m):
+    """ Nystroem discretization of L(u) = 1 + L(0) F(k - u) + int_0^h L(y) f(y - u + k) dy
+
+    The first node represents the atom of the CUSUM at 0, the remaining nodes are the
+    Gauss-Legendre nodes on [0, h].
+    """
+    x, weights = np.polynomial.legendre.leggauss(m)
+    nodes = np.concatenate([[0], (x + 1) * h / 2])
+    weights = weights * h / 2
+
+    def transitionRow(u):
+        u = np.atleast_1d(u)[:, None]
+        atom = stats.norm.cdf(k - u - shift)
+        density = weights * stats.norm.pdf(nodes[1:] - u + k - shift)
+        return np.hstack([atom, density])
+    return transitionRow(nodes), transitionRow(head_start)[0]
+
+
+def _ewmaMarkovChain(smooth, H, shift, m):
+    """ Lucas-Saccucci approximation with m states of width 2H/m on [-H, H] """
+    w = 2 * H / m
+    centers = -H + (np.arange(m) + 0.5) * w
+    previous = (1 - smooth) * centers[:, None]
+    upper = stats.norm.cdf((centers[None, :] + w / 2 - previous) / smooth - shift)
+    lower = stats.norm.cdf((centers[None, :] - w / 2 - previous) / smooth - shift)
+    R = upper - lower
+    return R, R[np.argmin(np.abs(centers))]
+
+
+def _ewmaIntegralEquation(smooth, H, shift, m):
+    """ Nystroem discretization of L(u) = 1 + 1/smooth int L(y) f((y - (1 - smooth) u) / smooth) dy """
+    x, weights = np.polynomial.legendre.leggauss(m)
+    nodes = x * H
+    weights = weights * H
+
+    def transitionRow(u):
+        u = np.atleast_1d(u)[:, None]
+        return weights / smooth * stats.norm.pdf((nodes - (1 - smooth) * u) / smooth - shift)
+    return transitionRow(nodes), transitionRow(0)[0]
+
+
+def _runLengthProperties(R, startRow, R0, distribution, tolerance=1e-8, maxRunLength=1_000_000):
+    """ Run length properties from the transient part R of the transition matrix
+
+    startRow contains the transition probabilities from the starting point of the
+    chart, so that ARL = 1 + startRow @ L with L = (I - R)^-1 1. The conditional
+    steady-state distribution is the left Perron eigenvector of the in-control
+    matrix R0.
+    """
+    identity = np.eye(len(R))
+    ones = np.ones(len(R))
+    L = np.linalg.solve(identity - R, ones)
+    arl = 1 + startRow @ L
+    # second moments M = 1 + R (2L + M)
+    M = np.linalg.solve(identity - R, 1 + 2 * R @ L)
+    sdRL = np.sqrt(max(1 + startRow @ (2 * L + M) - arl ** 2, 0))
+
+    eigenvalues, eigenvectors = np.linalg.eig(R0.T)
+    steadyState = np.abs(np.real(eigenvectors[:, np.argmax(np.real(eigenvalues))]))
+    steadyStateARL = steadyState @ L / np.sum(steadyState)
+
+    pmf = None
+    if distribution:
+        survival = [1.0]
+        s = ones
+        while survival[-1] > tolerance and len(survival) <= maxRunLength:
+            survival.append(startRow @ s)
+            s = R @ s
+        pmf = -np.diff(survival)
+    return RunLengthProperties(ARL=arl, sdRL=sdRL, steadyStateARL=steadyStateARL, pmf=pmf)
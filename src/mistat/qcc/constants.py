@@ -0,0 +1,137 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Factors for the construction of control charts for arbitrary subgroup sizes
+'''
+from functools import lru_cache, wraps
+
+import numpy as np
+import pandas as pd
+from scipy import special
+from scipy.special import gammaln  # pylint: disable=no-name-in-module
+
+# exp.R.unscaled a vector specifying, for each sample size, the expected value of the relative range
+# (i.e. R/σ) for a normal distribution. This appears as d2 on most tables containing factors for
+# the construction of control charts.
+_exp_R_unscaled = [np.nan, np.nan, 1.128, 1.693, 2.059, 2.326, 2.534, 2.704, 2.847, 2.970, 3.078, 3.173,
+                   3.258, 3.336, 3.407, 3.472, 3.532, 3.588, 3.640, 3.689, 3.735, 3.778, 3.819, 3.858, 3.895, 3.931]
+# se.R.unscaled a vector specifying, for each sample size, the standard error of the relative range
+# (i.e. R/σ) for a normal distribution. This appears as d3 on most tables containing factors for
+# the construction of control charts.
+_se_R_unscaled = [np.nan, np.nan, 0.8525033, 0.8883697, 0.8798108, 0.8640855, 0.8480442, 0.8332108, 0.8198378,
+                  0.8078413, 0.7970584, 0.7873230, 0.7784873, 0.7704257, 0.7630330, 0.7562217, 0.7499188, 0.7440627,
+                  0.7386021, 0.7334929, 0.7286980, 0.7241851, 0.7199267, 0.7158987, 0.7120802, 0.7084528, 0.7050004,
+                  0.7017086, 0.6985648, 0.6955576, 0.6926770, 0.6899137, 0.6872596, 0.6847074, 0.6822502, 0.6798821,
+                  0.6775973, 0.6753910, 0.6732584, 0.6711952, 0.6691976, 0.6672619, 0.6653848, 0.6635632, 0.6617943,
+                  0.6600754, 0.6584041, 0.6567780, 0.6551950, 0.6536532, 0.6521506]
+
+
+# grid and Gauss-Legendre nodes used to integrate the distribution of the range
+_x = np.linspace(-12, 12, 4801)
+_legendreNodes, _legendreWeights = np.polynomial.legendre.leggauss(200)
+
+
+def _memoizedBySize(function):
+    """ Memoize a function of the subgroup size and apply it to scalars or arrays """
+    cached = lru_cache(maxsize=None)(function)
+
+    @wraps(function)
+    def wrapper(n):
+        n = np.asarray(n)
+        if n.ndim == 0:
+            return cached(int(n))
+        unique, inverse = np.unique(n, return_inverse=True)
+        return np.array([cached(int(size)) for size in unique])[inverse].reshape(n.shape)
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+@_memoizedBySize
+def d2(n):
+    """ Expected value of the relative range R/sigma of n normal observations
+
+    Tabulated values are used up to n=25, larger n are integrated numerically from
+    E(R) = int 1 - Phi(x)^n - (1 - Phi(x))^n dx
+    """
+    if n < 2:
+        return np.nan
+    if n < len(_exp_R_unscaled):
+        return _exp_R_unscaled[n]
+    h = _x[1] - _x[0]
+    return h * np.sum(-np.expm1(n * special.log_ndtr(_x)) - np.exp(n * special.log_ndtr(-_x)))
+
+
+@_memoizedBySize
+def d3(n):
+    """ Standard deviation of the relative range R/sigma of n normal observations
+
+    Tabulated values are used up to n=50, larger n are integrated numerically from
+    E(R^2) = 2 int w (1 - F(w)) dw with F(w) = n int phi(x) (Phi(x + w) - Phi(x))^(n-1) dx
+    """
+    if n < 2:
+        return np.nan
+    if n < len(_se_R_unscaled):
+        return _se_R_unscaled[n]
+    h = _x[1] - _x[0]
+    upper = 16
+    w = (_legendreNodes + 1) * upper / 2
+    weights = _legendreWeights * upper / 2
+    pdf = np.exp(-_x ** 2 / 2) / np.sqrt(2 * np.pi)
+    F = n * h * np.sum(pdf * (special.ndtr(_x + w[:, None]) - special.ndtr(_x)) ** (n - 1), axis=1)
+    expectedR2 = 2 * np.sum(weights * w * (1 - F))
+    return np.sqrt(expectedR2 - d2(n) ** 2)
+
+
+def c4(n):
+    """ Expected value of the standard deviation s/sigma of n normal observations """
+    n = np.asarray(n, dtype=float)
+    return np.sqrt(2 / (n - 1)) * np.exp(gammaln(n / 2) - gammaln((n - 1) / 2))
+
+
+def A2(n, nsigmas=3):
+    """ Factor for xbar chart limits based on the average range """
+    return nsigmas / (d2(n) * np.sqrt(n))
+
+
+def A3(n, nsigmas=3):
+    """ Factor for xbar chart limits based on the average standard deviation """
+    return nsigmas / (c4(n) * np.sqrt(n))
+
+
+def B3(n, nsigmas=3):
+    """ Factor for the lower limit of the S chart """
+    return np.maximum(0, 1 - nsigmas * np.sqrt(1 - c4(n) ** 2) / c4(n))
+
+
+def B4(n, nsigmas=3):
+    """ Factor for the upper limit of the S chart """
+    return 1 + nsigmas * np.sqrt(1 - c4(n) ** 2) / c4(n)
+
+
+def D3(n, nsigmas=3):
+    """ Factor for the lower limit of the R chart """
+    return np.maximum(0, 1 - nsigmas * d3(n) / d2(n))
+
+
+def D4(n, nsigmas=3):
+    """ Factor for the upper limit of the R chart """
+    return 1 + nsigmas * d3(n) / d2(n)
+
+
+def E2(n, nsigmas=3):
+    """ Factor for individuals chart limits based on the average moving range """
+    return nsigmas / d2(n)
+
+
+def controlChartConstants(sizes, nsigmas=3):
+    """ Table of control chart factors for the given subgroup sizes """
+    sizes = np.asarray(sizes)
+    return pd.DataFrame({
+        'd2': d2(sizes), 'd3': d3(sizes), 'c4': c4(sizes),
+        'A2': A2(sizes, nsigmas), 'A3': A3(sizes, nsigmas),
+        'B3': B3(sizes, nsigmas), 'B4': B4(sizes, nsigmas),
+        'D3': D3(sizes, nsigmas), 'D4': D4(sizes, nsigmas), 'E2': E2(sizes, nsigmas),
+    }, index=pd.Index(sizes, name='n'))
@@ -12,12 +12,18 @@ import numpy as np
 import pandas as pd
 from scipy import stats
 
+from .arl import cusumArlExact
 from .statistics import Base_statistic, qccStatistics
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover
+    njit = None
+
 
 class Cusum:
     def __init__(self, data, center=None, std_dev=None, sizes=None, head_start=0, decision_interval=5,
-                 se_shift=1, newdata=None):
+                 se_shift=1, newdata=None, newsizes=None):
         data = pd.DataFrame(data)
         if sizes is None:
             sizes = Base_statistic.getSizes(data)
@@ -36,41 +42,12 @@ class Cusum:
             raise ValueError('sizes larger than 1 but data appears to be single samples. '
                              'In this case you must provide also the std_dev')
 
-        qccStatistic = qccStatistics.get(qcc_type)
-        statistics = qccStatistic.stats(data, sizes)
+        self.qccStatistic = qccStatistics.get(qcc_type)
+        statistics = self.qccStatistic.stats(data, sizes)
 
         if center is None:
             center = statistics.center
-        std_dev = qccStatistic.sd(data, std_dev=std_dev, sizes=sizes)
-
-        self.newdata = None
-        if newdata is not None:
-            raise NotImplementedError()
-
-        # center the statistics
-        z = (statistics.statistics.flatten() - center) / (std_dev / np.sqrt(sizes))
-        ldb = -decision_interval
-        udb = decision_interval
-
-        z_f = z - se_shift / 2
-        cusum_pos = [max(0, head_start + z_f[0])]
-        for zfi in z_f[1:]:
-            cusum_pos.append(max(0, cusum_pos[-1] + zfi))
-        cusum_pos = np.array(cusum_pos)
-
-        z_f = z + se_shift / 2
-        cusum_neg = [max(0, head_start - z_f[0])]
-        for zfi in z_f[1:]:
-            cusum_neg.append(max(0, cusum_neg[-1] - zfi))
-        cusum_neg = np.array([-v for v in cusum_neg])
-
-        # convert back to same range as decision boundaries
-        factor = std_dev / np.sqrt(sizes) - se_shift / 2
-        cusum_pos = factor * cusum_pos
-        cusum_neg = factor * cusum_neg
-
-        violations = {'lower': np.where(cusum_neg < ldb)[0],
-                      'upper': np.where(cusum_pos > udb)[0]}
+        std_dev = self.qccStatistic.sd(data, std_dev=std_dev, sizes=sizes)
 
         self.data = data
         self.statistics = statistics.statistics
@@ -78,24 +55,106 @@ class Cusum:
         self.center = center
         self.std_dev = std_dev
 
-        self.pos = cusum_pos
-        self.neg = cusum_neg
         self.head_start = head_start
         self.decision_interval = decision_interval
         self.se_shift = se_shift
-        self.ldb = ldb
-        self.udb = udb
-        self.violations = violations
+        self.ldb = -decision_interval
+        self.udb = decision_interval
+
+        # cumulative sums in units of the standard error; phase II continues from these
+        self._lastPos = head_start
+        self._lastNeg = head_start
+        # results are collected in blocks, so that update() does not copy the history;
+        # the blocks are consolidated on the first read after an update
+        self._blocks = {'pos': [], 'neg': [], 'lower': [], 'upper': [],
+                        'newdata': [], 'newstats': [], 'newsizes': []}
+        self._length = 0
+        self._extend(self.statistics, sizes)
+
+        if newdata is not None:
+            self.update(newdata, newsizes)
+
+    pos = property(lambda self: self._concatenate('pos'))
+    neg = property(lambda self: self._concatenate('neg'))
+    newdata = property(lambda self: self._concatenate('newdata'))
+    newstats = property(lambda self: self._concatenate('newstats'))
+    newsizes = property(lambda self: self._concatenate('newsizes'))
+
+    @property
+    def violations(self):
+        return {'lower': self._concatenate('lower'), 'upper': self._concatenate('upper')}
+
+    def update(self, newdata, newsizes=None):
+        """ Score new groups against the center and std_dev of the chart (phase II)
+
+        The upper and lower cumulative sums continue from their last values, so the
+        cost depends only on the number of new groups. Returns the new values of the
+        upper and lower cumulative sums.
+        """
+        newdata = np.asarray(newdata, dtype=float)
+        if newdata.ndim == 1:
+            newdata = newdata.reshape(-1, 1)
+        if newsizes is None:
+            newsizes = self.qccStatistic.getSizes(newdata)
+        elif isinstance(newsizes, int):
+            newsizes = [newsizes] * len(newdata)
+        elif len(newsizes) != len(newdata):
+            raise ValueError("newsizes length doesn't match with newdata")
+        newstats = np.asarray(self.qccStatistic.stats(newdata, newsizes).statistics, dtype=float).flatten()
+        newsizes = np.asarray(newsizes)
+
+        self._blocks['newdata'].append(newdata)
+        self._blocks['newstats'].append(newstats)
+        self._blocks['newsizes'].append(newsizes)
+        return self._extend(newstats, newsizes)
+
+    def _concatenate(self, name):
+        blocks = self._blocks[name]
+        if not blocks:
+            return None
+        if len(blocks) > 1:
+            blocks[:] = [np.concatenate(blocks)]
+        return blocks[0]
+
+    def _extend(self, statistics, sizes):
+        sizes = np.asarray(sizes)
+        # center the statistics
+        z = (np.asarray(statistics, dtype=float).flatten() - self.center) / (self.std_dev / np.sqrt(sizes))
+        cusum_pos = tabularCusum(z - self.se_shift / 2, self._lastPos)
+        cusum_neg = tabularCusum(-z - self.se_shift / 2, self._lastNeg)
+        if len(z) > 0:
+            self._lastPos = cusum_pos[-1]
+            self._lastNeg = cusum_neg[-1]
+
+        # convert back to same range as decision boundaries
+        factor = self.std_dev / np.sqrt(sizes) - self.se_shift / 2
+        cusum_pos = factor * cusum_pos
+        cusum_neg = -factor * cusum_neg
+
+        self._blocks['lower'].append(self._length + np.where(cusum_neg < self.ldb)[0])
+        self._blocks['upper'].append(self._length + np.where(cusum_pos > self.udb)[0])
+        self._blocks['pos'].append(cusum_pos)
+        self._blocks['neg'].append(cusum_neg)
+        self._length += len(z)
+        return cusum_pos, cusum_neg
+
+    def arl(self, shift=0, side='both', method='integral', m=None, distribution=False):
+        """ Run length properties of the chart for a shift in units of the standard error
+
+        See cusumArlExact for details; the reference value is se_shift / 2 and the
+        decision interval and head start are taken from the chart.
+        """
+        return cusumArlExact(k=self.se_shift / 2, h=self.decision_interval, shift=shift, side=side,
+                             head_start=self.head_start, method=method, m=m, distribution=distribution)
 
     def plot(self, ax=None, title='cusum Chart', xlabel='Group', ylabel='Cumulative Sum'):
         if ax is None:
             _, ax = plt.subplots(figsize=(8, 6))
 
-        if self.newdata is not None:
-            raise NotImplementedError()
-
         statistics = self.statistics
-        indices = list(range(len(statistics)))
+        indices = list(range(self._length))
+        if self.newdata is not None:
+            ax.axvline(len(statistics) - 0.5, color='grey', linestyle=':')
 
         if title is not None:
             ax.set_title(title)
@@ -108,7 +167,8 @@ class Cusum:
         ax.axhline(-self.decision_interval, linestyle=':', color='grey')
 
         indices = np.array(indices)
-        for cs, v in [(self.pos, self.violations['upper']), (self.neg, self.violations['lower'])]:
+        violations = self.violations
+        for cs, v in [(self.pos, violations['upper']), (self.neg, violations['lower'])]:
             v = np.array(v)
             ax.plot(indices, cs, color='grey')
             ax.plot(indices[v], cs[v], marker="s", color='red')
@@ -136,10 +196,19 @@ class Cusum:
 
         fig.text(0.5, 0.1, f'Decision interval (std. err.) = {self.decision_interval}', fontsize=12)
         fig.text(0.5, 0.06, f'Shift detection (std. err.) {self.se_shift}', fontsize=12)
-        nrBeyondLimits = len(self.violations['upper']) + len(self.violations['lower'])
+        nrBeyondLimits = len(violations['upper']) + len(violations['lower'])
         fig.text(0.5, 0.02, f"No. of points beyond limits = {nrBeyondLimits}", fontsize=12)
 
 
+def tabularCusum(z, start=0):
+    """ Tabular CUSUM S_t = max(0, S_(t-1) + z_t) with S_0 = start for all t
+
+    Uses the closed form S_t = C_t - min(0, min_s<=t C_s) with C_t = start + z_1 + ... + z_t.
+    """
+    cumulative = start + np.cumsum(z)
+    return cumulative - np.minimum(np.minimum.accumulate(cumulative), 0)
+
+
 def cusumArl(*, randFunc=None, N=1000, limit=10_000, seed=None,
              kp=1, km=-1, hp=3, hm=-3,
              side='both', verbose=False):
@@ -154,12 +223,7 @@ def cusumArl(*, randFunc=None, N=1000, limit=10_000, seed=None,
     result['run'] = [runLength(randFunc.rvs(limit), kp, km, hp, hm, side) for _ in range(N)]
     rls = np.array([run.rl for run in result['run']])
     result['rls'] = rls
-    # Ignore inf values for statistics calculations
-    rls = np.ma.masked_invalid(rls)
-    result['statistic'] = {
-        'ARL': np.mean(rls),
-        'Std. Error': np.sqrt((np.mean(rls ** 2) - np.mean(rls)) / N),
-    }
+    result['statistic'] = _runLengthStatistic(rls, N)
     if verbose:
         statistic = result['statistic']
         print(f"ARL {statistic['ARL']:.5g}  Std. Error {statistic['Std. Error']:.5g}")
@@ -247,3 +311,206 @@ def runLength(x, kp, km, ubd, lbd, side):
     elif side == 'lower':
         rl = min(vLower)
     return Result(vLower, vUpper, rl)
+
+
+def cusumRunLengths(*, randFunc=None, N=1000, limit=10_000, seed=None,
+                    kp=1, km=-1, hp=3, hm=-3, side='both',
+                    randFunc2=None, tau=None, chunk=256, compiled=False):
+    """ Run lengths of N CUSUM replications simulated in lock-step
+
+    Observations are drawn in chunks of chunk observations for all replications
+    that have not signalled yet; the simulation stops as soon as all replications
+    signalled or limit observations are reached. If randFunc2 and tau are given,
+    the first tau observations are drawn from randFunc and the remaining ones from
+    randFunc2. Run lengths follow the convention of runLength (index of the
+    signalling observation, inf if there is no signal).
+
+    With compiled=True, a numba compiled kernel is used to walk the chunks.
+    """
+    side = side.lower()
+    if side not in ("both", "upper", "lower"):
+        raise ValueError(f"side = '{side}' is not supported.")
+    if compiled and njit is None:
+        raise ImportError('compiled=True requires numba')
+    randFunc = randFunc or stats.norm()
+    rng = np.random.default_rng(seed)
+    upper = side in ('both', 'upper')
+    lower = side in ('both', 'lower')
+
+    rls = np.full(N, np.inf)
+    active = np.arange(N)
+    pos = np.zeros(N)
+    neg = np.zeros(N)
+    start = 0
+    while start < limit and len(active) > 0:
+        size = min(chunk, limit - start)
+        x = _drawChunk(rng, randFunc, randFunc2, tau, len(active), start, size)
+        if compiled:
+            signal = np.full(len(active), -1)
+            _cusumKernel(x, pos, neg, kp, km, hp, hm, upper, lower, signal)
+        else:
+            signal = _cusumChunk(x, pos, neg, kp, km, hp, hm, upper, lower)
+        signalled = signal >= 0
+        rls[active[signalled]] = start + signal[signalled]
+        active = active[~signalled]
+        pos = pos[~signalled]
+        neg = neg[~signalled]
+        start += size
+    return rls
+
+
+def _drawChunk(rng, randFunc, randFunc2, tau, nActive, start, size):
+    if randFunc2 is None or tau is None or start + size <= tau:
+        return randFunc.rvs(size=(nActive, size), random_state=rng)
+    if start >= tau:
+        return randFunc2.rvs(size=(nActive, size), random_state=rng)
+    before = tau - start
+    return np.hstack([randFunc.rvs(size=(nActive, before), random_state=rng),
+                      randFunc2.rvs(size=(nActive, size - before), random_state=rng)])
+
+
+def _cusumChunk(x, pos, neg, kp, km, hp, hm, upper, lower):
+    """ Advance the CUSUM of all replications by a chunk of observations
+
+    Uses the closed form of the Lindley recursion S_t = max(0, S_(t-1) + z_t), i.e.
+    S_t = C_t - min(0, min_s<=t C_s) with C_t = S_0 + z_1 + ... + z_t. pos and neg are
+    updated in place; returns the index of the first signal in the chunk or -1.
+    """
+    signal = np.full(x.shape[0], -1)
+    if upper:
+        cumulative = pos[:, None] + np.cumsum(x - kp, axis=1)
+        cusum = cumulative - np.minimum(np.minimum.accumulate(cumulative, axis=1), 0)
+        signal = _firstSignal(cusum > hp, signal)
+        pos[:] = cusum[:, -1]
+    if lower:
+        cumulative = -neg[:, None] - np.cumsum(x - km, axis=1)
+        cusum = -(cumulative - np.minimum(np.minimum.accumulate(cumulative, axis=1), 0))
+        signal = _firstSignal(cusum < hm, signal)
+        neg[:] = cusum[:, -1]
+    return signal
+
+
+def _firstSignal(crossed, signal):
+    first = np.where(crossed.any(axis=1), crossed.argmax(axis=1), -1)
+    return np.where((signal < 0) | ((first >= 0) & (first < signal)), first, signal)
+
+
+def _cusumKernelPython(x, pos, neg, kp, km, hp, hm, upper, lower, signal):
+    for r in range(x.shape[0]):
+        p = pos[r]
+        q = neg[r]
+        for j in range(x.shape[1]):
+            if upper:
+                p = max(0.0, p + x[r, j] - kp)
+            if lower:
+                q = min(0.0, q + x[r, j] - km)
+            if (upper and p > hp) or (lower and q < hm):
+                signal[r] = j
+                break
+        pos[r] = p
+        neg[r] = q
+
+
+_cusumKernel = _cusumKernelPython if njit is None else njit(cache=False)(_cusumKernelPython)
+
+
+def _runLengthStatistic(rls, N):
+    """ ARL and its standard error ignoring replications without signal
+
+    The standard error is computed as sqrt((mean(rls^2) - mean(rls)) / N) for both
+    cusumArl and cusumArlBatch.
+    """
+    rls = np.ma.masked_invalid(rls)
+    return {
+        'ARL': np.mean(rls),
+        'Std. Error': np.sqrt((np.mean(rls ** 2) - np.mean(rls)) / N),
+    }
+
+
+def cusumArlBatch(*, randFunc=None, N=1000, limit=10_000, seed=None,
+                  kp=1, km=-1, hp=3, hm=-3, side='both', chunk=256, compiled=False, verbose=False):
+    """ Vectorized version of cusumArl
+
+    Replications are simulated in lock-step (see cusumRunLengths); the random
+    numbers therefore differ from cusumArl for the same seed.
+    """
+    rls = cusumRunLengths(randFunc=randFunc, N=N, limit=limit, seed=seed, kp=kp, km=km, hp=hp, hm=hm,
+                          side=side, chunk=chunk, compiled=compiled)
+    result = {'rls': rls, 'statistic': _runLengthStatistic(rls, N)}
+    if verbose:
+        statistic = result['statistic']
+        print(f"ARL {statistic['ARL']:.5g}  Std. Error {statistic['Std. Error']:.5g}")
+    return result
+
+
+def cusumPfaCedBatch(*, randFunc1=None, randFunc2=None,
+                     tau=10, N=100, limit=10_000, seed=None,
+                     kp=1, km=-1, hp=3, hm=-3, side='both', chunk=256, compiled=False, verbose=True):
+    """ Vectorized version of cusumPfaCed """
+    rls = cusumRunLengths(randFunc=randFunc1, randFunc2=randFunc2, tau=tau, N=N, limit=limit, seed=seed,
+                          kp=kp, km=km, hp=hp, hm=hm, side=side, chunk=chunk, compiled=compiled)
+    result = {'rls': rls}
+
+    rls = np.ma.masked_invalid(rls)
+    nFalseAlarm = np.sum(rls < tau)
+    ced = np.mean(rls[rls >= tau]) - tau
+    se = np.sqrt((np.sum(rls[rls >= tau] ** 2) / (N - nFalseAlarm) - ced ** 2) / (N - nFalseAlarm))
+    result['statistic'] = {
+        'PFA': nFalseAlarm / N,
+        'CED': ced,
+        'Std. Error': se
+    }
+    if verbose:
+        statistic = result['statistic']
+        print(f"PFA {statistic['PFA']:.5g}  CED {statistic['CED']:.5g}  Std. Error {statistic['Std. Error']:.5g}")
+    return result
+
+
+def cusumArlTable(kValues, hValues, *, randFunc=None, N=1000, limit=10_000, seed=None,
+                  side='upper', chunk=256, compiled=False):
+    """ ARL of one-sided (or symmetric two-sided) CUSUM schemes for a grid of k and h
+
+    For the lower side, km=-k and hm=-h are used. All grid points use the same
+    random numbers (common random numbers): every chunk of observations is drawn
+    once for all N replications, and replication i sees the same observations at
+    every grid point. This makes comparisons between grid points more precise.
+    Returns a DataFrame with the ARL indexed by h and k.
+    """
+    side = side.lower()
+    if side not in ("both", "upper", "lower"):
+        raise ValueError(f"side = '{side}' is not supported.")
+    if compiled and njit is None:
+        raise ImportError('compiled=True requires numba')
+    randFunc = randFunc or stats.norm()
+    rng = np.random.default_rng(seed)
+    upper = side in ('both', 'upper')
+    lower = side in ('both', 'lower')
+
+    grid = [{'k': k, 'h': h, 'rls': np.full(N, np.inf), 'active': np.arange(N),
+             'pos': np.zeros(N), 'neg': np.zeros(N)} for k in kValues for h in hValues]
+    start = 0
+    while start < limit and any(len(point['active']) > 0 for point in grid):
+        size = min(chunk, limit - start)
+        x = randFunc.rvs(size=(N, size), random_state=rng)
+        for point in grid:
+            active = point['active']
+            if len(active) == 0:
+                continue
+            k, h = point['k'], point['h']
+            pos, neg = point['pos'][active], point['neg'][active]
+            if compiled:
+                signal = np.full(len(active), -1)
+                _cusumKernel(x[active], pos, neg, k, -k, h, -h, upper, lower, signal)
+            else:
+                signal = _cusumChunk(x[active], pos, neg, k, -k, h, -h, upper, lower)
+            point['pos'][active] = pos
+            point['neg'][active] = neg
+            signalled = signal >= 0
+            point['rls'][active[signalled]] = start + signal[signalled]
+            point['active'] = active[~signalled]
+        start += size
+
+    arl = pd.DataFrame(index=pd.Index(hValues, name='h'), columns=pd.Index(kValues, name='k'), dtype=float)
+    for point in grid:
+        arl.loc[point['h'], point['k']] = _runLengthStatistic(point['rls'], N)['ARL']
+    return arl
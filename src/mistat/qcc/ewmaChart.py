@@ -8,7 +8,9 @@ Industrial Statistics: A Computer Based Approach with Python
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+from scipy import signal
 
+from mistat.qcc.arl import ewmaArlExact
 from mistat.qcc.statistics import Base_statistic, qccStatistics
 
 
@@ -31,28 +33,53 @@ def ewmaSmooth(y, x=None, smooth=0.20, start=None):
     """
     if not 0 <= abs(smooth) <= 1:
         raise ValueError('smooth parameter must be between 0 and 1')
+    y = np.asarray(y, dtype=float)
     if x is None:
-        x = list(range(len(y)))
+        x = np.arange(len(y))
     else:
         if len(x) != len(y):
             raise ValueError('x and y must have the same length')
-        x, y = zip(*sorted(zip(x, y)))
+        x = np.asarray(x)
+        order = np.lexsort((y, x))
+        x, y = x[order], y[order]
 
-    last = start if start is not None else y[0]
-    z = []
-    for yi in y:
-        last = smooth * yi + (1 - smooth) * last
-        z.append(last)
     return {
-        'x': np.array(x),
-        'y': np.array(z),
+        'x': x,
+        'y': EWMAState(smooth=smooth, start=start).update(y),
         'smooth': smooth,
         'start': start,
     }
 
 
+class EWMAState:
+    """ Resumable state of an exponentially weighted moving average
+
+    update() smoothes a block of observations with a linear filter that starts from
+    the last smoothed value, so a series can be extended without recomputing its
+    history. If start is None, the first observation is used as starting value.
+    """
+
+    def __init__(self, smooth=0.20, start=None):
+        self.smooth = smooth
+        self.last = start
+        self.count = 0
+
+    def update(self, y):
+        """ Return the smoothed values of the observations y and advance the state """
+        y = np.asarray(y, dtype=float).reshape(-1)
+        if len(y) == 0:
+            return y
+        if self.last is None:
+            self.last = y[0]
+        z, _ = signal.lfilter([self.smooth], [1, self.smooth - 1], y, zi=[(1 - self.smooth) * self.last])
+        self.last = z[-1]
+        self.count += len(y)
+        return z
+
+
 class EWMA:
-    def __init__(self, data, sizes=None, center=None, std_dev=None, smooth=0.2, nsigmas=3, newdata=None):
+    def __init__(self, data, sizes=None, center=None, std_dev=None, smooth=0.2, nsigmas=3, newdata=None,
+                 newsizes=None):
         if sizes is None:
             sizes = Base_statistic.getSizes(data)
         elif isinstance(sizes, int):
@@ -62,45 +89,110 @@ class EWMA:
                 raise ValueError('sizes and data must have the same length')
         qcc_type = 'xbarone' if set(sizes) == {1} else 'xbar'
 
-        qccStatistic = qccStatistics.get(qcc_type)
-        statistics = qccStatistic.stats(data, sizes)
+        self.qccStatistic = qccStatistics.get(qcc_type)
+        statistics = self.qccStatistic.stats(data, sizes)
 
         if center is None:
             center = statistics.center
-        std_dev = qccStatistic.sd(data, std_dev=std_dev, sizes=sizes)
+        std_dev = self.qccStatistic.sd(data, std_dev=std_dev, sizes=sizes)
 
         self.data = data
         self.statistics = statistics.statistics
         self.sizes = np.array(sizes)
         self.center = center
         self.std_dev = std_dev
-
-        if newdata is not None:
-            raise NotImplementedError('requires implementation')
-
-        self.ewma = ewmaSmooth(self.statistics, smooth=smooth, start=center)
-        self.x = self.ewma['x']
-        self.y = self.ewma['y']
         self.smooth = smooth
-
-        L1 = smooth / (2 - smooth)
-        f = 2 * np.arange(1, len(self.statistics) + 1)
-        L2 = 1 - (1 - smooth) ** f
-
-        sigma2 = std_dev ** 2 / self.sizes * L1 * L2
-        self.sigma = np.sqrt(sigma2)
         self.nsigmas = nsigmas
-        self.ucl = center + nsigmas * np.sqrt(sigma2)
-        self.lcl = center - nsigmas * np.sqrt(sigma2)
-        self.violations = list(np.where(self.y < self.lcl)[0])
-        self.violations.extend(np.where(self.y > self.ucl)[0])
-        self.violations = np.array(sorted(self.violations))
+
+        self.state = EWMAState(smooth=smooth, start=center)
+        self.x = np.array([], dtype=int)
+        self.y = np.array([])
+        self.sigma = np.array([])
+        self.ucl = np.array([])
+        self.lcl = np.array([])
+        self.violations = np.array([], dtype=int)
+        self._extend(self.statistics, self.sizes)
+
+        # phase II data are collected in blocks and consolidated on the first read
+        self._blocks = {'newdata': [], 'newstats': [], 'newsizes': []}
+        if newdata is not None:
+            self.update(newdata, newsizes)
+
+    newdata = property(lambda self: self._concatenate('newdata'))
+    newstats = property(lambda self: self._concatenate('newstats'))
+    newsizes = property(lambda self: self._concatenate('newsizes'))
+
+    @property
+    def ewma(self):
+        return {'x': self.x, 'y': self.y, 'smooth': self.smooth, 'start': self.center}
+
+    def update(self, newdata, newsizes=None):
+        """ Extend the chart with new groups using the center and std_dev of the chart
+
+        The EWMA continues from the stored state, so the history is not recomputed.
+        Returns the EWMA values of the new groups.
+        """
+        newdata = np.asarray(newdata, dtype=float)
+        if newdata.ndim == 1:
+            newdata = newdata.reshape(-1, 1)
+        if newsizes is None:
+            newsizes = self.qccStatistic.getSizes(newdata)
+        elif isinstance(newsizes, int):
+            newsizes = [newsizes] * len(newdata)
+        elif len(newsizes) != len(newdata):
+            raise ValueError('newsizes and newdata must have the same length')
+        newstats = np.asarray(self.qccStatistic.stats(newdata, newsizes).statistics, dtype=float)
+        newsizes = np.array(newsizes)
+
+        self._blocks['newdata'].append(newdata)
+        self._blocks['newstats'].append(newstats)
+        self._blocks['newsizes'].append(newsizes)
+        return self._extend(newstats, newsizes)
+
+    def _concatenate(self, name):
+        blocks = self._blocks[name]
+        if not blocks:
+            return None
+        if len(blocks) > 1:
+            blocks[:] = [np.concatenate(blocks)]
+        return blocks[0]
+
+    def _extend(self, statistics, sizes):
+        n = self.state.count
+        y = self.state.update(statistics)
+        t = np.arange(n + 1, n + len(y) + 1)
+
+        L1 = self.smooth / (2 - self.smooth)
+        L2 = 1 - (1 - self.smooth) ** (2 * t)
+        sigma = np.sqrt(self.std_dev ** 2 / np.asarray(sizes) * L1 * L2)
+        ucl = self.center + self.nsigmas * sigma
+        lcl = self.center - self.nsigmas * sigma
+
+        self.x = np.concatenate([self.x, t - 1])
+        self.y = np.concatenate([self.y, y])
+        self.sigma = np.concatenate([self.sigma, sigma])
+        self.ucl = np.concatenate([self.ucl, ucl])
+        self.lcl = np.concatenate([self.lcl, lcl])
+        self.violations = np.concatenate([self.violations, n + np.nonzero((y < lcl) | (y > ucl))[0]])
+        return y
+
+    def arl(self, shift=0, method='integral', m=None, distribution=False):
+        """ Run length properties of the chart for a shift in units of the standard error
+
+        See ewmaArlExact for details; the calculation uses the asymptotic control limits.
+        """
+        return ewmaArlExact(smooth=self.smooth, nsigmas=self.nsigmas, shift=shift, method=method, m=m,
+                            distribution=distribution)
 
     def plot(self, ax=None):
         if ax is None:
             _, ax = plt.subplots(figsize=(7, 6))
 
-        pd.Series(self.statistics).plot(marker='+', linestyle='None', color='grey', ax=ax)
+        statistics = np.asarray(self.statistics, dtype=float).reshape(-1)
+        if self.newstats is not None:
+            statistics = np.concatenate([statistics, self.newstats])
+            ax.axvline(len(self.statistics) - 0.5, color='grey', linestyle=':')
+        pd.Series(statistics).plot(marker='+', linestyle='None', color='grey', ax=ax)
         v = np.array(self.violations)
         ax.plot(self.x, self.y, color='black')
         if v.size > 0:
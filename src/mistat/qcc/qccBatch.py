@@ -0,0 +1,318 @@
+# pylint: disable=too-many-arguments,too-many-locals,too-many-instance-attributes
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Shewhart control charts for many characteristics in one call
+'''
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from mistat.qcc import constants
+from mistat.qcc.rules import RUN_LENGTH
+from mistat.qcc.statistics import SD_estimator, qccStatistics
+
+
+@dataclass
+class QCCBatchResult:
+    """ Control charts of many characteristics as stacked arrays
+
+    Arrays of shape (characteristics, groups) are statistics, sizes, LCL, UCL,
+    beyondUCL, beyondLCL, and violatingRuns; center and std_dev have one value per
+    characteristic.
+    """
+    qcc_type: str
+    characteristics: Any
+    statistics: np.ndarray
+    sizes: np.ndarray
+    center: np.ndarray
+    std_dev: np.ndarray
+    LCL: np.ndarray
+    UCL: np.ndarray
+    beyondUCL: np.ndarray
+    beyondLCL: np.ndarray
+    violatingRuns: np.ndarray
+
+    def summary(self):
+        """ Return a DataFrame with one row per characteristic """
+        constant = np.all(self.UCL == self.UCL[:, :1], axis=1) & np.all(self.LCL == self.LCL[:, :1], axis=1)
+        return pd.DataFrame({
+            'center': self.center,
+            'std_dev': self.std_dev,
+            'LCL': np.where(constant, self.LCL[:, 0], np.nan),
+            'UCL': np.where(constant, self.UCL[:, 0], np.nan),
+            'beyondLimits': self.beyondUCL.sum(axis=1) + self.beyondLCL.sum(axis=1),
+            'violatingRuns': self.violatingRuns.sum(axis=1),
+        }, index=pd.Index(self.characteristics, name='characteristic'))
+
+    def violations(self, characteristic):
+        """ Return the violations of a characteristic in the format of QualityControlChart """
+        idx = list(self.characteristics).index(characteristic)
+        above = self.statistics[idx] > self.center[idx]
+        runs = self.violatingRuns[idx]
+        return {
+            'beyondLimits': {'UCL': np.nonzero(self.beyondUCL[idx])[0], 'LCL': np.nonzero(self.beyondLCL[idx])[0]},
+            'violatingRuns': np.concatenate([np.nonzero(runs & above)[0], np.nonzero(runs & ~above)[0]]).tolist(),
+        }
+
+
+def qcc_batch(data, qcc_type=qccStatistics.default, sizes=None, center=None, std_dev=None,
+              nsigmas=3, confidence_level=None, run_length=RUN_LENGTH,
+              characteristic='characteristic', group='group', value='value'):
+    """ Calculate Shewhart control charts for many characteristics at once
+
+    data is either an array of shape (characteristics, groups, subgroup size) for
+    xbar, R, and S charts, an array of shape (characteristics, groups) for xbarone, p,
+    and np charts, or a long-format DataFrame with the columns given by characteristic,
+    group, and value. Missing values (NaN) are allowed for unequal subgroup sizes. For
+    p and np charts, sizes is a number, an array that broadcasts to (characteristics,
+    groups), or the name of a column of the long-format DataFrame.
+
+    center and std_dev can be numbers or arrays with one value per characteristic;
+    std_dev can also be an SD_estimator. Returns a QCCBatchResult.
+    """
+    qcc_type = qccStatistics.get(qcc_type).qcc_type
+    conf = nsigmas if confidence_level is None else confidence_level
+    if conf < 0:
+        raise ValueError(f'invalid conf argument {conf}')
+
+    characteristics = None
+    if isinstance(data, pd.DataFrame):
+        characteristics, data, sizes = _fromLongFormat(data, qcc_type, sizes, characteristic, group, value)
+    data = np.asarray(data, dtype=float)
+    if qcc_type in ('xbar', 'R', 'S'):
+        if data.ndim != 3:
+            raise ValueError(f'{qcc_type}-charts require data of shape (characteristics, groups, subgroup size)')
+    elif data.ndim == 3 and data.shape[2] == 1:
+        data = data[:, :, 0]
+    elif data.ndim != 2:
+        raise ValueError(f'{qcc_type}-charts require data of shape (characteristics, groups)')
+    if characteristics is None:
+        characteristics = np.arange(data.shape[0])
+
+    calculate = {
+        'xbar': _xbarCharts, 'R': _rangeCharts, 'S': _sdCharts,
+        'xbarone': _xbaroneCharts, 'p': _pCharts, 'np': _npCharts,
+    }[qcc_type]
+    statistics, sizes, groupCenter, stdDev, lcl, ucl = calculate(data, sizes, center, std_dev, conf)
+
+    with np.errstate(invalid='ignore'):
+        beyondUCL = statistics > ucl
+        beyondLCL = statistics < lcl
+        violatingRuns = _violatingRuns(statistics - groupCenter, run_length)
+    return QCCBatchResult(
+        qcc_type=qcc_type, characteristics=characteristics, statistics=statistics, sizes=sizes,
+        center=groupCenter[:, 0], std_dev=stdDev, LCL=lcl, UCL=ucl,
+        beyondUCL=beyondUCL, beyondLCL=beyondLCL, violatingRuns=violatingRuns)
+
+
+def _fromLongFormat(df, qcc_type, sizes, characteristic, group, value):
+    characteristics, charIdx = np.unique(df[characteristic].values, return_inverse=True)
+    _, groupIdx = np.unique(df[group].values, return_inverse=True)
+    if qcc_type in ('xbar', 'R', 'S'):
+        position = df.groupby([characteristic, group], sort=False).cumcount().values
+    else:
+        position = np.zeros(len(df), dtype=int)
+    data = np.full((len(characteristics), groupIdx.max() + 1, position.max() + 1), np.nan)
+    data[charIdx, groupIdx, position] = df[value].values
+    if isinstance(sizes, str):
+        column = sizes
+        sizes = np.full(data.shape[:2], np.nan)
+        sizes[charIdx, groupIdx] = df[column].values
+    return characteristics, data, sizes
+
+
+def _perCharacteristic(value, nChar):
+    return np.broadcast_to(np.asarray(value, dtype=float), (nChar,)).astype(float)
+
+
+def _estimateSigma(data, sizes, estimator):
+    """ Estimate sigma for each characteristic from subgroups of continuous data """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if estimator in (SD_estimator.uwave_r, SD_estimator.mvlue_r):
+            r = np.nanmax(data, axis=2) - np.nanmin(data, axis=2)
+            d2 = constants.d2(sizes)
+            if estimator == SD_estimator.uwave_r:
+                return np.mean(r / d2, axis=1)
+            w = (d2 / constants.d3(sizes)) ** 2
+            return np.sum(w * r / d2, axis=1) / np.sum(w, axis=1)
+        s = np.nanstd(data, axis=2, ddof=1)
+        if estimator == SD_estimator.rmsdf:
+            w = sizes - 1
+            return np.sqrt(np.sum(w * s**2, axis=1) / np.sum(w, axis=1)) / constants.c4(np.sum(w, axis=1) + 1)
+        c4 = constants.c4(sizes)
+        if estimator == SD_estimator.uwave_sd:
+            return np.mean(s / c4, axis=1)
+        if estimator == SD_estimator.mvlue_sd:
+            w = c4 ** 2 / (1 - c4**2)
+            return np.sum(w * s / c4, axis=1) / np.sum(w, axis=1)
+    raise NotImplementedError(f'estimator {estimator}')
+
+
+def _continuousStdDev(data, sizes, std_dev, default, allowed):
+    if std_dev is not None and not isinstance(std_dev, (str, SD_estimator)):
+        return _perCharacteristic(std_dev, data.shape[0])
+    if std_dev is None and default is None:
+        # same default as Xbar_statistic: UWAVE-R unless a subgroup is larger than 25
+        large = np.max(sizes, axis=1) > 25
+        result = _estimateSigma(data, sizes, SD_estimator.uwave_r)
+        if np.any(large):
+            result[large] = _estimateSigma(data[large], sizes[large], SD_estimator.rmsdf)
+        return result
+    estimator = SD_estimator.get(std_dev, default)
+    if allowed is not None and estimator not in allowed:
+        raise ValueError(f'invalid std_dev method {estimator}')
+    return _estimateSigma(data, sizes, estimator)
+
+
+def _groupSizes(data):
+    sizes = np.sum(~np.isnan(data), axis=2)
+    if np.any(sizes == 0):
+        raise ValueError('all groups require at least one value')
+    return sizes
+
+
+def _symmetricLimits(center, se, conf):
+    sigmas = conf if conf >= 1 else stats.norm.ppf(1 - (1 - conf) / 2)
+    return center - sigmas * se, center + sigmas * se
+
+
+def _xbarCharts(data, sizes, center, std_dev, conf):
+    sizes = _groupSizes(data)
+    statistics = np.nanmean(data, axis=2)
+    if center is None:
+        center = np.nansum(data, axis=(1, 2)) / np.sum(sizes, axis=1)
+    center = _perCharacteristic(center, data.shape[0])
+    stdDev = _continuousStdDev(data, sizes, std_dev, None, None)
+    groupCenter = np.broadcast_to(center[:, None], statistics.shape)
+    lcl, ucl = _symmetricLimits(groupCenter, stdDev[:, None] / np.sqrt(sizes), conf)
+    return statistics, sizes, groupCenter, stdDev, lcl, ucl
+
+
+def _rangeCharts(data, sizes, center, std_dev, conf):
+    sizes = _groupSizes(data)
+    statistics = np.nanmax(data, axis=2) - np.nanmin(data, axis=2)
+    if center is None:
+        center = np.sum(sizes * statistics, axis=1) / np.sum(sizes, axis=1)
+    center = _perCharacteristic(center, data.shape[0])
+    stdDev = _continuousStdDev(data, sizes, std_dev, SD_estimator.uwave_r,
+                               (SD_estimator.uwave_r, SD_estimator.mvlue_r))
+    if conf < 1:
+        raise NotImplementedError(
+            'Tukey studentized range distribution not available from scipy. Use nsigmas instead')
+    groupCenter = np.broadcast_to(center[:, None], statistics.shape)
+    lcl, ucl = _symmetricLimits(groupCenter, stdDev[:, None] * constants.d3(sizes), conf)
+    return statistics, sizes, groupCenter, stdDev, np.maximum(lcl, 0), ucl
+
+
+def _sdCharts(data, sizes, center, std_dev, conf):
+    sizes = _groupSizes(data)
+    statistics = np.nanstd(data, axis=2, ddof=1)
+    if center is None:
+        center = np.sum(sizes * statistics, axis=1) / np.sum(sizes, axis=1)
+    center = _perCharacteristic(center, data.shape[0])
+    stdDev = _continuousStdDev(data, sizes, std_dev, SD_estimator.uwave_sd,
+                               (SD_estimator.uwave_sd, SD_estimator.mvlue_sd, SD_estimator.rmsdf))
+    groupCenter = np.broadcast_to(center[:, None], statistics.shape)
+    if conf >= 1:
+        c4 = constants.c4(sizes)
+        lcl, ucl = _symmetricLimits(groupCenter, stdDev[:, None] * np.sqrt(1 - c4**2), conf)
+    else:
+        p = (1 - conf) / 2
+        lcl = stdDev[:, None] * np.sqrt(stats.chi2.ppf(p, sizes - 1) / (sizes - 1))
+        ucl = stdDev[:, None] * np.sqrt(stats.chi2.ppf(1 - p, sizes - 1) / (sizes - 1))
+    return statistics, sizes, groupCenter, stdDev, np.maximum(lcl, 0), ucl
+
+
+def _xbaroneCharts(data, sizes, center, std_dev, conf):
+    statistics = data
+    sizes = np.ones(data.shape, dtype=int)
+    if center is None:
+        center = np.nanmean(data, axis=1)
+    center = _perCharacteristic(center, data.shape[0])
+    if std_dev is not None and not isinstance(std_dev, (str, SD_estimator)):
+        stdDev = _perCharacteristic(std_dev, data.shape[0])
+    else:
+        estimator = SD_estimator.get(std_dev, SD_estimator.mr)
+        if estimator == SD_estimator.mr:
+            stdDev = np.nanmean(np.abs(np.diff(data, axis=1)), axis=1) / constants.d2(2)
+        elif estimator == SD_estimator.sd:
+            stdDev = np.nanstd(data, axis=1, ddof=1) / constants.c4(np.sum(~np.isnan(data), axis=1))
+        else:
+            raise NotImplementedError(f'estimator {estimator}')
+    groupCenter = np.broadcast_to(center[:, None], statistics.shape)
+    lcl, ucl = _symmetricLimits(groupCenter, np.broadcast_to(stdDev[:, None], statistics.shape), conf)
+    return statistics, sizes, groupCenter, stdDev, lcl, ucl
+
+
+def _countLimits(groupCenter, pbar, sizes, conf):
+    """ Vectorized version of NP_statistic.limits """
+    if conf >= 1:
+        tol = conf * np.sqrt(pbar * (1 - pbar) * sizes)
+        lcl = groupCenter - tol
+        ucl = groupCenter + tol
+    else:
+        # probability limits of the binomial distribution
+        alpha = (1 - conf) / 2
+        lcl = stats.binom(sizes, pbar).ppf(alpha)
+        ucl = stats.binom(sizes, pbar).ppf(1 - alpha)
+    return np.maximum(lcl, 0), np.minimum(ucl, sizes)
+
+
+def _countSizes(data, sizes, qcc_type):
+    if sizes is None:
+        raise ValueError(f'{qcc_type}-charts require argument sizes to be provided')
+    return np.broadcast_to(np.asarray(sizes, dtype=float), data.shape)
+
+
+def _pCharts(data, sizes, center, std_dev, conf):
+    sizes = _countSizes(data, sizes, 'p')
+    statistics = data / sizes
+    pbarData = np.sum(data, axis=1) / np.sum(sizes, axis=1)
+    pbar = pbarData if center is None else _perCharacteristic(center, data.shape[0])
+    if std_dev is None:
+        stdDev = np.sqrt(pbarData * (1 - pbarData))
+    else:
+        stdDev = _perCharacteristic(std_dev, data.shape[0])
+    groupCenter = np.broadcast_to(pbar[:, None], statistics.shape)
+    lcl, ucl = _countLimits(groupCenter * sizes, pbar[:, None], sizes, conf)
+    return statistics, sizes, groupCenter, stdDev, lcl / sizes, ucl / sizes
+
+
+def _npCharts(data, sizes, center, std_dev, conf):
+    sizes = _countSizes(data, sizes, 'np')
+    if np.any(sizes != sizes[:, :1]):
+        raise ValueError('np-charts with varying sizes are not supported; use a p-chart')
+    pbarData = np.sum(data, axis=1) / np.sum(sizes, axis=1)
+    if center is None:
+        pbar = pbarData
+    else:
+        pbar = _perCharacteristic(center, data.shape[0]) / sizes[:, 0]
+    if std_dev is None:
+        stdDev = np.sqrt(sizes[:, 0] * pbarData * (1 - pbarData))
+    else:
+        stdDev = _perCharacteristic(std_dev, data.shape[0])
+    groupCenter = pbar[:, None] * sizes
+    lcl, ucl = _countLimits(groupCenter, pbar[:, None], sizes, conf)
+    return data, sizes, groupCenter, stdDev, lcl, ucl
+
+
+def _violatingRuns(diffs, run_length):
+    """ Runs of run_length or more points on the same side of the center line
+
+    Vectorized over characteristics (rows); equivalent to rules.violatingRuns
+    """
+    signs = np.sign(diffs)
+    if run_length == 0 or signs.shape[1] == 0:
+        return np.zeros(signs.shape, dtype=bool)
+    positions = np.broadcast_to(np.arange(signs.shape[1]), signs.shape)
+    change = np.ones(signs.shape, dtype=bool)
+    change[:, 1:] = signs[:, 1:] != signs[:, :-1]
+    runStart = np.maximum.accumulate(np.where(change, positions, 0), axis=1)
+    return (positions - runStart >= run_length - 1) & (signs != 0) & ~np.isnan(signs)
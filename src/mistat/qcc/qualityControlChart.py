@@ -14,6 +14,7 @@ from scipy import stats
 
 from mistat.qcc.rules import shewhartRules
 from mistat.qcc.statistics import GroupMeans, qccStatistics
+from mistat.qcc.streamingQCC import StreamingQCC
 
 
 # qcc <- function(data, type = c("xbar", "R", "S", "xbar.one", "p", "np", "c", "u", "g"), sizes,
@@ -23,7 +24,7 @@ class QualityControlChart:
     def __init__(self, data, qcc_type=qccStatistics.default, labels=None,
                  center=None, std_dev=None, limits=None, sizes=None,
                  nsigmas=3, confidence_level=None,
-                 newdata=None):
+                 newdata=None, newsizes=None):
         self.statistic = qccStatistics.get(qcc_type)
         self.qcc_type = self.statistic.qcc_type
 
@@ -53,29 +54,67 @@ class QualityControlChart:
         else:
             self.confidence_level = confidence_level
             conf = confidence_level
+        self.conf = conf
         if limits is None:
             self.limits = self.statistic.limits(self.center, self.std_dev, self.sizes, conf)
         else:
             self.limits = limits
 
-        if newdata is not None:
-            pass
-#             raise NotImplementedError()
-            # gives self.newdata, self.newstats, self.newsizes
-        else:
-            self.newdata = None
-            self.newstats = None
-            self.newsizes = None
-
         # TODO violations
+        self.stream = None
         self.violations = shewhartRules(self)
 
+        self.newdata = newdata
+        if newdata is not None:
+            newdata = np.array(newdata)
+            if len(newdata.shape) == 1:
+                newdata = newdata.reshape(-1, 1)
+            if newsizes is None or isinstance(newsizes, Number):
+                newsizes = [newsizes] * len(newdata)
+            for subgroup, size in zip(newdata, newsizes):
+                self.update(subgroup, size=size)
+
+    @property
+    def newstats(self):
+        if self.stream is None or not self.stream.statistics:
+            return None
+        return GroupMeans(np.array(self.stream.statistics), self.center)
+
+    @property
+    def newsizes(self):
+        if self.stream is None or not self.stream.sizes:
+            return None
+        return self.stream.sizes
+
+    def update(self, subgroup, size=None):
+        """ Evaluate a new (phase II) subgroup against the limits of the chart
+
+        The beyond limits and run rules are advanced incrementally from the previous
+        state, so each update takes constant time. Violations are added to the
+        violations of the chart using consecutive indices.
+        """
+        if self.stream is None:
+            self.stream = StreamingQCC.fromChart(self)
+        point = self.stream.update(subgroup, size=size)
+        if point.beyondLimits is not None:
+            beyondLimits = self.violations['beyondLimits']
+            beyondLimits[point.beyondLimits] = np.append(beyondLimits[point.beyondLimits], point.index)
+        if point.violatingRun:
+            self.violations['violatingRuns'].append(point.index)
+        return point
+
     def plot(self, title=None, ax=None):
         if ax is None:
             _, ax = plt.subplots(figsize=(8, 6))
         beyondLimits = [*self.violations['beyondLimits']['LCL'], *self.violations['beyondLimits']['UCL']]
         violatingRuns = self.violations['violatingRuns']
         df = pd.DataFrame({'x': self.labels, 'y': self.stats.statistics})
+        if self.newstats is not None:
+            nCalibration = len(df)
+            newLabels = range(nCalibration, nCalibration + len(self.newstats.statistics))
+            df = pd.concat([df, pd.DataFrame({'x': newLabels, 'y': self.newstats.statistics})],
+                           ignore_index=True)
+            ax.axvline(nCalibration - 0.5, color='grey', linestyle=':')
         ax = df.plot.line(x='x', y='y', style='-', color='lightgrey',
                           marker='o', markerfacecolor='black', ax=ax)
         ax.plot(df.iloc[beyondLimits]['x'], df.iloc[beyondLimits]['y'], linestyle='None',
@@ -4,12 +4,11 @@ Industrial Statistics: A Computer Based Approach with Python
 
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
-import itertools
-from itertools import groupby
 from numbers import Number
 
 import numpy as np
 import pandas as pd
+from scipy import stats
 
 RUN_LENGTH = 7
 
@@ -55,27 +54,128 @@ def violatingRuns(qcc, run_length=7, **kwargs):
         diffs = statistics - center[0]
     else:
         raise NotImplementedError()
-    diffs[diffs > 0] = 1
-    diffs[diffs < 0] = -1
-    runs = run_length_encoding(diffs, as_list=True)
-    violating = runs >= run_length
-    violating_above = violating & (diffs > 0)
-    violating_below = violating & (diffs < 0)
-
-    violators = []
-    for violating in (violating_above, violating_below):
-        current = 0
-        for length, violates in run_length_encoding(violating):
-            if violates:
-                violators.extend(range(current + run_length - 1, current + length))
-            current += length
-    return {'violatingRuns': violators}
+    diffs = np.sign(diffs)
+
+    # position of each point within its run of identical signs
+    starts = _runStarts(diffs)
+    position = np.arange(len(diffs)) - np.repeat(starts, np.diff(np.append(starts, len(diffs))))
+    violating = position >= run_length - 1
+    violators = [np.nonzero(violating & (diffs > 0))[0], np.nonzero(violating & (diffs < 0))[0]]
+    return {'violatingRuns': np.concatenate(violators).tolist()}
 
 
 def run_length_encoding(sequence, as_list=False):
-    rle = [(len(list(g)), k) for k, g in groupby(sequence)]
+    values = np.array(list(sequence)) if isinstance(sequence, str) else np.asarray(sequence)
+    if len(values) == 0:
+        return np.array([]) if as_list else []
+    starts = _runStarts(values)
+    lengths = np.diff(np.append(starts, len(values)))
     if as_list:
-        def flatten(x):
-            return itertools.chain(*x)
-        rle = np.array(list(flatten([count] * count for count, _ in rle)))
-    return rle
+        return np.repeat(lengths, lengths)
+    return list(zip(lengths.tolist(), values[starts].tolist()))
+
+
+def _runStarts(values):
+    """ Return the indices at which a new run of identical values starts """
+    if len(values) == 0:
+        return np.array([], dtype=int)
+    return np.flatnonzero(np.concatenate([[True], values[1:] != values[:-1]]))
+
+
+NELSON_RULES = {
+    1: 'One point beyond 3 sigma',
+    2: 'Nine (run_length) points in a row on the same side of the center line',
+    3: 'Six points in a row steadily increasing or decreasing',
+    4: 'Fourteen points in a row alternating up and down',
+    5: 'Two out of three points beyond 2 sigma on the same side',
+    6: 'Four out of five points beyond 1 sigma on the same side',
+    7: 'Fifteen points in a row within 1 sigma',
+    8: 'Eight points in a row beyond 1 sigma with points on both sides',
+}
+
+
+def nelsonRules(qcc, rules=None, run_length=9, **kwargs):
+    """ Points violating the Nelson rules
+
+    The statistics of the chart are standardized using the distance between center
+    line and upper control limit. Returns the indices of the points that complete
+    a violating pattern for each of the requested rules (default: all eight).
+    """
+    return {'nelsonRules': evaluateNelsonRules(standardizedStatistics(qcc), rules=rules, run_length=run_length)}
+
+
+def westernElectricRules(qcc, **kwargs):
+    """ Points violating the four Western Electric zone rules
+
+    1: one point beyond 3 sigma, 2: two out of three beyond 2 sigma, 3: four out of five
+    beyond 1 sigma, 4: eight points in a row on the same side of the center line
+    """
+    nelson = evaluateNelsonRules(standardizedStatistics(qcc), rules=(1, 5, 6, 2), run_length=8)
+    return {'westernElectricRules': {1: nelson[1], 2: nelson[5], 3: nelson[6], 4: nelson[2]}}
+
+
+def standardizedStatistics(qcc):
+    """ Return the chart statistics in units of the standard error of the statistic """
+    statistics = np.array(qcc.stats.statistics, dtype=float).flatten()
+    if len(qcc.limits) == 1:
+        ucl = np.full(len(statistics), float(qcc.limits['UCL'].iloc[0]))
+    else:
+        ucl = np.asarray(qcc.limits['UCL'], dtype=float)
+    center = np.broadcast_to(np.asarray(qcc.center, dtype=float).flatten(), statistics.shape)
+    if qcc.newstats:
+        newstats = np.array(qcc.newstats.statistics, dtype=float).flatten()
+        statistics = np.concatenate([statistics, newstats])
+        ucl = np.concatenate([ucl, [qcc.stream.limitsFor(size)[1] for size in qcc.newsizes]])
+        center = np.concatenate([center, [qcc.stream.centerFor(size) for size in qcc.newsizes]])
+    sigmas = qcc.conf if qcc.conf >= 1 else stats.norm.ppf(1 - (1 - qcc.conf) / 2)
+    return (statistics - center) / ((ucl - center) / sigmas)
+
+
+def evaluateNelsonRules(z, rules=None, run_length=9):
+    """ Evaluate the Nelson rules for standardized statistics z
+
+    All zone and pattern indicators are stacked into one matrix and their cumulative
+    sums are calculated in one pass. The number of flagged points in any trailing
+    window is then the difference of two cumulative sums.
+    """
+    rules = sorted(NELSON_RULES) if rules is None else rules
+    z = np.asarray(z, dtype=float)
+    n = len(z)
+    d = np.sign(np.diff(z, prepend=np.nan))
+    alternating = np.zeros(n, dtype=bool)
+    alternating[2:] = d[2:] * d[1:-1] < 0
+    flags = np.array([
+        z > 2, z < -2, z > 1, z < -1, z > 0, z < 0,
+        np.abs(z) < 1, np.abs(z) > 1, d > 0, d < 0, alternating,
+    ])
+    cumulative = np.zeros((flags.shape[0], n + 1), dtype=int)
+    np.cumsum(flags, axis=1, out=cumulative[:, 1:])
+
+    def windowCounts(row, window):
+        counts = np.zeros(n, dtype=int)
+        if window <= n:
+            counts[window - 1:] = cumulative[row, window:] - cumulative[row, :n - window + 1]
+        return counts
+
+    violations = {}
+    for rule in rules:
+        if rule == 1:
+            violating = np.abs(z) > 3
+        elif rule == 2:
+            violating = (windowCounts(4, run_length) == run_length) | (windowCounts(5, run_length) == run_length)
+        elif rule == 3:
+            violating = (windowCounts(8, 5) == 5) | (windowCounts(9, 5) == 5)
+        elif rule == 4:
+            violating = windowCounts(10, 12) == 12
+        elif rule == 5:
+            violating = (flags[0] & (windowCounts(0, 3) >= 2)) | (flags[1] & (windowCounts(1, 3) >= 2))
+        elif rule == 6:
+            violating = (flags[2] & (windowCounts(2, 5) >= 4)) | (flags[3] & (windowCounts(3, 5) >= 4))
+        elif rule == 7:
+            violating = windowCounts(6, 15) == 15
+        elif rule == 8:
+            violating = (windowCounts(7, 8) == 8) & (windowCounts(2, 8) > 0) & (windowCounts(3, 8) > 0)
+        else:
+            raise ValueError(f'unknown Nelson rule {rule}')
+        violations[rule] = np.nonzero(violating)[0]
+    return violations
@@ -6,11 +6,17 @@ Industrial Statistics: A Computer Based Approach with Python
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 
 ARL, PFA and CED of Shiryayev-Roberts procedure
+
+The Shiryayev-Roberts statistic W_m = sum_k prod_{t=k}^m Lambda_t is updated with
+the recursion W_m = (1 + W_{m-1}) Lambda_m, which makes a run O(m) instead of O(m^2).
 '''
 import numpy as np
 import pandas as pd
 from scipy import stats
 
+# number of replications that are simulated together
+REPLICATION_BLOCK = 256
+
 
 def shroArlPfaCedNorm(mean0=0, mean1=None, sd=1, n=10, delta=1, tau=None,
                       N=100, limit=10000, seed=None, w=19, verbose=True):
@@ -24,75 +30,41 @@ def shroArlPfaCedNorm(mean0=0, mean1=None, sd=1, n=10, delta=1, tau=None,
     randFunc0 = stats.norm(loc=mean0, scale=sd / np.sqrt(n))
     randFunc1 = stats.norm(loc=mean1, scale=sd / np.sqrt(n))
 
-    rls = []
-    for _ in range(N):
-        if tau is None:
-            x = randFunc0.rvs(limit)
-        else:
-            x = np.concatenate([randFunc0.rvs(tau), randFunc1.rvs(limit - tau)])
-        rls.append(runLengthShroNorm(x, mean0, sd, n, delta, w)['rl'])
-    result = {'rls': rls}
+    e1 = n * delta / sd ** 2
+    e2 = e1 * delta / 2
 
-    rls = np.ma.masked_invalid(rls)
-    result['statistic'] = {
-        'ARL': np.mean(rls),
-        'Std. Error': np.sqrt((np.mean(rls ** 2) - np.mean(rls) ** 2) / N),
-    }
-    if tau is not None:
-        pfa = np.mean(rls < tau)
-        ced = np.mean(rls[rls >= tau]) - tau
-        se = np.sqrt(
-            (np.sum(rls[rls >= tau] ** 2) / (N - np.sum(rls < tau)) - ced ** 2)
-            /
-            (N - np.sum(rls < tau)))
-        result['statistic']['PFA'] = pfa
-        result['statistic']['CED'] = ced
-        result['statistic']['CED-Std. Error'] = se
+    def logLikelihoodRatios(size):
+        x = _sampleReplications(randFunc0, randFunc1, size, limit, tau)
+        return (x - mean0) * e1 - e2
+    rls = _shroRunLengths(logLikelihoodRatios, N, w)
+    result = {'rls': rls.tolist()}
+    result['statistic'] = _shroStatistic(rls, N, tau)
 
     if verbose:
         print(pd.Series(result['statistic']))
     return result
 
 
-def runLengthShroNorm(x, mean, sigma, n, delta, ubd):
-    limit = len(x)
-
-    wm = 0
-    wmv = [None]
-    m = 1
+def runLengthShroNorm(x, mean, sigma, n, delta, ubd, keep_w=True):
+    """ Run length of the Shiryayev-Roberts procedure for normal data
 
+    The trajectory of the statistic is returned as 'w' if keep_w is True.
+    """
     e1 = n * delta / sigma ** 2
     e2 = e1 * delta / 2
-    while m < limit and wm < ubd:
-        s1 = 0
-        wm = 0
-        for i in range(0, m):
-            s1 = s1 + x[m - i] - mean
-            wm = wm + np.exp(s1 * e1 - (i + 1) * e2)
-        wmv.append(wm)
-        m += 1
-    return {'rl': m, 'w': wmv}
-
+    rl, wmv = _runLengthShro((np.asarray(x, dtype=float) - mean) * e1 - e2, ubd, keep_w)
+    return {'rl': rl, 'w': wmv}
 
-def runLengthShroPois(x, rho, delta, ubd):
-    limit = len(x)
 
-    wm = 0
-    wmv = [None]
-    m = 1
+def runLengthShroPois(x, rho, delta, ubd, keep_w=True):
+    """ Run length of the Shiryayev-Roberts procedure for Poisson data
 
-    e1 = np.log(rho)
-    while m < limit and wm < ubd:
-        s1 = 0
-        wm = 0
-        for i in range(0, m):
-            s1 = s1 + x[m - i]
-            wm = wm + np.exp(s1 * e1 - (i + 1) * delta)
-        wmv.append(wm)
-        m += 1
-    if m == limit:
-        m = np.inf
-    return {'rl': m, 'w': wmv}
+    The trajectory of the statistic is returned as 'w' if keep_w is True.
+    """
+    rl, wmv = _runLengthShro(np.asarray(x, dtype=float) * np.log(rho) - delta, ubd, keep_w)
+    if rl == len(x):
+        rl = np.inf
+    return {'rl': rl, 'w': wmv}
 
 
 def shroArlPfaCedPois(lambda0=10, lambda1=None, delta=1, tau=None,
@@ -106,20 +78,72 @@ def shroArlPfaCedPois(lambda0=10, lambda1=None, delta=1, tau=None,
 
     rho = (lambda0 + delta) / lambda0
 
-    rls = []
-    for _ in range(N):
-        if tau is None:
-            x = stats.poisson(lambda0).rvs(limit)
-        else:
-            x = np.concatenate([
-                stats.poisson(lambda0).rvs(tau),
-                stats.poisson(lambda1).rvs(limit - tau),
-            ])
-        rls.append(runLengthShroPois(x, rho, delta, w)['rl'])
-    result = {'rls': rls}
+    def logLikelihoodRatios(size):
+        x = _sampleReplications(stats.poisson(lambda0), stats.poisson(lambda1), size, limit, tau)
+        return x * np.log(rho) - delta
+    rls = _shroRunLengths(logLikelihoodRatios, N, w)
+    rls[rls == limit] = np.inf
+    result = {'rls': rls.tolist()}
+    result['statistic'] = _shroStatistic(rls, N, tau)
+
+    if verbose:
+        print(pd.Series(result['statistic']))
+    return result
+
+
+def _runLengthShro(logLambda, ubd, keep_w):
+    """ Run the recursion on a single sequence; the first observation is not used """
+    limit = len(logLambda)
+    with np.errstate(over='ignore'):
+        likelihoodRatios = np.exp(logLambda).tolist()
 
+    wm = 0
+    wmv = [None] if keep_w else None
+    m = 1
+    while m < limit and wm < ubd:
+        wm = (1 + wm) * likelihoodRatios[m]
+        if keep_w:
+            wmv.append(wm)
+        m += 1
+    return m, wmv
+
+
+def _sampleReplications(randFunc0, randFunc1, size, limit, tau):
+    """ Draw size sequences in the same order as one sequence at a time """
+    if tau is None:
+        return np.reshape(randFunc0.rvs(size * limit), (size, limit))
+    return np.array([np.concatenate([randFunc0.rvs(tau), randFunc1.rvs(limit - tau)])
+                     for _ in range(size)])
+
+
+def _shroRunLengths(logLikelihoodRatios, N, ubd):
+    """ Run lengths of N replications advanced in lock-step, in blocks of replications
+
+    logLikelihoodRatios(size) returns a (size, limit) array of log-likelihood ratios.
+    Replications without signal get the run length limit.
+    """
+    rls = []
+    for start in range(0, N, REPLICATION_BLOCK):
+        logLambda = logLikelihoodRatios(min(REPLICATION_BLOCK, N - start))
+        size, limit = logLambda.shape
+        rl = np.full(size, limit, dtype=float)
+        wm = np.zeros(size)
+        active = np.ones(size, dtype=bool)
+        with np.errstate(over='ignore', invalid='ignore'):
+            for m in range(1, limit):
+                wm = (1 + wm) * np.exp(logLambda[:, m])
+                signal = active & (wm >= ubd)
+                rl[signal] = m + 1
+                active &= ~signal
+                if not active.any():
+                    break
+        rls.append(rl)
+    return np.concatenate(rls)
+
+
+def _shroStatistic(rls, N, tau):
     rls = np.ma.masked_invalid(rls)
-    result['statistic'] = {
+    statistic = {
         'ARL': np.mean(rls),
         'Std. Error': np.sqrt((np.mean(rls ** 2) - np.mean(rls) ** 2) / N),
     }
@@ -130,10 +154,7 @@ def shroArlPfaCedPois(lambda0=10, lambda1=None, delta=1, tau=None,
             (np.sum(rls[rls >= tau] ** 2) / (N - np.sum(rls < tau)) - ced ** 2)
             /
             (N - np.sum(rls < tau)))
-        result['statistic']['PFA'] = pfa
-        result['statistic']['CED'] = ced
-        result['statistic']['CED-Std. Error'] = se
-
-    if verbose:
-        print(pd.Series(result['statistic']))
-    return result
+        statistic['PFA'] = pfa
+        statistic['CED'] = ced
+        statistic['CED-Std. Error'] = se
+    return statistic
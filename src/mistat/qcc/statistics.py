@@ -10,8 +10,10 @@ from enum import Enum
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy import stats
-from scipy.special import gammaln  # pylint: disable=no-name-in-module
+
+from mistat.qcc import constants
 
 GroupMeans = namedtuple('GroupMeans', 'statistics,center')
 
@@ -87,22 +89,6 @@ class SD_estimator(Enum):
         raise ValueError(f'unknown SD estimator {name}')
 
 
-# exp.R.unscaled a vector specifying, for each sample size, the expected value of the relative range
-# (i.e. R/σ) for a normal distribution. This appears as d2 on most tables containing factors for
-# the construction of control charts.
-_exp_R_unscaled = [np.nan, np.nan, 1.128, 1.693, 2.059, 2.326, 2.534, 2.704, 2.847, 2.970, 3.078, 3.173,
-                   3.258, 3.336, 3.407, 3.472, 3.532, 3.588, 3.640, 3.689, 3.735, 3.778, 3.819, 3.858, 3.895, 3.931]
-# se.R.unscaled a vector specifying, for each sample size, the standard error of the relative range
-# (i.e. R/σ) for a normal distribution. This appears as d3 on most tables containing factors for
-# the construction of control charts.
-_se_R_unscaled = [np.nan, np.nan, 0.8525033, 0.8883697, 0.8798108, 0.8640855, 0.8480442, 0.8332108, 0.8198378,
-                  0.8078413, 0.7970584, 0.7873230, 0.7784873, 0.7704257, 0.7630330, 0.7562217, 0.7499188, 0.7440627,
-                  0.7386021, 0.7334929, 0.7286980, 0.7241851, 0.7199267, 0.7158987, 0.7120802, 0.7084528, 0.7050004,
-                  0.7017086, 0.6985648, 0.6955576, 0.6926770, 0.6899137, 0.6872596, 0.6847074, 0.6822502, 0.6798821,
-                  0.6775973, 0.6753910, 0.6732584, 0.6711952, 0.6691976, 0.6672619, 0.6653848, 0.6635632, 0.6617943,
-                  0.6600754, 0.6584041, 0.6567780, 0.6551950, 0.6536532, 0.6521506]
-
-
 class Base_statistic:
     @staticmethod
     def getSizes(data):
@@ -139,28 +125,29 @@ class Xbar_statistic(Base_statistic):
             if max(sizes) > 25:
                 std_dev = SD_estimator.rmsdf
 
+        sizes = np.asarray(sizes)
         if std_dev == SD_estimator.uwave_r:
             r = np.nanmax(data, axis=1) - np.nanmin(data, axis=1)
-            d2 = [_exp_R_unscaled[size] for size in sizes]
+            d2 = constants.d2(sizes)
             return np.mean(r / d2)
         if std_dev == SD_estimator.uwave_sd:
             s = np.nanstd(data, axis=1, ddof=1)
-            c4 = np.array([qcc_c4(size) for size in sizes])
+            c4 = constants.c4(sizes)
             return np.mean(s / c4)
         if std_dev == SD_estimator.mvlue_r:
             r = np.nanmax(data, axis=1) - np.nanmin(data, axis=1)
-            d2 = np.array([_exp_R_unscaled[size] for size in sizes])
-            d3 = np.array([_se_R_unscaled[size] for size in sizes])
+            d2 = constants.d2(sizes)
+            d3 = constants.d3(sizes)
             w = (d2 / d3) ** 2
             return np.sum(w * r / d2) / np.sum(w)
         if std_dev == SD_estimator.mvlue_sd:
             s = np.nanstd(data, axis=1, ddof=1)
-            c4 = np.array([qcc_c4(size) for size in sizes])
+            c4 = constants.c4(sizes)
             w = c4 ** 2 / (1 - c4**2)
             return np.sum(w * s / c4) / np.sum(w)
         if std_dev == SD_estimator.rmsdf:
             s = np.nanstd(data, axis=1, ddof=1)
-            w = np.array([size - 1 for size in sizes])
+            w = sizes - 1
             return np.sqrt(np.sum(w * s**2) / np.sum(w)) / qcc_c4(np.sum(w) + 1)
 
         raise NotImplementedError()
@@ -197,7 +184,22 @@ class Xbar_one_statistic(Base_statistic):
             data = data.values
         return GroupMeans(np.array(data).flatten(), np.mean(data))
 
-    def sd(self, data, *, std_dev=None, sizes=None, k=2):  # pylint: disable=unused-import, arguments-differ
+    @staticmethod
+    def movingRanges(data, k=2):
+        """ Ranges of all windows of k consecutive observations
+
+        The moving range series can be passed to sd() or used for an MR chart.
+        """
+        if isinstance(data, (pd.Series, pd.DataFrame)):
+            data = data.values
+        data = np.asarray(data, dtype=float).flatten()
+        if k == 2:
+            return np.abs(np.diff(data))
+        windows = sliding_window_view(data, k)
+        return np.max(windows, axis=1) - np.min(windows, axis=1)
+
+    def sd(self, data, *, std_dev=None, sizes=None, k=2,  # pylint: disable=unused-import, arguments-differ
+           moving_ranges=None):
         if isinstance(std_dev, numbers.Number):
             return std_dev
 
@@ -211,11 +213,9 @@ class Xbar_one_statistic(Base_statistic):
             std_dev = std_dev.upper()
 
         if std_dev == SD_estimator.mr:
-            d = 0
-            for i in range(len(data) - (k - 1)):
-                group = data[i:i + k]
-                d += np.max(group) - np.min(group)
-            return d / ((len(data) - k + 1) * _exp_R_unscaled[k])
+            if moving_ranges is None:
+                moving_ranges = self.movingRanges(data, k=k)
+            return np.mean(moving_ranges) / constants.d2(k)
 
         if std_dev == SD_estimator.sd:
             return np.std(data, ddof=1) / qcc_c4(len(data))
@@ -269,12 +269,8 @@ class R_statistic(Base_statistic):
             sizes = [sizes[0]]
         sizes = np.array(sizes)
 
-        Rtab = len(_se_R_unscaled)
-
         if conf >= 1:
-            if any(size > Rtab for size in sizes):
-                raise ValueError(f'group size must be less than {Rtab + 1} when giving nsigmas')
-            seR = std_dev * np.array([_se_R_unscaled[size] for size in sizes])
+            seR = std_dev * constants.d3(sizes)
             lcl = center - conf * seR
             ucl = center + conf * seR
         else:
@@ -316,17 +312,17 @@ class S_statistic(Base_statistic):
             sizes = [sizes[0]]
         sizes = np.array(sizes)
 
-        c4 = np.array([qcc_c4(size) for size in sizes])
+        c4 = constants.c4(sizes)
         se_stats = std_dev * np.sqrt(1 - c4**2)
         if conf >= 1:
             lcl = center - conf * se_stats
             ucl = center + conf * se_stats
         else:
             p = (1 - conf) / 2
-            chi2 = [stats.chi2(size - 1).ppf(p) for size in sizes]
+            chi2 = stats.chi2.ppf(p, sizes - 1)
             lcl = std_dev * np.sqrt(chi2 / (sizes - 1))
 
-            chi2 = [stats.chi2(size - 1).ppf(1 - p) for size in sizes]
+            chi2 = stats.chi2.ppf(1 - p, sizes - 1)
             ucl = std_dev * np.sqrt(chi2 / (sizes - 1))
         lcl[lcl < 0] = 0
         return pd.DataFrame({'LCL': lcl, 'UCL': ucl})
@@ -427,9 +423,10 @@ class NP_statistic(Base_statistic):
             lcl = center - tol
             ucl = center + tol
         else:
-            p = (1 - conf) / 2
-            lcl = np.array([stats.binom(size, p).ppf(pbar) for size in sizes])
-            ucl = np.array([stats.binom(size, p).isf(pbar) for size in sizes])
+            # probability limits of the binomial distribution
+            alpha = (1 - conf) / 2
+            lcl = stats.binom(sizes, pbar).ppf(alpha)
+            ucl = stats.binom(sizes, pbar).ppf(1 - alpha)
         lcl[lcl < 0] = 0
         ucl[ucl > sizes] = sizes[ucl > sizes]
         return pd.DataFrame({'LCL': lcl, 'UCL': ucl})
@@ -503,7 +500,7 @@ class NP_statistic(Base_statistic):
 
 
 def qcc_c4(n):
-    return np.sqrt(2 / (n - 1)) * np.exp(gammaln(n / 2) - gammaln((n - 1) / 2))
+    return constants.c4(n)
 
 
 qccStatistics = QCCStatistics()
@@ -0,0 +1,295 @@
+# pylint: disable=too-many-arguments,too-many-instance-attributes,too-many-return-statements
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+
+Shewhart control chart that is updated one subgroup at a time
+'''
+import numbers
+from collections import namedtuple
+
+import numpy as np
+
+from mistat.qcc import constants
+from mistat.qcc.rules import RUN_LENGTH
+from mistat.qcc.statistics import SD_estimator, qccStatistics
+
+StreamingPoint = namedtuple('StreamingPoint', 'index,statistic,LCL,UCL,beyondLimits,violatingRun')
+
+
+class StreamingQCC:
+    """ Shewhart control chart that processes one subgroup at a time
+
+    In phase I, every subgroup updates running sums from which the center and the
+    standard deviation are estimated. Calling freeze() fixes center, standard deviation
+    and control limits. Each subsequent subgroup (phase II) is evaluated against the
+    frozen limits and the beyond limits and run rules are advanced incrementally. The
+    cost of update() is independent of the number of subgroups seen so far.
+
+    center and std_dev can be given as numbers to fix them; std_dev can also be an
+    SD_estimator that is used to estimate the standard deviation from phase I. sizes
+    is the default subgroup size for p and np charts.
+    """
+
+    def __init__(self, qcc_type=qccStatistics.default, center=None, std_dev=None, sizes=None,
+                 nsigmas=3, confidence_level=None, run_length=RUN_LENGTH):
+        self.statistic = qccStatistics.get(qcc_type)
+        self.qcc_type = self.statistic.qcc_type
+        self.conf = nsigmas if confidence_level is None else confidence_level
+        self.run_length = run_length
+        self.defaultSize = sizes
+
+        self.fixedCenter = center
+        self.fixedStdDev = std_dev if isinstance(std_dev, numbers.Number) else None
+        self.sdEstimator = None if isinstance(std_dev, numbers.Number) else std_dev
+
+        self.center = None
+        self.std_dev = None
+        self.frozen = False
+        # number of subgroups processed before this chart, e.g. by a QualityControlChart
+        self.offset = 0
+
+        self.statistics = []
+        self.sizes = []
+        self.violations = {'beyondLimits': {'UCL': [], 'LCL': []}, 'violatingRuns': []}
+
+        # running sums of phase I
+        self._nGroups = 0
+        self._sumValues = 0.0
+        self._sumSizes = 0
+        self._sumSizeStatistics = 0.0
+        self._maxSize = 0
+        self._sizesConstant = True
+        self._sumRd2 = 0.0
+        self._sumWRd2 = 0.0
+        self._sumWR = 0.0
+        self._sumSc4 = 0.0
+        self._sumWSc4 = 0.0
+        self._sumWS = 0.0
+        self._sumDfVar = 0.0
+        self._sumDf = 0
+        self._sumMR = 0.0
+        self._lastValue = None
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        # state of phase II
+        self._pbar = None
+        self._limitsCache = {}
+        self._runSign = 0
+        self._runLength = 0
+
+    @classmethod
+    def fromChart(cls, qcc, run_length=RUN_LENGTH):
+        """ Create a frozen streaming chart that continues a QualityControlChart
+
+        Center, standard deviation and limits are taken from the chart and the state
+        of the run rule is initialized from the trailing run of the chart statistics.
+        """
+        sizes = np.array(qcc.sizes)
+        defaultSize = int(sizes[0]) if len(sizes) > 0 and np.all(sizes == sizes[0]) else None
+        stream = cls(qcc_type=qcc.qcc_type, center=float(qcc.center), std_dev=qcc.std_dev,
+                     sizes=defaultSize, nsigmas=qcc.conf, run_length=run_length)
+        stream._sizesConstant = defaultSize is not None
+        stream.offset = len(qcc.stats.statistics)
+        stream.center = float(qcc.center)
+        stream.std_dev = qcc.std_dev
+        if stream.qcc_type == 'np':
+            if defaultSize is None:
+                raise ValueError('np-charts with varying sizes cannot be continued; use a p-chart')
+            stream._pbar = stream.center / defaultSize
+        elif stream.qcc_type == 'p':
+            stream._pbar = stream.center
+        if len(qcc.limits) == 1 and defaultSize is not None:
+            stream._limitsCache[defaultSize] = (float(qcc.limits['LCL'].iloc[0]), float(qcc.limits['UCL'].iloc[0]))
+        stream.frozen = True
+
+        statistics = np.array(qcc.stats.statistics, dtype=float).flatten()
+        if len(statistics) > 0:
+            signs = np.sign(statistics - stream.center)
+            changes = np.nonzero(signs != signs[-1])[0]
+            stream._runSign = signs[-1]
+            stream._runLength = len(signs) - (changes[-1] + 1 if len(changes) > 0 else 0)
+        return stream
+
+    def update(self, subgroup, size=None):
+        """ Add a subgroup to the chart and return its evaluation as a StreamingPoint
+
+        In phase I, the limits are not yet known and the point is only used to update
+        the estimates of center and standard deviation.
+        """
+        statistic, size = self._groupStatistic(subgroup, size)
+        index = self.offset + len(self.statistics)
+        self.statistics.append(statistic)
+        self.sizes.append(size)
+        if not self.frozen:
+            self._accumulate(subgroup, statistic, size)
+            return StreamingPoint(index, statistic, None, None, None, False)
+        return self._score(index, statistic, size)
+
+    def freeze(self):
+        """ Fix center, standard deviation and limits and evaluate the phase I subgroups """
+        if self.frozen:
+            return self
+        if self._nGroups == 0 and (self.fixedCenter is None or self.fixedStdDev is None):
+            raise ValueError('center and std_dev require phase I data or must be given')
+        if self.qcc_type == 'np' and not self._sizesConstant:
+            raise ValueError('np-charts with varying sizes are not supported; use a p-chart')
+        self.center = self._estimateCenter()
+        self.std_dev = self._estimateStdDev()
+        if self.qcc_type == 'np':
+            self._pbar = self.center / self.defaultSize
+        elif self.qcc_type == 'p':
+            self._pbar = self.center
+        self.frozen = True
+
+        for index, (statistic, size) in enumerate(zip(self.statistics, self.sizes)):
+            self._score(self.offset + index, statistic, size)
+        return self
+
+    def limitsFor(self, size):
+        """ Return the (LCL, UCL) tuple of a subgroup of the given size """
+        if size not in self._limitsCache:
+            limits = self.statistic.limits(self.centerFor(size), self.std_dev, [size], self.conf)
+            self._limitsCache[size] = (float(limits['LCL'].iloc[0]), float(limits['UCL'].iloc[0]))
+        return self._limitsCache[size]
+
+    def centerFor(self, size):
+        if self.qcc_type == 'np':
+            return self._pbar * size
+        return self.center
+
+    def _score(self, index, statistic, size):
+        lcl, ucl = self.limitsFor(size)
+        beyondLimits = None
+        if statistic > ucl:
+            beyondLimits = 'UCL'
+        elif statistic < lcl:
+            beyondLimits = 'LCL'
+        if beyondLimits is not None:
+            self.violations['beyondLimits'][beyondLimits].append(index)
+
+        sign = np.sign(statistic - self.centerFor(size))
+        if sign == self._runSign:
+            self._runLength += 1
+        else:
+            self._runSign = sign
+            self._runLength = 1
+        violatingRun = bool(self.run_length > 0 and sign != 0 and self._runLength >= self.run_length)
+        if violatingRun:
+            self.violations['violatingRuns'].append(index)
+        return StreamingPoint(index, statistic, lcl, ucl, beyondLimits, violatingRun)
+
+    def _groupStatistic(self, subgroup, size):
+        values = np.asarray(subgroup, dtype=float).reshape(-1)
+        if self.qcc_type in ('xbarone', 'p', 'np'):
+            if len(values) != 1:
+                raise ValueError(f'{self.qcc_type}-charts require a single value per subgroup')
+            value = float(values[0])
+            if self.qcc_type == 'xbarone':
+                return value, 1
+            size = self.defaultSize if size is None else size
+            if size is None:
+                raise ValueError(f'{self.qcc_type}-charts require argument sizes to be provided')
+            return (value / size if self.qcc_type == 'p' else value), int(size)
+
+        values = values[~np.isnan(values)]
+        size = len(values)
+        if size == 0:
+            raise ValueError('subgroup contains no data')
+        if self.qcc_type == 'xbar':
+            return float(np.mean(values)), size
+        if self.qcc_type == 'R':
+            return float(np.max(values) - np.min(values)), size
+        return float(np.std(values, ddof=1)) if size > 1 else np.nan, size
+
+    def _accumulate(self, subgroup, statistic, size):
+        self._nGroups += 1
+        if self._sizesConstant and self._nGroups > 1 and size != self.sizes[0]:
+            self._sizesConstant = False
+        if self.defaultSize is None and self.qcc_type in ('p', 'np'):
+            self.defaultSize = size
+        self._maxSize = max(self._maxSize, size)
+
+        if self.qcc_type == 'xbarone':
+            self._sumValues += statistic
+            self._sumSizes += 1
+            if self._lastValue is not None:
+                self._sumMR += abs(statistic - self._lastValue)
+            self._lastValue = statistic
+            # Welford's algorithm for the running variance
+            delta = statistic - self._mean
+            self._mean += delta / self._nGroups
+            self._m2 += delta * (statistic - self._mean)
+            return
+        if self.qcc_type in ('p', 'np'):
+            self._sumValues += statistic * size if self.qcc_type == 'p' else statistic
+            self._sumSizes += size
+            return
+
+        values = np.asarray(subgroup, dtype=float).reshape(-1)
+        values = values[~np.isnan(values)]
+        self._sumValues += float(np.sum(values))
+        self._sumSizes += size
+        self._sumSizeStatistics += size * statistic
+
+        r = np.max(values) - np.min(values)
+        d2 = constants.d2(size)
+        d3 = constants.d3(size)
+        w = (d2 / d3) ** 2
+        self._sumRd2 += r / d2
+        self._sumWRd2 += w * r / d2
+        self._sumWR += w
+
+        s = np.std(values, ddof=1) if size > 1 else np.nan
+        c4 = constants.c4(size)
+        w = c4 ** 2 / (1 - c4 ** 2)
+        self._sumSc4 += s / c4
+        self._sumWSc4 += w * s / c4
+        self._sumWS += w
+        self._sumDfVar += (size - 1) * s ** 2
+        self._sumDf += size - 1
+
+    def _estimateCenter(self):
+        if self.fixedCenter is not None:
+            return float(self.fixedCenter)
+        if self.qcc_type in ('xbar', 'xbarone', 'p'):
+            return self._sumValues / self._sumSizes
+        if self.qcc_type == 'np':
+            return self._sumValues / self._sumSizes * self.defaultSize
+        return self._sumSizeStatistics / self._sumSizes
+
+    def _estimateStdDev(self):
+        if self.fixedStdDev is not None:
+            return self.fixedStdDev
+        if self.qcc_type in ('p', 'np'):
+            pbar = self._sumValues / self._sumSizes
+            size = 1 if self.qcc_type == 'p' else self.defaultSize
+            return np.sqrt(size * pbar * (1 - pbar))
+        if self.qcc_type == 'xbarone':
+            estimator = SD_estimator.get(self.sdEstimator, SD_estimator.mr)
+            if estimator == SD_estimator.mr:
+                return self._sumMR / ((self._nGroups - 1) * constants.d2(2))
+            if estimator == SD_estimator.sd:
+                return np.sqrt(self._m2 / (self._nGroups - 1)) / constants.c4(self._nGroups)
+            raise NotImplementedError(f'estimator {estimator}')
+
+        default = {
+            'xbar': SD_estimator.rmsdf if self._maxSize > 25 else SD_estimator.uwave_r,
+            'R': SD_estimator.uwave_r,
+            'S': SD_estimator.uwave_sd,
+        }[self.qcc_type]
+        estimator = SD_estimator.get(self.sdEstimator, default)
+        if estimator == SD_estimator.uwave_r:
+            return self._sumRd2 / self._nGroups
+        if estimator == SD_estimator.mvlue_r:
+            return self._sumWRd2 / self._sumWR
+        if estimator == SD_estimator.uwave_sd:
+            return self._sumSc4 / self._nGroups
+        if estimator == SD_estimator.mvlue_sd:
+            return self._sumWSc4 / self._sumWS
+        if estimator == SD_estimator.rmsdf:
+            return np.sqrt(self._sumDfVar / self._sumDf) / constants.c4(self._sumDf + 1)
+        raise NotImplementedError(f'estimator {estimator}')
@@ -0,0 +1,68 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pytest
+
+from mistat.qcc import EWMA, Cusum
+from mistat.qcc.arl import cusumArlExact, ewmaArlExact
+
+
+class TestARL(unittest.TestCase):
+    def test_cusumArlExact(self):
+        # one-sided CUSUM with k=0.5 and h=5 (Lucas and Crosier)
+        for method in ('markov', 'integral'):
+            result = cusumArlExact(k=0.5, h=5, method=method)
+            assert result.ARL == pytest.approx(930.9, rel=2e-3)
+            assert cusumArlExact(k=0.5, h=5, shift=1, method=method).ARL == pytest.approx(10.38, abs=0.01)
+        assert cusumArlExact(k=0.5, h=5, side='both').ARL == pytest.approx(465.4, abs=0.2)
+        # lower side with a negative shift is the mirror image of the upper side
+        assert (cusumArlExact(k=0.5, h=4, shift=-1, side='lower').ARL ==
+                pytest.approx(cusumArlExact(k=0.5, h=4, shift=1).ARL))
+
+        # fast initial response reduces the out-of-control ARL
+        assert cusumArlExact(k=0.5, h=5, shift=1, head_start=2.5).ARL == pytest.approx(6.35, abs=0.01)
+
+        # steady-state ARL is smaller than the zero-state ARL
+        result = cusumArlExact(k=0.5, h=5, shift=1)
+        assert result.steadyStateARL < result.ARL
+        assert result.pmf is None
+
+        with pytest.raises(ValueError):
+            cusumArlExact(k=0.5, h=5, method='simulation')
+        with pytest.raises(ValueError):
+            cusumArlExact(k=0.5, h=5, side='left')
+
+    def test_runLengthDistribution(self):
+        result = cusumArlExact(k=0.5, h=4, shift=1, distribution=True)
+        pmf = result.pmf
+        runLengths = np.arange(1, len(pmf) + 1)
+        assert np.sum(pmf) == pytest.approx(1)
+        assert np.sum(runLengths * pmf) == pytest.approx(result.ARL, rel=1e-6)
+        sd = np.sqrt(np.sum(runLengths ** 2 * pmf) - result.ARL ** 2)
+        assert sd == pytest.approx(result.sdRL, rel=1e-5)
+
+        result = ewmaArlExact(smooth=0.2, nsigmas=3, shift=1, method='markov', distribution=True)
+        assert np.sum(np.arange(1, len(result.pmf) + 1) * result.pmf) == pytest.approx(result.ARL, rel=1e-6)
+
+    def test_ewmaArlExact(self):
+        # Lucas and Saccucci: smooth=0.1, L=2.814 gives an in-control ARL of 500
+        for method in ('markov', 'integral'):
+            assert ewmaArlExact(0.1, 2.814, method=method).ARL == pytest.approx(500, rel=5e-3)
+            assert ewmaArlExact(0.1, 2.814, shift=1, method=method).ARL == pytest.approx(10.3, abs=0.05)
+        # the EWMA with smooth=1 is a Shewhart chart
+        assert ewmaArlExact(1, 3).ARL == pytest.approx(370.4, abs=0.1)
+
+    def test_chart_arl(self):
+        rng = np.random.default_rng(1)
+        data = rng.normal(10, 1, size=(20, 5))
+        cusum = Cusum(data, center=10, std_dev=1, decision_interval=4, head_start=1)
+        assert cusum.arl(shift=1).ARL == pytest.approx(
+            cusumArlExact(k=0.5, h=4, shift=1, side='both', head_start=1).ARL)
+        ewma = EWMA(data, center=10, std_dev=1, smooth=0.1, nsigmas=2.814)
+        assert ewma.arl().ARL == pytest.approx(ewmaArlExact(0.1, 2.814).ARL)
@@ -0,0 +1,43 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pytest
+
+from mistat.qcc import constants
+
+
+class TestConstants(unittest.TestCase):
+    def test_d2_d3(self):
+        assert constants.d2(2) == 1.128
+        assert constants.d3(2) == 0.8525033
+        assert np.isnan(constants.d2(1))
+        np.testing.assert_array_equal(constants.d2([5, 2, 5]), [2.326, 1.128, 2.326])
+        assert constants.d2(np.array([[2, 3], [4, 5]])).shape == (2, 2)
+
+        # values beyond the tables are calculated by numerical integration
+        assert constants.d2(30) == pytest.approx(4.086, abs=5e-4)
+        assert constants.d2(50) == pytest.approx(4.498, abs=5e-4)
+        assert 0 < constants.d3(50) - constants.d3(51) < 2e-3
+        assert constants.d3(100) < constants.d3(60) < constants.d3(51)
+
+        # the numerical integration agrees with the tables
+        assert constants.d2.__wrapped__(25) == pytest.approx(3.931, abs=5e-4)
+        assert constants.d3.__wrapped__(50) == pytest.approx(0.6521506, abs=1e-4)
+        assert constants.d3.__wrapped__(2) == pytest.approx(0.8525033, abs=1e-4)
+
+    def test_factors(self):
+        table = constants.controlChartConstants([2, 5, 10])
+        np.testing.assert_allclose(table['c4'], [0.7979, 0.9400, 0.9727], atol=1e-4)
+        np.testing.assert_allclose(table['A2'], [1.880, 0.577, 0.308], atol=1e-3)
+        np.testing.assert_allclose(table['A3'], [2.659, 1.427, 0.975], atol=1e-3)
+        np.testing.assert_allclose(table['B3'], [0, 0, 0.284], atol=1e-3)
+        np.testing.assert_allclose(table['B4'], [3.267, 2.089, 1.716], atol=1e-3)
+        np.testing.assert_allclose(table['D3'], [0, 0, 0.223], atol=1e-3)
+        np.testing.assert_allclose(table['D4'], [3.267, 2.114, 1.777], atol=1e-3)
+        np.testing.assert_allclose(table['E2'], [2.660, 1.290, 0.975], atol=1e-3)
@@ -1,3 +1,4 @@
+# pylint: disable=protected-access
 '''
 Modern Statistics: A Computer Based Approach with Python
 Industrial Statistics: A Computer Based Approach with Python
@@ -6,10 +7,14 @@ Industrial Statistics: A Computer Based Approach with Python
 '''
 import unittest
 
+import numpy as np
 import pytest
 from scipy import stats
 
-from mistat.qcc.cusum import cusumArl, cusumPfaCed
+from mistat.qcc import cusum
+from mistat.qcc.cusum import (Cusum, cusumArl, cusumArlBatch, cusumArlTable,
+                              cusumPfaCed, cusumPfaCedBatch, cusumRunLengths,
+                              runLength, tabularCusum)
 
 
 class TestCusum(unittest.TestCase):
@@ -40,3 +45,97 @@ class TestCusum(unittest.TestCase):
         cusumPfaCed(randFunc1=stats.norm(), randFunc2=stats.norm(loc=1),
                     tau=100, N=100, limit=1_000, seed=1, verbose=False)
         # TODO:  write asserts
+
+    def test_cusumRunLengths(self):
+        # lock-step simulation gives the same run lengths as runLength
+        rng = np.random.default_rng(1)
+        x = rng.normal(loc=0.3, size=(50, 300))
+        for side in ('both', 'upper', 'lower'):
+            pos = np.zeros(len(x))
+            neg = np.zeros(len(x))
+            signal = cusum._cusumChunk(x, pos, neg, 1, -1, 3, -3, side != 'lower', side != 'upper')
+            if side == 'both':
+                expected = [runLength(xi, 1, -1, 3, -3, side).rl for xi in x]
+                np.testing.assert_array_equal(signal, [-1 if np.isinf(e) else e for e in expected])
+            kernelSignal = np.full(len(x), -1)
+            cusum._cusumKernelPython(x, np.zeros(len(x)), np.zeros(len(x)), 1, -1, 3, -3,
+                                     side != 'lower', side != 'upper', kernelSignal)
+            np.testing.assert_array_equal(signal, kernelSignal)
+
+        rls = cusumRunLengths(N=200, limit=100, seed=1, chunk=7)
+        assert len(rls) == 200
+        assert np.isinf(rls).sum() > 0
+        np.testing.assert_array_equal(rls, cusumRunLengths(N=200, limit=100, seed=1, chunk=7))
+
+    def test_cusumArlBatch(self):
+        arl = cusumArlBatch(randFunc=stats.norm(loc=1.0), N=2000, seed=1)
+        assert arl['statistic']['ARL'] == pytest.approx(16.9, abs=1)
+        arl = cusumArlBatch(randFunc=stats.norm(), N=1000, seed=1)
+        assert arl['statistic']['ARL'] == pytest.approx(1000, rel=0.1)
+        # same standard error formula as cusumArl
+        rls = np.ma.masked_invalid(arl['rls'])
+        expected = np.sqrt((np.mean(rls ** 2) - np.mean(rls)) / 1000)
+        assert arl['statistic']['Std. Error'] == pytest.approx(expected)
+
+        result = cusumPfaCedBatch(randFunc1=stats.norm(), randFunc2=stats.norm(loc=1),
+                                  tau=100, N=500, limit=1_000, seed=1, verbose=False)
+        assert result['statistic']['PFA'] == pytest.approx(0.1, abs=0.05)
+        assert result['statistic']['CED'] == pytest.approx(16.9, abs=2)
+
+        table = cusumArlTable([0.5, 1], [3, 4], N=200, seed=1)
+        assert table.shape == (2, 2)
+        assert table.loc[3, 0.5] < table.loc[4, 0.5] < table.loc[4, 1]
+
+        # with common random numbers, the run length of every replication increases with h
+        hValues = np.round(np.arange(2, 4, 0.1), 1)
+        table = cusumArlTable([0.5], hValues, randFunc=stats.norm(loc=0.5), N=20, seed=1)
+        assert np.all(np.diff(table[0.5].values) >= 0)
+        for h in (2.5, 3.5):
+            rls = [runLength(x, 0.5, -0.5, h, -h, 'both').violationsUpper for x in
+                   stats.norm(loc=0.5).rvs(size=(20, 256), random_state=np.random.default_rng(1))]
+            assert table.loc[h, 0.5] == pytest.approx(np.mean(rls))
+
+    def test_cusumArlBatch_compiled(self):
+        pytest.importorskip('numba')
+        arl = cusumArlBatch(randFunc=stats.norm(loc=0.5), N=200, seed=1)
+        compiled = cusumArlBatch(randFunc=stats.norm(loc=0.5), N=200, seed=1, compiled=True)
+        np.testing.assert_array_equal(arl['rls'], compiled['rls'])
+
+    def test_tabularCusum(self):
+        z = np.array([1.0, -3, 0.5, 2, -1, 4])
+        expected = []
+        last = 0.5
+        for zi in z:
+            last = max(0, last + zi)
+            expected.append(last)
+        np.testing.assert_array_almost_equal(tabularCusum(z, 0.5), expected)
+        assert len(tabularCusum([])) == 0
+
+    def test_Cusum_newdata(self):
+        rng = np.random.default_rng(1)
+        data = rng.normal(10, 2, size=50)
+        data[30:] += 2
+        full = Cusum(data, center=10, std_dev=2, head_start=1)
+        assert len(full.violations['upper']) > 0
+
+        chart = Cusum(data[:20], center=10, std_dev=2, head_start=1, newdata=data[20:30])
+        assert chart.newstats.shape == (10, )
+        chart.update(data[30:40])
+        for value in data[40:]:
+            chart.update([value])
+        np.testing.assert_array_almost_equal(chart.pos, full.pos)
+        np.testing.assert_array_almost_equal(chart.neg, full.neg)
+        np.testing.assert_array_equal(chart.violations['upper'], full.violations['upper'])
+        np.testing.assert_array_equal(chart.violations['lower'], full.violations['lower'])
+        assert len(chart.statistics) == 20
+        assert len(chart.newsizes) == 30
+        # reads are cached until the next update
+        first = chart.pos
+        assert chart.pos is first
+        chart.update(data[:2])
+        assert chart.pos is not first
+        assert len(chart.pos) == 52
+        np.testing.assert_array_almost_equal(chart.pos[:50], full.pos)
+
+        with pytest.raises(ValueError):
+            chart.update(data[:3], newsizes=[1, 1])
@@ -7,8 +7,9 @@ Industrial Statistics: A Computer Based Approach with Python
 import unittest
 
 import numpy as np
+import pytest
 
-from mistat.qcc.ewmaChart import ewmaSmooth
+from mistat.qcc.ewmaChart import EWMA, EWMAState, ewmaSmooth
 
 
 class TestCusum(unittest.TestCase):
@@ -25,3 +26,42 @@ class TestCusum(unittest.TestCase):
 
         smoothed = ewmaSmooth([1, 2, 3, 4], start=10)
         np.testing.assert_array_almost_equal(smoothed['y'], [8.2, 6.96, 6.168, 5.7344])
+
+        smoothed = ewmaSmooth([1, 2, 3, 4], x=[1, 1, 0, 0])
+        np.testing.assert_array_almost_equal(smoothed['x'], [0, 0, 1, 1])
+        np.testing.assert_array_almost_equal(smoothed['y'], [3, 3.2, 2.76, 2.608])
+
+    def test_EWMAState(self):
+        y = np.random.default_rng(1).normal(size=1000)
+        expected = ewmaSmooth(y, smooth=0.3, start=0)['y']
+        state = EWMAState(smooth=0.3, start=0)
+        resumed = np.concatenate([state.update(y[:400]), state.update([]), state.update(y[400:])])
+        np.testing.assert_array_almost_equal(resumed, expected)
+        assert state.count == 1000
+        assert state.last == pytest.approx(expected[-1])
+
+    def test_EWMA_newdata(self):
+        rng = np.random.default_rng(1)
+        data = rng.normal(10, 1, size=(30, 4))
+        data[25:] += 2
+        full = EWMA(data, center=10, std_dev=1)
+
+        ewma = EWMA(data[:20], center=10, std_dev=1, newdata=data[20:25])
+        assert len(ewma.newstats) == 5
+        assert isinstance(ewma.newdata, np.ndarray)
+        assert ewma.newdata.shape == (5, 4)
+        ewma.update(data[25:27])
+        ewma.update(data[27:])
+        assert isinstance(ewma.newdata, np.ndarray)
+        np.testing.assert_array_equal(ewma.newdata, data[20:])
+        np.testing.assert_array_almost_equal(ewma.y, full.y)
+        np.testing.assert_array_equal(ewma.ewma['y'], ewma.y)
+        np.testing.assert_array_equal(ewma.ewma['x'], np.arange(30))
+        np.testing.assert_array_almost_equal(ewma.ucl, full.ucl)
+        np.testing.assert_array_equal(ewma.violations, full.violations)
+        assert len(ewma.violations) > 0
+        np.testing.assert_array_equal(ewma.newsizes, [4] * 10)
+        assert len(ewma.statistics) == 20
+
+        with pytest.raises(ValueError):
+            ewma.update(data[:2], newsizes=[4])
@@ -0,0 +1,101 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from mistat.data import load_data
+from mistat.qcc.qccBatch import qcc_batch
+from mistat.qcc.qualityControlChart import QualityControlChart
+from mistat.qcc.statistics import SD_estimator
+
+
+class TestQCCBatch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.data = rng.normal(10, 1, size=(4, 30, 5)) * np.array([1, 2, 0.5, 1])[:, None, None]
+        self.data[1, 3, 4] = np.nan
+        self.data[2, 10:20] += 0.5
+        self.data[3, 5, 0] = 20
+
+    def assertSameChart(self, result, idx, qcc):
+        assert result.center[idx] == pytest.approx(qcc.center)
+        assert result.std_dev[idx] == pytest.approx(qcc.std_dev)
+        np.testing.assert_allclose(result.statistics[idx], np.array(qcc.stats.statistics, dtype=float).flatten())
+        limits = np.broadcast_to(qcc.limits.values, (result.statistics.shape[1], 2))
+        np.testing.assert_allclose(result.LCL[idx], limits[:, 0])
+        np.testing.assert_allclose(result.UCL[idx], limits[:, 1])
+        violations = result.violations(idx)
+        for key in ('UCL', 'LCL'):
+            np.testing.assert_array_equal(violations['beyondLimits'][key], qcc.violations['beyondLimits'][key])
+        assert violations['violatingRuns'] == qcc.violations['violatingRuns']
+
+    def test_continuous(self):
+        for qcc_type in ('xbar', 'R', 'S'):
+            result = qcc_batch(self.data, qcc_type=qcc_type)
+            for idx, data in enumerate(self.data):
+                self.assertSameChart(result, idx, QualityControlChart(data, qcc_type=qcc_type))
+
+        for std_dev in SD_estimator.uwave_sd, SD_estimator.mvlue_r, SD_estimator.mvlue_sd, SD_estimator.rmsdf:
+            result = qcc_batch(self.data, std_dev=std_dev, nsigmas=2)
+            for idx, data in enumerate(self.data):
+                self.assertSameChart(result, idx, QualityControlChart(data, std_dev=std_dev, nsigmas=2))
+
+        result = qcc_batch(self.data, qcc_type='S', confidence_level=0.9)
+        self.assertSameChart(result, 2, QualityControlChart(self.data[2], qcc_type='S', confidence_level=0.9))
+
+        values = self.data[:, :, 0]
+        result = qcc_batch(values, qcc_type='xbarone')
+        for idx, data in enumerate(values):
+            self.assertSameChart(result, idx, QualityControlChart(data, qcc_type='xbarone'))
+
+    def test_counts(self):
+        data = load_data('JANDEFECT').values
+        counts = np.array([data, data[::-1], np.roll(data, 5)])
+        result = qcc_batch(counts, qcc_type='p', sizes=100)
+        for idx, data in enumerate(counts):
+            self.assertSameChart(result, idx, QualityControlChart(data, qcc_type='p', sizes=np.full(len(data), 100)))
+
+        # probability limits for confidence_level < 1
+        result = qcc_batch(counts, qcc_type='p', sizes=100, confidence_level=0.99)
+        for idx, data in enumerate(counts):
+            self.assertSameChart(result, idx, QualityControlChart(data, qcc_type='p', sizes=np.full(len(data), 100),
+                                                                  confidence_level=0.99))
+        binom = stats.binom(100, result.center[0])
+        np.testing.assert_allclose(result.LCL[0], binom.ppf(0.005) / 100)
+        np.testing.assert_allclose(result.UCL[0], binom.ppf(0.995) / 100)
+
+        result = qcc_batch(counts, qcc_type='np', sizes=100)
+        np.testing.assert_allclose(result.center, 5.387097, rtol=1e-6)
+        np.testing.assert_allclose(result.std_dev, 2.257629, rtol=1e-6)
+        np.testing.assert_allclose(result.UCL, 12.15998, rtol=1e-6)
+
+        with pytest.raises(ValueError):
+            qcc_batch(counts, qcc_type='p')
+
+    def test_long_format(self):
+        k, g, n = self.data.shape
+        df = pd.DataFrame({
+            'characteristic': np.repeat([f'c{i}' for i in range(k)], g * n),
+            'group': np.tile(np.repeat(np.arange(g), n), k),
+            'value': self.data.flatten(),
+        })
+        df = df.dropna().sample(frac=1, random_state=1)
+        df = df.sort_values(['characteristic', 'group'], kind='stable')
+        result = qcc_batch(df)
+        reference = qcc_batch(self.data)
+        np.testing.assert_allclose(result.center, reference.center)
+        np.testing.assert_allclose(result.std_dev, reference.std_dev)
+        np.testing.assert_array_equal(result.beyondUCL, reference.beyondUCL)
+
+        summary = result.summary()
+        assert list(summary.index) == ['c0', 'c1', 'c2', 'c3']
+        assert summary.loc['c3', 'beyondLimits'] == 1
+        np.testing.assert_allclose(summary['center'], reference.center)
@@ -11,7 +11,9 @@ import numpy as np
 import pandas as pd
 
 from mistat.qcc.qualityControlChart import QualityControlChart, qcc_groups
-from mistat.qcc.rules import run_length_encoding
+from mistat.qcc.rules import (evaluateNelsonRules, nelsonRules,
+                              run_length_encoding, violatingRuns,
+                              westernElectricRules)
 
 
 class TestRules(unittest.TestCase):
@@ -30,3 +32,51 @@ class TestRules(unittest.TestCase):
         assert run_length_encoding('abbcccaaaaa') == [(1, 'a'), (2, 'b'), (3, 'c'), (5, 'a')]
         assert run_length_encoding([]) == []
         np.testing.assert_array_equal(run_length_encoding('abbccc', as_list=True), [1, 2, 2, 3, 3, 3])
+
+    def test_violatingRuns(self):
+        statistics = 10 + np.array([1, 1, 1, 1, 0, -1, -1, -1, 1, 1, 1, 1, 1, np.nan, -1])
+        qcc = QualityControlChart(statistics, qcc_type='xbarone', center=10, std_dev=1)
+        assert violatingRuns(qcc, run_length=3)['violatingRuns'] == [2, 3, 10, 11, 12, 7]
+        assert not violatingRuns(qcc, run_length=0)['violatingRuns']
+
+    def test_evaluateNelsonRules(self):
+        z = np.zeros(30)
+        z[3] = 3.5
+        violations = evaluateNelsonRules(z, rules=[1])
+        np.testing.assert_array_equal(violations[1], [3])
+
+        z = np.array([0.5, -2.5, 0.1, -2.2, 0.5, 1.5, 0.2, 1.2, 1.1, 1.3])
+        violations = evaluateNelsonRules(z, rules=[5, 6])
+        np.testing.assert_array_equal(violations[5], [3])
+        np.testing.assert_array_equal(violations[6], [9])
+
+        z = np.array([-0.5, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.1, 0.2, 0.1, 0.2, 0.1, 0.2, 0.1, 0.2, 0.1, 0.2, 0.1, 0.2])
+        violations = evaluateNelsonRules(z, rules=[2, 3, 4, 7, 8])
+        np.testing.assert_array_equal(violations[2], [9, 10, 11, 12, 13, 14, 15, 16, 17, 18])
+        np.testing.assert_array_equal(violations[3], [5, 6])
+        np.testing.assert_array_equal(violations[4], [18])
+        np.testing.assert_array_equal(violations[7], [14, 15, 16, 17, 18])
+        assert len(violations[8]) == 0
+
+        violations = evaluateNelsonRules(np.array([1.5, -1.5] * 5), rules=[8])
+        np.testing.assert_array_equal(violations[8], [7, 8, 9])
+        # all points on one side of the center line are covered by rule 2, not rule 8
+        violations = evaluateNelsonRules(np.full(10, 1.5), rules=[8])
+        assert len(violations[8]) == 0
+        violations = evaluateNelsonRules(np.array([1.5] * 7 + [-1.5]), rules=[8])
+        np.testing.assert_array_equal(violations[8], [7])
+
+        assert set(evaluateNelsonRules(z)) == set(range(1, 9))
+        assert all(len(v) == 0 for v in evaluateNelsonRules([]).values())
+
+    def test_nelsonRules(self):
+        statistics = 10 + np.array([0, 0.1, 0.5, 0.7, 1.1, 1.2, 1.4, 2.5, 3.5])
+        qcc = QualityControlChart(statistics, qcc_type='xbarone', center=10, std_dev=0.5)
+        violations = nelsonRules(qcc)['nelsonRules']
+        np.testing.assert_array_equal(violations[1], [7, 8])
+        np.testing.assert_array_equal(violations[3], [5, 6, 7, 8])
+
+        violations = westernElectricRules(qcc)['westernElectricRules']
+        np.testing.assert_array_equal(violations[1], [7, 8])
+        np.testing.assert_array_equal(violations[2], [5, 6, 7, 8])
+        np.testing.assert_array_equal(violations[4], [8])
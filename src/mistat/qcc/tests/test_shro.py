@@ -9,6 +9,7 @@ import unittest
 
 import numpy as np
 import pytest
+from scipy import stats
 
 from mistat.qcc.shro import (runLengthShroNorm, runLengthShroPois,
                              shroArlPfaCedNorm, shroArlPfaCedPois)
@@ -79,3 +80,25 @@ class TestCusum(unittest.TestCase):
         assert res['PFA'] == pytest.approx(0.03)
         assert res['CED'] == pytest.approx(0.958763)
         assert res['CED-Std. Error'] == pytest.approx(1.108611)
+
+    def test_recursion(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(0.2, 0.3, size=50)
+        res = runLengthShroNorm(x, 0, 1, 10, 1, 1e10)
+        # direct summation over all change points
+        e1, e2 = 10, 5
+        for m in range(1, len(res['w'])):
+            expected = sum(np.exp(e1 * np.sum(x[k:m + 1]) - (m - k + 1) * e2) for k in range(1, m + 1))
+            assert res['w'][m] == pytest.approx(expected)
+
+        res = runLengthShroNorm(x, 0, 1, 10, 1, 1e10, keep_w=False)
+        assert res['w'] is None
+        assert res['rl'] == len(runLengthShroNorm(x, 0, 1, 10, 1, 1e10)['w'])
+
+    def test_shroRunLengths(self):
+        # the batched driver reproduces the single run implementation
+        np.random.seed(5)
+        x = [stats.poisson(10).rvs(200) for _ in range(20)]
+        expected = [runLengthShroPois(xi, 1.1, 1, 19, keep_w=False)['rl'] for xi in x]
+        rls = shroArlPfaCedPois(seed=5, N=20, limit=200, verbose=False)['rls']
+        assert rls == expected
@@ -203,6 +203,13 @@ class Test_qccStatistics(unittest.TestCase):
         conf_limits = R.limits(stats.center, sd, sizes, 3.0)
         np.testing.assert_allclose(conf_limits, np.array([[0, 0.5003893]]), rtol=1e-4)
 
+        # subgroup sizes beyond the tabulated constants
+        data = np.random.default_rng(1).normal(size=(10, 60))
+        sd = R.sd(data)
+        assert sd == pytest.approx(1, abs=0.1)
+        conf_limits = R.limits(R.stats(data).center, sd, R.getSizes(data), 3.0)
+        assert conf_limits.shape == (1, 2)
+
         # conf_limits = R.limits(stats.center, sd, sizes, 0.9)
         # np.testing.assert_allclose(conf_limits, np.array([[0.1047873, 0.3924825]]), rtol=1e-4)
 
@@ -224,6 +231,14 @@ class Test_qccStatistics(unittest.TestCase):
         assert XbarOne.sd(data, std_dev=SD_estimator.mr) == pytest.approx(0.1794541)
         assert XbarOne.sd(data, std_dev=SD_estimator.sd) == pytest.approx(0.2216795)
 
+        movingRanges = XbarOne.movingRanges(data)
+        assert len(movingRanges) == len(data) - 1
+        assert movingRanges[0] == pytest.approx(0.30)
+        assert XbarOne.sd(data, moving_ranges=movingRanges) == pytest.approx(0.1794541)
+        movingRanges = XbarOne.movingRanges(data, k=3)
+        np.testing.assert_allclose(movingRanges[:3], [0.39, 0.10, 0.05])
+        assert XbarOne.sd(data, k=3) == pytest.approx(np.mean(movingRanges) / 1.693)
+
         sd = XbarOne.sd(data)
         conf_limits = XbarOne.limits(stats.center, sd, None, 3.0)
         np.testing.assert_allclose(conf_limits, np.array([[2.031344, 3.108068]]), rtol=1e-4)
@@ -0,0 +1,105 @@
+'''
+Modern Statistics: A Computer Based Approach with Python
+Industrial Statistics: A Computer Based Approach with Python
+
+(c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
+'''
+import unittest
+
+import numpy as np
+import pytest
+
+from mistat.data import load_data
+from mistat.qcc.qualityControlChart import QualityControlChart
+from mistat.qcc.statistics import SD_estimator
+from mistat.qcc.streamingQCC import StreamingQCC
+
+
+class TestStreamingQCC(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(123)
+        self.data = rng.normal(10, 1, size=(40, 5))
+        self.data[10, 2] = np.nan
+        self.data[25:35] += 0.8
+        self.data[30, 1] = 20
+
+    def assertSameChart(self, qcc, stream):
+        assert stream.center == pytest.approx(qcc.center)
+        assert stream.std_dev == pytest.approx(qcc.std_dev)
+        for key in ('UCL', 'LCL'):
+            np.testing.assert_array_equal(stream.violations['beyondLimits'][key],
+                                          qcc.violations['beyondLimits'][key])
+        np.testing.assert_array_equal(sorted(stream.violations['violatingRuns']),
+                                      sorted(qcc.violations['violatingRuns']))
+
+    def test_phaseI(self):
+        for qcc_type in ('xbar', 'R', 'S'):
+            stream = StreamingQCC(qcc_type=qcc_type)
+            for subgroup in self.data:
+                stream.update(subgroup)
+            stream.freeze()
+            self.assertSameChart(QualityControlChart(self.data, qcc_type=qcc_type), stream)
+
+        for std_dev in SD_estimator.uwave_sd, SD_estimator.mvlue_r, SD_estimator.mvlue_sd, SD_estimator.rmsdf:
+            stream = StreamingQCC(std_dev=std_dev)
+            for subgroup in self.data:
+                stream.update(subgroup)
+            assert stream.freeze().std_dev == pytest.approx(QualityControlChart(self.data, std_dev=std_dev).std_dev)
+
+        values = self.data[:, 0]
+        for std_dev in (None, 'SD'):
+            stream = StreamingQCC(qcc_type='xbarone', std_dev=std_dev)
+            for value in values:
+                stream.update(value)
+            stream.freeze()
+            self.assertSameChart(QualityControlChart(values, qcc_type='xbarone', std_dev=std_dev), stream)
+
+        data = load_data('JANDEFECT').values
+        stream = StreamingQCC(qcc_type='p', sizes=100)
+        for value in data:
+            stream.update(value)
+        stream.freeze()
+        self.assertSameChart(QualityControlChart(data, qcc_type='p', sizes=np.full(len(data), 100)), stream)
+
+        stream = StreamingQCC(qcc_type='np', sizes=100)
+        for value in data:
+            stream.update(value)
+        stream.freeze()
+        assert stream.center == pytest.approx(5.387097)
+        assert stream.std_dev == pytest.approx(2.257629)
+        assert stream.limitsFor(100) == pytest.approx((0, 12.15998))
+
+    def test_phaseII(self):
+        qcc = QualityControlChart(self.data[:20], newdata=self.data[20:])
+        assert len(qcc.newstats.statistics) == 20
+        assert qcc.newsizes[0] == 5
+
+        full = QualityControlChart(self.data, center=qcc.center, std_dev=qcc.std_dev)
+        for key in ('UCL', 'LCL'):
+            np.testing.assert_array_equal(qcc.violations['beyondLimits'][key],
+                                          full.violations['beyondLimits'][key])
+        np.testing.assert_array_equal(qcc.violations['violatingRuns'], full.violations['violatingRuns'])
+        assert 30 in qcc.violations['beyondLimits']['UCL']
+        assert len(qcc.violations['violatingRuns']) > 0
+
+        qcc = QualityControlChart(self.data[:20])
+        assert qcc.newstats is None
+        point = qcc.update(self.data[30])
+        assert point.index == 20
+        assert point.beyondLimits == 'UCL'
+        assert point.UCL == pytest.approx(qcc.limits['UCL'][0])
+        np.testing.assert_array_equal(qcc.violations['beyondLimits']['UCL'], [20])
+
+    def test_fixed_parameters(self):
+        stream = StreamingQCC(center=10, std_dev=1).freeze()
+        point = stream.update([11, 12, 13, 12, 11])
+        assert point.beyondLimits == 'UCL'
+        assert point.UCL == pytest.approx(10 + 3 / np.sqrt(5))
+        assert point.LCL == pytest.approx(10 - 3 / np.sqrt(5))
+
+        with pytest.raises(ValueError):
+            StreamingQCC().freeze()
+        with pytest.raises(ValueError):
+            StreamingQCC(qcc_type='p').update(3)
+        with pytest.raises(ValueError):
+            StreamingQCC(qcc_type='xbarone').update([1, 2])
@@ -4,6 +4,8 @@ Industrial Statistics: A Computer Based Approach with Python
 
 (c) 2022 Ron Kenett, Shelemyahu Zacks, Peter Gedeck
 '''
+import os
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from typing import NamedTuple, Optional, Tuple, Union
 
@@ -35,12 +37,22 @@ pistonConfigurations = {
     't0': Configuration(350, (340, 360), 0.3, 'Value of filling gas temperature t0', 'K'),
 }
 
+_OPTIONS = ('m', 's', 'v0', 'k', 'p0', 't', 't0')
+# rows of the simulation that share a random stream in generator mode
+BLOCK_SIZE = 10_000
+
 
 @dataclass
 class PistonSimulator(MistatSimulation):  # pylint: disable=too-many-instance-attributes
     """ Version 2 of piston simulator code
 
     Results will differ from JMP and R versions of the simulator
+
+    With generator=True, the random errors are drawn from numpy Generators instead of
+    the global random state. Every call of simulate or simulate_parallel spawns a new
+    child of SeedSequence(seed), and every block of BLOCK_SIZE rows has its own stream
+    spawned from that child. The n-th call therefore gives identical results with
+    simulate and simulate_parallel, independent of the number of workers.
     """
     m: float = pistonConfigurations['m'].default
     s: float = pistonConfigurations['s'].default
@@ -57,10 +69,13 @@ class PistonSimulator(MistatSimulation):  # pylint: disable=too-many-instance-at
     seed: Optional[float] = None
     check: bool = True
     actuals: Optional[SimulationResult] = None
+    generator: bool = False
 
     def __post_init__(self):
         # Check arguments
-        if self.seed is not None:
+        if self.generator:
+            self.seedSequence = np.random.SeedSequence(self.seed)
+        elif self.seed is not None:
             np.random.seed(seed=self.seed)
         if self.check:
             self.validate_configuration()
@@ -75,7 +90,7 @@ class PistonSimulator(MistatSimulation):  # pylint: disable=too-many-instance-at
 
         # Convert to lists
         maxsize = 0
-        for option in ('m', 's', 'v0', 'k', 'p0', 't', 't0'):
+        for option in _OPTIONS:
             values = convert_to_list(getattr(self, option))
             values = list(np.repeat(values, self.n_replicate))
             maxsize = max(maxsize, len(values))
@@ -84,7 +99,7 @@ class PistonSimulator(MistatSimulation):  # pylint: disable=too-many-instance-at
             maxsize = self.n_simulation * self.n_replicate
 
         # Make sure that the vectors are all the same length
-        for option in ('m', 's', 'v0', 'k', 'p0', 't', 't0'):
+        for option in _OPTIONS:
             values = getattr(self, option)
             if maxsize % len(values) != 0:
                 raise ValueError(f'Inconsistent length of option {option}')
@@ -124,33 +139,48 @@ class PistonSimulator(MistatSimulation):  # pylint: disable=too-many-instance-at
         return values + stats.norm.rvs(size=size, loc=0, scale=self.errors[parameter])
 
     def simulate(self):
-        # add errors
-        m = self.with_added_errors('m')
-        s = self.with_added_errors('s')
-        v0 = self.with_added_errors('v0')
-        k = self.with_added_errors('k')
-        p0 = self.with_added_errors('p0')
-        t = self.with_added_errors('t')
-        t0 = self.with_added_errors('t0')
-
-        A = p0 * s + 2 * m * 9.81 - k * v0 / s
-        V = s / (2 * k) * (np.sqrt(A**2 + 4 * k*t*p0 * v0 / t0) - A)
-        res = 2 * np.pi * np.sqrt(m / (k + s**2 * p0 * (t / (t0 * V**2))))
-
-        result = {option: getattr(self, option) for option in ('m', 's', 'v0', 'k', 'p0', 't', 't0')}
+        if self.generator:
+            actuals = _actualValues(self._values(0, len(self.m)), self.errors, self.seedSequence.spawn(1)[0], 0)
+        else:
+            actuals = {option: self.with_added_errors(option) for option in _OPTIONS}
+        return self._simulationResult(actuals)
+
+    def simulate_parallel(self, n_workers=None):
+        """ Simulate in a pool of n_workers processes (-1 for all processors)
+
+        Requires generator=True. The blocks of rows are split across the workers and
+        the results are concatenated in order.
+        """
+        if not self.generator:
+            raise ValueError('simulate_parallel requires generator=True')
+        n_workers = os.cpu_count() if n_workers in (None, -1) else n_workers
+        nrows = len(self.m)
+        blocks = np.array_split(np.arange(-(-nrows // BLOCK_SIZE)), n_workers)
+        blocks = [block for block in blocks if len(block) > 0]
+        seedSequence = self.seedSequence.spawn(1)[0]
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = []
+            for block in blocks:
+                start, stop = block[0] * BLOCK_SIZE, min((block[-1] + 1) * BLOCK_SIZE, nrows)
+                futures.append(executor.submit(_actualValues, self._values(start, stop), self.errors,
+                                               seedSequence, block[0]))
+            results = [future.result() for future in futures]
+        actuals = {option: np.concatenate([result[option] for result in results]) for option in _OPTIONS}
+        return self._simulationResult(actuals)
+
+    def _values(self, start, stop):
+        return {option: getattr(self, option)[start:stop] for option in _OPTIONS}
+
+    def _simulationResult(self, actuals):
+        res = self.cycleTime(**actuals)
+        result = {option: getattr(self, option) for option in _OPTIONS}
         result['seconds'] = res
-        nrepeats = len(m) // self.n_replicate
+        nrepeats = len(res) // self.n_replicate
         result['group'] = np.repeat(range(1, nrepeats + 1), self.n_replicate)
 
         # store the actual values
         self.actuals = SimulationResult({
-            'm': m,
-            's': s,
-            'v0': v0,
-            'k': k,
-            'p0': p0,
-            't': t,
-            't0': t0,
+            **actuals,
             'seconds': res,
             'group': np.repeat(range(1, nrepeats + 1), self.n_replicate),
         })
@@ -163,6 +193,19 @@ class PistonSimulator(MistatSimulation):  # pylint: disable=too-many-instance-at
         return 2 * np.pi * np.sqrt(m / (k + s**2 * p0 * (t / (t0 * V**2))))
 
 
+def _actualValues(values, errors, seedSequence, firstBlock):
+    """ Add random errors to the values; block i of rows uses the i-th child stream of seedSequence """
+    nrows = len(values['m'])
+    actuals = {option: np.empty(nrows) for option in _OPTIONS}
+    for block, start in enumerate(range(0, nrows, BLOCK_SIZE), start=firstBlock):
+        rng = np.random.default_rng(np.random.SeedSequence(seedSequence.entropy,
+                                                       spawn_key=(*seedSequence.spawn_key, block)))
+        stop = min(start + BLOCK_SIZE, nrows)
+        for option in _OPTIONS:
+            actuals[option][start:stop] = values[option][start:stop] + rng.normal(0, errors[option], stop - start)
+    return actuals
+
+
 def uniformSumDistribution(size=1, k=6, left=0, right=1):
     """ return size random numbers from the uniform sum distribution [left, right] based on k sums """
     if right <= left or size < 1 or k < 1:
@@ -7,10 +7,11 @@ Industrial Statistics: A Computer Based Approach with Python
 '''
 import unittest
 
+import numpy as np
 import pandas as pd
 import pytest
 
-from mistat.simulation.pistonSimulation import (PistonSimulator,
+from mistat.simulation.pistonSimulation import (BLOCK_SIZE, PistonSimulator,
                                                 uniformSumDistribution)
 
 
@@ -64,3 +65,35 @@ class TestPistonSimulation(unittest.TestCase):
         assert list(result['k']) == list(parameter['k'])
         assert list(result['m']) == [30, 30, 30]
         assert result.shape == (3, 9)
+
+    def test_PistonSimulator_generator(self):
+        state = np.random.get_state()[1].copy()
+        simulator = PistonSimulator(n_simulation=2 * BLOCK_SIZE + 10, seed=1, generator=True)
+        result = simulator.simulate()
+        # the global random state is not used
+        np.testing.assert_array_equal(np.random.get_state()[1], state)
+        assert result.shape == (2 * BLOCK_SIZE + 10, 9)
+        assert simulator.actuals['m'].std() == pytest.approx(0.1, rel=0.05)
+
+        again = PistonSimulator(n_simulation=2 * BLOCK_SIZE + 10, seed=1, generator=True)
+        pd.testing.assert_frame_equal(again.simulate(), result)
+        pd.testing.assert_frame_equal(again.actuals, simulator.actuals)
+
+        for n_workers in (1, 2, 4):
+            parallel = PistonSimulator(n_simulation=2 * BLOCK_SIZE + 10, seed=1, generator=True)
+            pd.testing.assert_frame_equal(parallel.simulate_parallel(n_workers), result)
+            pd.testing.assert_frame_equal(parallel.actuals, simulator.actuals)
+
+        # successive calls draw new random values
+        second = simulator.simulate()
+        assert not np.allclose(second['seconds'], result['seconds'])
+        pd.testing.assert_frame_equal(again.simulate_parallel(2), second)
+        assert not np.allclose(PistonSimulator(generator=True).simulate()['seconds'],
+                               PistonSimulator(generator=True).simulate()['seconds'])
+
+        other = PistonSimulator(n_simulation=2 * BLOCK_SIZE + 10, seed=2, generator=True)
+        other.simulate()
+        assert not np.allclose(other.actuals['seconds'], simulator.actuals['seconds'])
+
+        with pytest.raises(ValueError):
+            PistonSimulator(seed=1).simulate_parallel(2)